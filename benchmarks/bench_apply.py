@@ -0,0 +1,95 @@
+"""Benchmark of applying a results artifact to a large tree, without any model.
+
+A tree of generated modules is documented by an artifact with one docstring per
+function; a fraction of the functions is then edited, so their docstrings are stale.
+The artifact is applied as a patch and then by overwriting the files.
+
+Usage:
+    python benchmarks/bench_apply.py [--files 500] [--functions 40] [--stale 0.1]
+"""
+
+import argparse
+import ast
+import json
+import os
+import tempfile
+import time
+
+from gpt4docstrings.artifact import apply_artifact
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.journal import source_hash
+from gpt4docstrings.visit import GPT4DocstringsVisitor
+
+
+def build_source(functions):
+    return "".join(
+        f"def f{i}(a, b):\n    c = a + b * {i}\n    return c\n\n\n"
+        for i in range(functions)
+    )
+
+
+def build_tree(root, files, functions):
+    source = build_source(functions)
+    visitor = GPT4DocstringsVisitor("module.py", GPT4DocstringsConfig(), source)
+    visitor.visit(ast.parse(source))
+
+    records = []
+    for n in range(files):
+        file = f"package_{n % 10}/module_{n}.py"
+        os.makedirs(os.path.join(root, os.path.dirname(file)), exist_ok=True)
+        with open(os.path.join(root, file), "w") as f:
+            f.write(source)
+        for node in visitor.nodes:
+            if node.node_type == "Module":
+                continue
+            records.append(
+                {
+                    "kind": "generation",
+                    "file": file,
+                    "path": node.path.replace("module.py", f"module_{n}.py"),
+                    "source_hash": source_hash(node.source),
+                    "lineno": node.docstring_lineno,
+                    "col_offset": 4 + node.col_offset,
+                    "docstring": f"Docstring for {node.name}.",
+                }
+            )
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--functions", type=int, default=40)
+    parser.add_argument("--stale", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        records = build_tree(root, args.files, args.functions)
+        artifact = os.path.join(root, "results.jsonl")
+        with open(artifact, "w") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+
+        stale = int(args.functions * args.stale)
+        for n in range(args.files):
+            filename = os.path.join(root, f"package_{n % 10}/module_{n}.py")
+            with open(filename) as f:
+                content = f.read()
+            for i in range(stale):
+                content = content.replace(f"b * {i}\n", f"b * {i} + 1\n")
+            with open(filename, "w") as f:
+                f.write(content)
+
+        for overwrite in (False, True):
+            start = time.perf_counter()
+            patch, counts = apply_artifact(artifact, overwrite=overwrite, root=root)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{'overwrite' if overwrite else 'patch    '}: {elapsed:.2f} s for "
+                f"{len(records)} records ({len(records) / elapsed:.0f} records/s), "
+                f"{counts['Docstrings applied']} applied, "
+                f"{counts['Docstrings stale']} stale, {len(patch)} patch lines"
+            )
+
+
+if __name__ == "__main__":
+    main()
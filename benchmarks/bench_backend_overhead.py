@@ -0,0 +1,114 @@
+"""Benchmark of the per-call overhead of the completion backends.
+
+Both backends are pointed at a local OpenAI-compatible server that answers instantly,
+so the measured time is the client-side overhead of each request: langchain's
+`ChatOpenAI` (through the `openai` package, which opens a new session per request
+unless a shared one is set) against the thin aiohttp backend.
+
+Usage:
+    python benchmarks/bench_backend_overhead.py [--calls 500] [--concurrency 1]
+"""
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import openai
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from langchain.chat_models import ChatOpenAI
+
+from gpt4docstrings.backends import HTTPClientPool
+from gpt4docstrings.backends import LangChainBackend
+from gpt4docstrings.backends import OpenAICompatibleBackend
+
+RESPONSE = {
+    "id": "chatcmpl-0",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-3.5-turbo",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": '"""\nAdds two numbers.\n"""'},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 120, "completion_tokens": 7, "total_tokens": 127},
+}
+
+
+async def chat_completions(request):
+    await request.read()
+    return web.json_response(RESPONSE)
+
+
+async def measure(backend, calls, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            await backend.complete("prompt", max_tokens=64, stop=['"""\n\n'])
+
+    await call()  # warm-up (connection, lazy imports)
+    start = time.perf_counter()
+    await asyncio.gather(*[call() for _ in range(calls)])
+    return (time.perf_counter() - start) / calls
+
+
+def import_time(module):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+    return time.perf_counter() - start
+
+
+async def main(calls, concurrency):
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("/v1"))
+
+        langchain = LangChainBackend(
+            ChatOpenAI(
+                model_name="gpt-3.5-turbo",
+                openai_api_key="local",
+                openai_api_base=base_url,
+            )
+        )
+        http = OpenAICompatibleBackend(
+            "gpt-3.5-turbo", api_key="local", base_url=base_url
+        )
+        pool = HTTPClientPool(pool_size=concurrency)
+        try:
+            langchain_time = await measure(langchain, calls, concurrency)
+            token = openai.aiosession.set(pool.session)
+            try:
+                pooled_time = await measure(langchain, calls, concurrency)
+            finally:
+                openai.aiosession.reset(token)
+            http_time = await measure(http, calls, concurrency)
+        finally:
+            await http.aclose()
+            await pool.aclose()
+
+    print(f"calls: {calls}, concurrency: {concurrency}")
+    print(f"langchain ChatOpenAI:           {langchain_time * 1000:7.2f} ms / call")
+    print(f"langchain ChatOpenAI + pool:    {pooled_time * 1000:7.2f} ms / call")
+    print(f"aiohttp backend:                {http_time * 1000:7.2f} ms / call")
+    print(
+        f"shared pool: {pool.stats.connections_opened} connections opened, "
+        f"{pool.stats.connections_reused} reused"
+    )
+    print(f"speedup (langchain -> aiohttp): {langchain_time / http_time:.1f}x")
+    print(f"import langchain.chat_models: {import_time('langchain.chat_models'):.2f} s")
+    print(f"import aiohttp:               {import_time('aiohttp'):.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency))
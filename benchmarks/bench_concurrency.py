@@ -0,0 +1,108 @@
+"""Benchmark of a fixed concurrency level against the adaptive (AIMD) controller.
+
+The requests are answered by a simulated API whose quota is shared with other jobs:
+it serves `--capacity` requests at a time at full speed, slows down proportionally
+beyond that, and answers 429 past twice its capacity. Halfway through the run, another
+job takes most of the quota. Rejected requests are retried after a second. Times are
+scaled down by `--scale` so the benchmark runs in seconds.
+
+Usage:
+    python benchmarks/bench_concurrency.py [--requests 2000] [--capacity 24] [--scale 0.01]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from gpt4docstrings.concurrency import AdaptiveConcurrencyLimiter
+from gpt4docstrings.exceptions import RateLimitError
+from gpt4docstrings.hedging import RequestHedger
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.scheduler import NodeScheduler
+
+
+class SimulatedAPI:
+    def __init__(self, capacity, scale, rng):
+        self.capacity = capacity
+        self.scale = scale
+        self.rng = rng
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def request(self):
+        if self.in_flight >= 2 * self.capacity:
+            self.rejected += 1
+            await asyncio.sleep(0.05 * self.scale)
+            raise RateLimitError("429 Too Many Requests")
+
+        self.in_flight += 1
+        try:
+            slowdown = max(1.0, self.in_flight / self.capacity)
+            await asyncio.sleep(self.rng.lognormvariate(0, 0.2) * slowdown * self.scale)
+        finally:
+            self.in_flight -= 1
+
+
+async def run(args, adaptive):
+    api = SimulatedAPI(args.capacity, args.scale, random.Random(0))
+    report = RunReport()
+    limiter = (
+        AdaptiveConcurrencyLimiter(max_limit=args.max_concurrency, report=report)
+        if adaptive
+        else None
+    )
+    hedger = RequestHedger(limiter=limiter)
+    scheduler = NodeScheduler(max_concurrency=args.max_concurrency, limiter=limiter)
+    if limiter is not None:
+        limiter.reset()
+
+    async def node():
+        while True:
+            try:
+                return await hedger.run(api.request, key="model", report=report)
+            except RateLimitError:
+                await asyncio.sleep(args.scale)
+
+    async def squeeze():
+        # Another job takes most of the quota halfway through the run
+        await asyncio.sleep(args.requests / args.capacity / 2 * args.scale)
+        api.capacity = max(args.capacity // 4, 1)
+
+    squeezer = asyncio.ensure_future(squeeze())
+    start = time.perf_counter()
+    await asyncio.gather(*(scheduler.submit((0,), node) for _ in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    squeezer.cancel()
+    return api, report, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--capacity", type=int, default=24)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--scale", type=float, default=0.01)
+    args = parser.parse_args()
+
+    for adaptive in (False, True):
+        api, report, elapsed = asyncio.run(run(args, adaptive))
+        percentiles = {
+            name: round(value / args.scale, 1)
+            for name, value in report.latency_percentiles().items()
+        }
+        print(
+            f"{'adaptive' if adaptive else 'fixed   '}: "
+            f"run time {elapsed / args.scale:.0f} simulated s, "
+            f"{api.rejected} requests rejected (429), latencies {percentiles}"
+        )
+        if adaptive:
+            rows = report.concurrency_rows(max_rows=12)
+            print(
+                "  limit over time:",
+                ", ".join(f"{t / args.scale:.0f}s={limit}" for t, limit in rows),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark of the `coverage` command on a large synthetic tree.
+
+Compares a sequential pass (one process, no cache), the process pool and a second run
+reading the cached node table.
+
+Usage:
+    python benchmarks/bench_coverage.py [--files 2000] [--jobs 4]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from gpt4docstrings.coverage import compute_coverage
+
+MODULE = '''"""Module {i}."""
+
+
+class Service{i}:
+    """A service."""
+
+    def __init__(self, client, timeout):
+        self.client = client
+        self.timeout = timeout
+
+    def fetch(self, key):
+        value = self.client.get(key, timeout=self.timeout)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def _parse(self, raw):
+        """Parses a raw value."""
+        return [item.strip() for item in raw.split(",") if item]
+
+
+def helper_{i}(values):
+    def inner(value):
+        return value * 2
+
+    return [inner(value) for value in values]
+'''
+
+
+def build_tree(root, files):
+    for i in range(files):
+        path = os.path.join(root, f"pkg_{i // 50}", f"module_{i}.py")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(MODULE.format(i=i) * 5)
+
+
+def timeit(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        build_tree(root, args.files)
+        filenames = sorted(
+            os.path.join(dirpath, f)
+            for dirpath, _, fs in os.walk(root)
+            for f in fs
+            if f.endswith(".py")
+        )
+        cache_path = os.path.join(root, "cache.json")
+
+        sequential, report = timeit(
+            lambda: compute_coverage(filenames, jobs=1, cache_path=None)
+        )
+        pooled, _ = timeit(
+            lambda: compute_coverage(filenames, jobs=args.jobs, cache_path=cache_path)
+        )
+        cached, cached_report = timeit(
+            lambda: compute_coverage(filenames, jobs=args.jobs, cache_path=cache_path)
+        )
+
+    print(f"{len(filenames)} files, {report.total} nodes, {report.coverage}% covered")
+    print(f"sequential:           {sequential:.2f} s")
+    print(f"process pool ({args.jobs} jobs): {pooled:.2f} s")
+    print(f"cached:               {cached:.2f} s ({cached_report.cached} files reused)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark of file discovery on a large synthetic tree.
+
+Compares the previous discovery (full `os.walk` followed by `fnmatch` of every file
+against every exclusion pattern) with the pruned, compiled-matcher walk.
+
+Usage:
+    python benchmarks/bench_discovery.py [--packages 200] [--excludes 20]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from fnmatch import fnmatch
+
+from gpt4docstrings.utils.discovery import ExclusionMatcher
+from gpt4docstrings.utils.discovery import iter_python_files
+
+
+def legacy_discovery(root, excluded):
+    filenames = []
+    for dirpath, _, fs in os.walk(root):
+        for f in (os.path.join(dirpath, f) for f in fs):
+            if not f.endswith(".py") or os.path.basename(f) == "__init__.py":
+                continue
+            if any(fnmatch(f, exc + "*") for exc in excluded):
+                continue
+            filenames.append(f)
+    return filenames
+
+
+def build_tree(root, packages, files_per_package=20, vendored=5000):
+    def touch(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("")
+
+    for p in range(packages):
+        for m in range(files_per_package):
+            touch(os.path.join(root, "src", f"pkg_{p}", f"module_{m}.py"))
+    for i in range(vendored):
+        touch(os.path.join(root, ".venv", "lib", f"dep_{i // 50}", f"mod_{i}.py"))
+        touch(os.path.join(root, "node_modules", f"dep_{i // 50}", f"mod_{i}.js"))
+        touch(os.path.join(root, ".git", "objects", f"{i // 50:02x}", f"{i:038x}"))
+        touch(os.path.join(root, "generated", f"dep_{i // 50}", f"mod_{i}.py"))
+    os.makedirs(os.path.join(root, ".git", "refs"), exist_ok=True)
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("generated/\nnode_modules/\n")
+
+
+def timeit(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--packages", type=int, default=200)
+    parser.add_argument("--excludes", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        build_tree(root, args.packages)
+        excluded = [
+            os.path.join(root, "src", f"pkg_{p}", "module_0")
+            for p in range(args.excludes)
+        ]
+        # The previous discovery didn't know about .gitignore
+        legacy_excluded = [*excluded, os.path.join(root, "generated")]
+
+        legacy_time, legacy = timeit(lambda: legacy_discovery(root, legacy_excluded))
+        pruned_time, pruned = timeit(
+            lambda: list(iter_python_files(root, ExclusionMatcher(excluded)))
+        )
+
+        pruned_src = {f for f in pruned if "/src/" in f}
+        legacy_src = {f for f in legacy if "/src/" in f}
+        assert pruned_src == legacy_src, "Both discoveries must find the same sources"
+
+        print(f"files found: legacy={len(legacy)} pruned={len(pruned)}")
+        print(f"legacy os.walk + fnmatch: {legacy_time * 1000:8.1f} ms")
+        print(f"pruned scandir + matcher: {pruned_time * 1000:8.1f} ms")
+        print(f"speedup: {legacy_time / pruned_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
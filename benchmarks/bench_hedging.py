@@ -0,0 +1,73 @@
+"""Benchmark of the tail latency of the model requests, with and without hedging.
+
+The requests are answered by a simulated model whose latency has a heavy tail: most
+answers take a couple of seconds, and a few stragglers take 30-60 s, as observed on the
+OpenAI API. Times are scaled down by `--scale` so the benchmark runs in seconds.
+
+Usage:
+    python benchmarks/bench_hedging.py [--requests 2000] [--stragglers 0.03] [--scale 0.005]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from gpt4docstrings.hedging import RequestHedger
+from gpt4docstrings.report import RunReport
+
+
+def simulated_request(rng, stragglers, scale):
+    async def request():
+        if rng.random() < stragglers:
+            latency = rng.uniform(30, 60)
+        else:
+            latency = rng.lognormvariate(0.7, 0.3)
+        await asyncio.sleep(latency * scale)
+        return latency
+
+    return request
+
+
+async def run(args, hedge):
+    rng = random.Random(0)
+    hedger = RequestHedger(hedge=hedge, max_hedge_rate=args.max_hedge_rate)
+    report = RunReport()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    request = simulated_request(rng, args.stragglers, args.scale)
+
+    async def one():
+        async with semaphore:
+            await hedger.run(request, key="model", report=report)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    return report, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--stragglers", type=float, default=0.03)
+    parser.add_argument("--max-hedge-rate", type=float, default=0.1)
+    parser.add_argument("--scale", type=float, default=0.005)
+    args = parser.parse_args()
+
+    for hedge in (False, True):
+        report, elapsed = asyncio.run(run(args, hedge))
+        percentiles = {
+            name: round(value / args.scale, 1)
+            for name, value in report.latency_percentiles().items()
+        }
+        hedged = report.counters["Hedged requests"]
+        print(
+            f"hedging {'on ' if hedge else 'off'}: {percentiles} (simulated s), "
+            f"{hedged} hedges ({hedged / args.requests:.1%}), "
+            f"{report.counters['Hedges won']} won, "
+            f"run time {elapsed / args.scale:.0f} simulated s"
+        )
+
+
+if __name__ == "__main__":
+    main()
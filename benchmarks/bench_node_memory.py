@@ -0,0 +1,111 @@
+"""Memory benchmark of the node records extracted from a large module.
+
+Compares the previous representation (records keeping the live AST node, the full
+unparsed source and a parent reference) with the compact slotted records, which
+share the file content and let the AST be released right after extraction.
+
+Usage:
+    python benchmarks/bench_node_memory.py [--classes 500] [--methods 10]
+"""
+
+import argparse
+import ast
+import gc
+import tracemalloc
+
+import attr
+
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.visit import GPT4DocstringsVisitor
+
+
+@attr.s(eq=False)
+class LegacyNode:
+    name = attr.ib()
+    path = attr.ib()
+    source = attr.ib()
+    ast_node = attr.ib()
+    level = attr.ib()
+    docstring_lineno = attr.ib()
+    col_offset = attr.ib()
+    covered = attr.ib()
+    node_type = attr.ib()
+    parent = attr.ib()
+
+
+def legacy_extract(file_content):
+    nodes = []
+
+    def visit(node, parent):
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            record = LegacyNode(
+                name=node.name,
+                path=(parent.path + "." if parent else "m.py:") + node.name,
+                source=ast.unparse(node),
+                ast_node=node,
+                level=parent.level + 1 if parent else 1,
+                docstring_lineno=node.body[0].lineno - 1,
+                col_offset=node.col_offset,
+                covered=ast.get_docstring(node) is not None,
+                node_type=type(node).__name__,
+                parent=parent,
+            )
+            nodes.append(record)
+            parent = record
+        for child in ast.iter_child_nodes(node):
+            visit(child, parent)
+
+    visit(ast.parse(file_content), None)
+    return nodes
+
+
+def compact_extract(file_content):
+    visitor = GPT4DocstringsVisitor(
+        filename="m.py", config=GPT4DocstringsConfig(), file_content=file_content
+    )
+    visitor.visit(ast.parse(file_content))
+    return visitor.nodes
+
+
+def build_module(classes, methods):
+    lines = []
+    for c in range(classes):
+        lines.append(f"class Model{c}:")
+        for m in range(methods):
+            lines.append(f"    def method_{m}(self, a, b=None, *args, **kwargs):")
+            lines.append(f"        if a > {m}:")
+            lines.append("            raise ValueError('a is too big')")
+            lines.append(f"        return [a * i for i in range({m})] + list(args)")
+            lines.append("")
+    return "\n".join(lines)
+
+
+def measure(extract, file_content):
+    gc.collect()
+    tracemalloc.start()
+    nodes = extract(file_content)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(nodes), retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--classes", type=int, default=500)
+    parser.add_argument("--methods", type=int, default=10)
+    args = parser.parse_args()
+
+    file_content = build_module(args.classes, args.methods)
+    print(f"module size: {len(file_content) / 1e6:.1f} MB")
+
+    for name, extract in [("legacy", legacy_extract), ("compact", compact_extract)]:
+        n, retained, peak = measure(extract, file_content)
+        print(
+            f"{name:8} nodes={n:6} retained={retained / 1e6:8.1f} MB "
+            f"peak={peak / 1e6:8.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark of patch generation on large files with few new docstrings.
+
+Compares the previous patch generation (rebuilding the whole file and running
+`difflib.unified_diff` over the original and new contents) with the hunks emitted
+directly from the docstring edits.
+
+Usage:
+    python benchmarks/bench_patch.py [--functions 5000] [--documented 20]
+"""
+
+import argparse
+import difflib
+import time
+
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.edits import insertion_edit
+from gpt4docstrings.edits import split_lines
+from gpt4docstrings.edits import unified_diff
+
+
+def build_source(functions):
+    return "".join(
+        f"def f{i}(a, b):\n    c = a + b * {i}\n    return c\n\n\n"
+        for i in range(functions)
+    )
+
+
+def legacy_patch(source, docstrings, filename):
+    positions = {d.lineno - 1: d.to_str() for d in docstrings}
+    lines = []
+    for i, line in enumerate(source.split("\n")):
+        lines.append(line)
+        if i in positions:
+            lines.extend(positions[i].splitlines())
+    target = "\n".join(lines)
+
+    return list(
+        difflib.unified_diff(
+            [line + "\n" for line in source.splitlines()],
+            [line + "\n" for line in target.splitlines()],
+            fromfile="a/" + filename,
+            tofile="b/" + filename,
+        )
+    )
+
+
+def direct_patch(source, docstrings, filename):
+    edits = [insertion_edit(d) for d in docstrings]
+    return unified_diff(split_lines(source), edits, filename)
+
+
+def docstrings(functions, documented):
+    step = max(functions // documented, 1)
+    return [
+        Docstring(f"Docstring for f{i}.", 4, 5 * i + 1)
+        for i in range(0, functions, step)
+    ]
+
+
+def timeit(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--functions", type=int, default=5000)
+    parser.add_argument("--documented", type=int, default=20)
+    args = parser.parse_args()
+
+    source = build_source(args.functions)
+
+    # `Docstring.to_str` mutates the docstring, so each run gets fresh ones
+    legacy_time, legacy = timeit(
+        lambda: legacy_patch(
+            source, docstrings(args.functions, args.documented), "m.py"
+        )
+    )
+    direct_time, direct = timeit(
+        lambda: direct_patch(
+            source, docstrings(args.functions, args.documented), "m.py"
+        )
+    )
+    assert legacy == direct, "Both patches must be identical"
+
+    print(f"lines: {source.count(chr(10))}, patch lines: {len(direct)}")
+    print(f"legacy rebuild + difflib: {legacy_time * 1000:8.1f} ms")
+    print(f"direct hunk emission:     {direct_time * 1000:8.1f} ms")
+    print(f"speedup: {legacy_time / direct_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
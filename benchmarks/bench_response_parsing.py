@@ -0,0 +1,90 @@
+"""Benchmark of the round trips avoided by the tiered response parser.
+
+Every response of the corpus of recorded bad answers is parsed with the previous parser
+(a `\"\"\"...\"\"\"` block or a failure) and with the tiered one. Each failure means
+the whole prompt is sent again after the retry delay, so the difference is the number
+of round trips (and retry delays) avoided.
+
+Usage:
+    python benchmarks/bench_response_parsing.py [--corpus tests/resources/responses/bad_responses.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+
+from gpt4docstrings.exceptions import DocstringParsingError
+from gpt4docstrings.utils.parsers import extract_docstring
+
+RETRY_DELAY = 5
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "tests",
+    "resources",
+    "responses",
+    "bad_responses.json",
+)
+
+
+def legacy_parse(text):
+    match = re.search(r'"""(.*?)"""', text, re.DOTALL)
+    if match:
+        return match.group(1).strip()
+    raise DocstringParsingError("Something went wrong when parsing")
+
+
+def succeeds(parse, response):
+    try:
+        return parse(response["response"]) == response["docstring"]
+    except DocstringParsingError:
+        return False
+
+
+def main(corpus_path):
+    with open(corpus_path) as f:
+        corpus = json.load(f)
+
+    rows = Counter()
+    tiers = Counter()
+    for response in corpus:
+        text, structured = response["response"], response["structured"]
+        mode = "structured" if structured else "free text"
+        legacy_ok = succeeds(legacy_parse, response)
+        tiered_ok = succeeds(lambda t: extract_docstring(t, structured)[0], response)
+        rows[mode, "responses"] += 1
+        rows[mode, "legacy round trips"] += not legacy_ok
+        rows[mode, "tiered round trips"] += not tiered_ok
+        if tiered_ok:
+            tiers[extract_docstring(text, structured)[1]] += 1
+
+    start = time.perf_counter()
+    repeats = 1000
+    for _ in range(repeats):
+        for response in corpus:
+            try:
+                extract_docstring(response["response"], response["structured"])
+            except DocstringParsingError:
+                pass
+    parse_time = (time.perf_counter() - start) / (repeats * len(corpus))
+
+    for mode in ("free text", "structured"):
+        avoided = rows[mode, "legacy round trips"] - rows[mode, "tiered round trips"]
+        print(
+            f"{mode:>10}: {rows[mode, 'responses']} responses, "
+            f"{rows[mode, 'legacy round trips']} re-requests before, "
+            f"{rows[mode, 'tiered round trips']} after "
+            f"({avoided} round trips and {avoided * RETRY_DELAY} s of retry delay avoided)"
+        )
+    print("parsed by tier:", dict(tiers))
+    print(f"tiered parse time: {parse_time * 1e6:.1f} us / response")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    args = parser.parse_args()
+    main(args.corpus)
@@ -1,2 +1,3 @@
 """gpt4docstrings."""
 from .generate_docstrings import GPT4Docstrings  # noqa F401
+from .generate_docstrings import NodeResult  # noqa F401
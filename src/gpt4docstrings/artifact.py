@@ -0,0 +1,254 @@
+import ast
+import inspect
+import json
+import logging
+import os
+import pathlib
+from collections import Counter
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+import attr
+
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.edits import apply_edits
+from gpt4docstrings.edits import Edit
+from gpt4docstrings.edits import insertion_edit
+from gpt4docstrings.edits import replacement_edit
+from gpt4docstrings.edits import split_lines
+from gpt4docstrings.edits import unified_diff
+from gpt4docstrings.journal import source_hash
+from gpt4docstrings.visit import GPT4DocstringsNode
+from gpt4docstrings.visit import GPT4DocstringsVisitor
+
+DEFAULT_ARTIFACT_PATH = "gpt4docstrings_results.jsonl"
+
+
+@attr.s
+class ArtifactRecord:
+    """
+    A node result stored in a results artifact.
+
+    Args:
+        kind (str): Either "generation" or "translation".
+        file (str): The path of the file containing the node, relative to the directory
+            the artifact was generated from when it's inside it.
+        path (str): Pseudo-import path to the node (e.g., "sample.py:MyClass.my_method").
+        source_hash (str): Hash of the node source when the docstring was generated.
+        lineno (int): Line after which the docstring was to be inserted.
+        col_offset (int): Indentation of the docstring.
+        docstring (str): The text of the docstring, without quotes or indentation.
+        source (str): Where the docstring comes from ("model", "journal", "template", ...).
+        model (str): The model the request was sent to, if any.
+        prompt_tokens (int): Estimated tokens of the prompt, if a request was sent.
+        completion_tokens (int): Estimated tokens of the docstring, if a request was sent.
+        cost (float): Estimated cost of the request in USD.
+        elapsed (float): Seconds spent on the request, including its retries.
+    """
+
+    kind = attr.ib()
+    file = attr.ib()
+    path = attr.ib()
+    source_hash = attr.ib()
+    lineno = attr.ib()
+    col_offset = attr.ib()
+    docstring = attr.ib()
+    source = attr.ib(default=None)
+    model = attr.ib(default=None)
+    prompt_tokens = attr.ib(default=None)
+    completion_tokens = attr.ib(default=None)
+    cost = attr.ib(default=0.0)
+    elapsed = attr.ib(default=0.0)
+
+
+def _portable_path(filename: str, root: str) -> str:
+    """Returns `filename` relative to `root` if it's inside it, in POSIX form."""
+    relative = os.path.relpath(filename, root)
+    if relative.startswith(os.pardir):
+        return pathlib.Path(filename).as_posix()
+    return pathlib.Path(relative).as_posix()
+
+
+class ArtifactWriter:
+    """
+    Writes the node results of a run as a JSONL artifact, one line per docstring.
+
+    Lines are flushed as soon as the results arrive, so the artifact of an interrupted
+    run can still be applied. Failed nodes are not recorded.
+
+    Args:
+        path (str): The path of the artifact.
+        root (str): Files are stored relative to this directory (the current one by
+            default), so the artifact can be applied to another checkout.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARTIFACT_PATH, root: str = None):
+        self.path = path
+        self.root = root or os.getcwd()
+        self._file = open(path, "w", encoding="utf-8")
+
+    def record(self, result) -> bool:
+        """
+        Appends a node result to the artifact.
+
+        Args:
+            result (NodeResult): The result of a node, with its source hash.
+
+        Returns:
+            bool: `True` if the result was recorded, `False` if the node failed.
+        """
+        if result.docstring is None:
+            return False
+        entry = ArtifactRecord(
+            kind=result.kind,
+            file=_portable_path(result.filename, self.root),
+            path=result.path,
+            source_hash=result.source_hash,
+            lineno=result.docstring.lineno,
+            col_offset=result.docstring.col_offset,
+            docstring=result.docstring.text,
+            source=result.source,
+            model=result.model_name,
+            prompt_tokens=result.prompt_tokens,
+            completion_tokens=result.completion_tokens,
+            cost=result.cost,
+            elapsed=result.elapsed,
+        )
+        self._file.write(json.dumps(attr.asdict(entry)) + "\n")
+        self._file.flush()
+        return True
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_artifact(path: str) -> Iterator[ArtifactRecord]:
+    """
+    Yields the records of an artifact, skipping (and logging) malformed lines.
+
+    Args:
+        path (str): The path of the artifact.
+
+    Yields:
+        ArtifactRecord: The records, in the order they were written.
+    """
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield ArtifactRecord(**json.loads(line))
+            except (ValueError, TypeError):
+                logging.warning(f"Skipping malformed line {number} of {path}")
+
+
+def _file_edits(
+    filename: str,
+    file_content: str,
+    lines: List[str],
+    records: List[ArtifactRecord],
+    counts: Counter,
+) -> List[Edit]:
+    """Returns the edits applying the records of a file that still match its code."""
+    visitor = GPT4DocstringsVisitor(
+        filename=filename,
+        config=GPT4DocstringsConfig(),
+        file_content=file_content,
+        analyze=False,
+    )
+    visitor.visit(ast.parse(file_content))
+    # Paths aren't unique (a property getter and its setter share theirs), so a
+    # record goes to a node of its path with the same source, the nearest one to its
+    # line, and each node takes a single record
+    nodes: Dict[str, List[GPT4DocstringsNode]] = {}
+    for node in visitor.nodes:
+        nodes.setdefault(node.path, []).append(node)
+
+    edits = []
+    for record in records:
+        # A docstring added since (e.g. by applying the artifact) changes the hash too
+        candidates = [
+            node
+            for node in nodes.get(record.path, ())
+            if source_hash(node.source) == record.source_hash
+        ]
+        if not candidates:
+            counts["Docstrings stale"] += 1
+            continue
+        node = min(
+            candidates, key=lambda node: abs(node.docstring_lineno - record.lineno)
+        )
+        nodes[record.path].remove(node)
+
+        # The docstring is placed from the current code, so edits elsewhere in the
+        # file don't invalidate it
+        docstring = Docstring(
+            text=record.docstring,
+            col_offset=4 + node.col_offset,
+            lineno=node.docstring_lineno,
+        )
+        if record.kind == "generation":
+            edits.append(insertion_edit(docstring))
+        elif inspect.cleandoc(record.docstring) == node.docstring:
+            counts["Translations identical to the original"] += 1
+            continue
+        else:
+            edits.append(replacement_edit(lines, node, docstring))
+        counts["Docstrings applied"] += 1
+    return edits
+
+
+def apply_artifact(
+    path: str, overwrite: bool = False, root: str = None
+) -> Tuple[List[str], Counter]:
+    """
+    Applies the docstrings of an artifact in a single offline pass, without any model.
+
+    Each file is parsed once and its records are matched to its nodes by path and
+    source hash; the ones whose source changed since the artifact was generated are
+    skipped.
+
+    Args:
+        path (str): The path of the artifact.
+        overwrite (bool): If `True`, the files are rewritten. Otherwise, a patch is returned.
+        root (str): The directory relative file paths are resolved from (the current
+            one by default).
+
+    Returns:
+        Tuple[List[str], Counter]: The lines of the patch (empty when overwriting) and
+            the number of applied, stale and identical docstrings.
+    """
+    root = root or os.getcwd()
+    by_file: Dict[str, List[ArtifactRecord]] = {}
+    for record in read_artifact(path):
+        by_file.setdefault(record.file, []).append(record)
+
+    counts = Counter()
+    patch = []
+    for file, records in by_file.items():
+        filename = os.path.join(root, file)
+        try:
+            with open(filename, encoding="utf-8") as f:
+                file_content = f.read()
+            lines = split_lines(file_content)
+            edits = _file_edits(filename, file_content, lines, records, counts)
+        except (FileNotFoundError, SyntaxError):
+            counts["Docstrings stale"] += len(records)
+            continue
+        if not edits:
+            continue
+
+        if overwrite:
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write("\n".join(apply_edits(lines, edits)))
+        else:
+            file_patch = unified_diff(lines, edits, file)
+            if file_patch:
+                patch.extend(file_patch)
+                patch.append("\n")
+        counts["Files changed"] += 1
+    return patch, counts
@@ -0,0 +1,7 @@
+from .balanced_backend import BalancedBackend  # noqa F401
+from .balanced_backend import Endpoint  # noqa F401
+from .base import Completion  # noqa F401
+from .base import CompletionBackend  # noqa F401
+from .http_backend import OpenAICompatibleBackend  # noqa F401
+from .langchain_backend import LangChainBackend  # noqa F401
+from .pool import HTTPClientPool  # noqa F401
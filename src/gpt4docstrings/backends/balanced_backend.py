@@ -0,0 +1,304 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterator
+from typing import Callable
+from typing import List
+from typing import Sequence
+
+import aiohttp
+import attr
+
+from gpt4docstrings.backends.base import Completion
+from gpt4docstrings.backends.base import CompletionBackend
+from gpt4docstrings.exceptions import BackendError
+from gpt4docstrings.exceptions import RateLimitError
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.scheduler import estimate_tokens
+
+DEFAULT_MAX_IN_FLIGHT = 16
+# Consecutive failures after which an endpoint is taken out of the pool
+MAX_CONSECUTIVE_FAILURES = 3
+# Seconds an unhealthy endpoint is left out, doubled for every further ejection
+BASE_COOLDOWN = 5.0
+MAX_COOLDOWN = 300.0
+# Statuses caused by the request itself: sending it elsewhere would fail the same way
+REQUEST_ERROR_STATUSES = (400, 413, 422)
+# Errors of an endpoint (network errors, 5xx, 429, bad credentials), not of the request
+ENDPOINT_ERRORS = (BackendError, aiohttp.ClientError, asyncio.TimeoutError)
+
+
+@attr.s
+class Endpoint:
+    """
+    A member of an endpoint pool: a base URL, its credentials and its quota.
+
+    Args:
+        base_url (str): The base URL of the OpenAI-compatible API.
+        api_key (str): The API key of the endpoint, if not the default one.
+        max_in_flight (int): The maximum number of requests in flight to the endpoint.
+        name (str): The name shown in the run summary. By default, the URL (and the
+            position of the endpoint, if several share it).
+    """
+
+    base_url = attr.ib()
+    api_key = attr.ib(default=None)
+    max_in_flight = attr.ib(default=DEFAULT_MAX_IN_FLIGHT)
+    name = attr.ib(default=None)
+
+
+def parse_endpoint(value: str) -> Endpoint:
+    """
+    Parses an endpoint such as "https://api.openai.com/v1,key=$OPENAI_KEY_2,max-in-flight=8".
+
+    The options after the URL are `key` (an API key, or `$NAME` to read it from the
+    environment variable `NAME`), `max-in-flight` and `name`.
+
+    Args:
+        value (str): The endpoint specification.
+
+    Returns:
+        Endpoint: The endpoint.
+
+    Raises:
+        ValueError: If the specification is malformed.
+    """
+    base_url, *options = (item.strip() for item in value.split(","))
+    if not base_url.startswith(("http://", "https://")):
+        raise ValueError(f"Invalid endpoint URL '{base_url}'")
+
+    endpoint = Endpoint(base_url)
+    for option in options:
+        key, sep, option_value = option.partition("=")
+        if not sep or not option_value:
+            raise ValueError(f"Invalid endpoint option '{option}'")
+        if key == "key":
+            if option_value.startswith("$"):
+                option_value = os.getenv(option_value[1:])
+                if not option_value:
+                    raise ValueError(
+                        f"The environment variable of '{option}' is not set"
+                    )
+            endpoint.api_key = option_value
+        elif key == "max-in-flight":
+            try:
+                endpoint.max_in_flight = int(option_value)
+            except ValueError:
+                raise ValueError(f"'{option}' must be an integer") from None
+            if endpoint.max_in_flight < 1:
+                raise ValueError(f"'{option}' must be positive")
+        elif key == "name":
+            endpoint.name = option_value
+        else:
+            raise ValueError(f"Unknown endpoint option '{key}'")
+    return endpoint
+
+
+def endpoint_names(endpoints: Sequence[Endpoint]) -> List[str]:
+    """Returns the names of the endpoints, numbering the unnamed ones sharing a URL."""
+    urls = [endpoint.base_url for endpoint in endpoints]
+    return [
+        endpoint.name
+        or (
+            f"{endpoint.base_url} #{i + 1}"
+            if urls.count(endpoint.base_url) > 1
+            else endpoint.base_url
+        )
+        for i, endpoint in enumerate(endpoints)
+    ]
+
+
+class _Member:
+    """The load and health of an endpoint of the pool."""
+
+    def __init__(self, name: str, backend: CompletionBackend, max_in_flight: int):
+        self.name = name
+        self.backend = backend
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.unhealthy_until = 0.0
+
+    @property
+    def load(self) -> float:
+        return self.in_flight / self.max_in_flight
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+
+class BalancedBackend(CompletionBackend):
+    """
+    A backend balancing the requests of a model across a pool of endpoints.
+
+    Every request goes to the least-loaded healthy endpoint (the one with the fewest
+    requests in flight relative to its quota), and waits if all of them are at their
+    quota. When an endpoint fails, the request is sent to the next one; after
+    `MAX_CONSECUTIVE_FAILURES` failures in a row, or a rate-limit error, the endpoint is
+    left out for a cooldown that doubles at every ejection. If every endpoint is
+    unhealthy, the one that recovers first is tried anyway. Errors caused by the request
+    itself (e.g. a prompt that's too long) are raised without failing over.
+
+    Args:
+        model_name (str): The name of the model.
+        endpoints (Sequence[Endpoint]): The pool of endpoints.
+        backend_factory (Callable[[Endpoint], CompletionBackend]): Creates the backend
+            of an endpoint.
+        report (RunReport): The report collecting the per-endpoint throughput.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        endpoints: Sequence[Endpoint],
+        backend_factory: Callable[[Endpoint], CompletionBackend],
+        report: RunReport = None,
+    ):
+        if not endpoints:
+            raise ValueError("The endpoint pool is empty")
+        self.model_name = model_name
+        self.report = report or RunReport()
+        self.members = [
+            _Member(name, backend_factory(endpoint), endpoint.max_in_flight)
+            for name, endpoint in zip(endpoint_names(endpoints), endpoints)
+        ]
+        self._waiters: List[asyncio.Future] = []
+
+    def _select(self, tried: List[_Member]) -> _Member:
+        """Returns the member a request is sent to, or `None` if all are at their quota."""
+        now = time.monotonic()
+        candidates = [m for m in self.members if m not in tried] or self.members
+        healthy = [m for m in candidates if m.healthy(now)]
+        if not healthy:
+            # Rather than failing the request, probe the endpoint recovering first
+            healthy = [min(candidates, key=lambda m: m.unhealthy_until)]
+        available = [m for m in healthy if m.in_flight < m.max_in_flight]
+        if not available:
+            return None
+        return min(available, key=lambda m: m.load)
+
+    async def _acquire(self, tried: List[_Member]) -> _Member:
+        while True:
+            member = self._select(tried)
+            if member is not None:
+                member.in_flight += 1
+                return member
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def _release(self, member: _Member):
+        member.in_flight -= 1
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _succeeded(self, member: _Member, elapsed: float, completion_tokens: int):
+        member.consecutive_failures = 0
+        member.ejections = 0
+        stats = self.report.endpoint_stats(member.name)
+        stats.requests += 1
+        stats.elapsed += elapsed
+        stats.completion_tokens += completion_tokens
+
+    def _failed(self, member: _Member, error: Exception) -> bool:
+        """Records the failure of an endpoint and tells whether to fail over."""
+        if getattr(error, "status", None) in REQUEST_ERROR_STATUSES:
+            return False
+
+        member.consecutive_failures += 1
+        stats = self.report.endpoint_stats(member.name)
+        stats.failures += 1
+        if (
+            isinstance(error, RateLimitError)
+            or member.consecutive_failures >= MAX_CONSECUTIVE_FAILURES
+        ):
+            cooldown = min(BASE_COOLDOWN * 2**member.ejections, MAX_COOLDOWN)
+            member.unhealthy_until = time.monotonic() + cooldown
+            member.ejections += 1
+            member.consecutive_failures = 0
+            stats.ejections += 1
+        return len(self.members) > 1
+
+    async def complete(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        stop: List[str] = None,
+        json_mode: bool = False,
+    ) -> Completion:
+        tried = []
+        while True:
+            member = await self._acquire(tried)
+            tried.append(member)
+            start = time.monotonic()
+            try:
+                completion = await member.backend.complete(
+                    prompt, max_tokens=max_tokens, stop=stop, json_mode=json_mode
+                )
+            except ENDPOINT_ERRORS as e:
+                if not self._failed(member, e) or len(tried) >= len(self.members):
+                    raise
+                self.report.incr("Requests failed over")
+                continue
+            finally:
+                self._release(member)
+
+            self._succeeded(
+                member,
+                time.monotonic() - start,
+                completion.completion_tokens or estimate_tokens(completion.text),
+            )
+            return completion
+
+    async def stream(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        stop: List[str] = None,
+        json_mode: bool = False,
+    ) -> AsyncIterator[str]:
+        tried = []
+        while True:
+            member = await self._acquire(tried)
+            tried.append(member)
+            start = time.monotonic()
+            received = []
+            try:
+                stream = member.backend.stream(
+                    prompt, max_tokens=max_tokens, stop=stop, json_mode=json_mode
+                )
+                try:
+                    async for chunk in stream:
+                        received.append(chunk)
+                        yield chunk
+                finally:
+                    await stream.aclose()
+            except GeneratorExit:
+                # The consumer stopped the stream early (e.g. once the docstring is complete)
+                self._succeeded(
+                    member, time.monotonic() - start, estimate_tokens("".join(received))
+                )
+                raise
+            except ENDPOINT_ERRORS as e:
+                # Once a chunk was passed on, the request can't be sent elsewhere
+                if (
+                    received
+                    or not self._failed(member, e)
+                    or len(tried) >= len(self.members)
+                ):
+                    raise
+                self.report.incr("Requests failed over")
+                continue
+            finally:
+                self._release(member)
+
+            self._succeeded(
+                member, time.monotonic() - start, estimate_tokens("".join(received))
+            )
+            return
@@ -0,0 +1,95 @@
+import abc
+from typing import AsyncIterator
+from typing import List
+
+import attr
+
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+
+@attr.s
+class Completion:
+    """
+    A chat completion returned by a backend.
+
+    Args:
+        text (str): The content of the completion.
+        finish_reason (str): Why the completion ended ("stop", "length", ...), if known.
+        prompt_tokens (int): Tokens of the prompt, if reported by the backend.
+        completion_tokens (int): Tokens of the completion, if reported by the backend.
+    """
+
+    text = attr.ib()
+    finish_reason = attr.ib(default=None)
+    prompt_tokens = attr.ib(default=None)
+    completion_tokens = attr.ib(default=None)
+
+    @property
+    def truncated(self) -> bool:
+        """Whether the completion was cut by its `max_tokens` budget."""
+        return self.finish_reason == "length"
+
+
+class CompletionBackend(abc.ABC):
+    """
+    An abstract base class for the chat models used by the docstring generators and
+    translators.
+
+    Attributes:
+        model_name (str): The name of the model.
+        max_tokens (int): The default completion-length budget, if any.
+    """
+
+    model_name: str = None
+    max_tokens: int = None
+
+    @abc.abstractmethod
+    async def complete(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        stop: List[str] = None,
+        json_mode: bool = False,
+    ) -> Completion:
+        """
+        Requests a single-message chat completion.
+
+        Args:
+            prompt (str): The content of the user message.
+            max_tokens (int): The completion-length budget, if any.
+            stop (List[str]): Stop sequences sent with the request.
+            json_mode (bool): If `True`, the model is constrained to answer with a JSON
+                object (OpenAI's `response_format`).
+
+        Returns:
+            Completion: The completion and its usage data.
+        """
+        raise NotImplementedError("Method `complete` is not implemented.")
+
+    @abc.abstractmethod
+    def stream(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        stop: List[str] = None,
+        json_mode: bool = False,
+    ) -> AsyncIterator[str]:
+        """
+        Streams a single-message chat completion.
+
+        Closing the returned async generator cancels the request.
+
+        Args:
+            prompt (str): The content of the user message.
+            max_tokens (int): The completion-length budget, if any.
+            stop (List[str]): Stop sequences sent with the request.
+            json_mode (bool): If `True`, the model is constrained to answer with a JSON
+                object (OpenAI's `response_format`).
+
+        Returns:
+            AsyncIterator[str]: The chunks of the completion.
+        """
+        raise NotImplementedError("Method `stream` is not implemented.")
+
+    async def aclose(self):
+        """Releases the resources (e.g., connections) held by the backend."""
@@ -0,0 +1,60 @@
+import hashlib
+from typing import AsyncIterator
+from typing import Dict
+from typing import List
+
+from gpt4docstrings.backends.base import Completion
+from gpt4docstrings.backends.base import CompletionBackend
+from gpt4docstrings.exceptions import BackendError
+
+
+def batch_request_id(model_name: str, prompt: str) -> str:
+    """
+    Returns the `custom_id` of the batch request sending `prompt` to `model_name`.
+
+    Identical prompts share their id, so they're requested once per batch.
+    """
+    digest = hashlib.sha256(f"{model_name}\0{prompt}".encode()).hexdigest()
+    return f"gpt4docstrings-{digest[:40]}"
+
+
+class BatchResultsBackend(CompletionBackend):
+    """
+    A backend answering from the results of a batch job, without any request.
+
+    The answer to a prompt is looked up by its batch request id, so the prompts must be
+    rendered exactly as they were when the batch was submitted.
+
+    Args:
+        model_name (str): The name of the model.
+        results (Dict[str, Completion]): The completions of the batch, by request id.
+    """
+
+    def __init__(self, model_name: str, results: Dict[str, Completion]):
+        self.model_name = model_name
+        self.results = results
+
+    async def complete(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        stop: List[str] = None,
+        json_mode: bool = False,
+    ) -> Completion:
+        try:
+            return self.results[batch_request_id(self.model_name, prompt)]
+        except KeyError:
+            raise BackendError(
+                "The batch has no result for this prompt (was the code changed since "
+                "it was submitted?)"
+            ) from None
+
+    async def stream(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        stop: List[str] = None,
+        json_mode: bool = False,
+    ) -> AsyncIterator[str]:
+        completion = await self.complete(prompt, max_tokens, stop, json_mode)
+        yield completion.text
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator
+from typing import Dict
+from typing import List
+
+import aiohttp
+
+from gpt4docstrings.backends.base import Completion
+from gpt4docstrings.backends.base import CompletionBackend
+from gpt4docstrings.backends.base import JSON_RESPONSE_FORMAT
+from gpt4docstrings.backends.pool import DEFAULT_CONNECT_TIMEOUT
+from gpt4docstrings.backends.pool import DEFAULT_TIMEOUT
+from gpt4docstrings.backends.pool import HTTPClientPool
+from gpt4docstrings.exceptions import BackendError
+from gpt4docstrings.exceptions import RateLimitError
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+# Server errors and connection failures are retried with exponential backoff, as the
+# `openai` client does for the langchain backend
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 8.0
+
+
+class OpenAICompatibleBackend(CompletionBackend):
+    """
+    A thin async HTTP backend for any OpenAI-compatible chat completions endpoint.
+
+    It talks to `{base_url}/chat/completions` directly, so it works with OpenAI as well
+    as with local inference servers exposing the same API.
+
+    Args:
+        model_name (str): The name of the model.
+        api_key (str): The API key, sent as a bearer token. Optional for local servers.
+        base_url (str): The base URL of the API.
+        timeout (float): Maximum seconds for a whole request (or stream), if the backend
+            has its own pool.
+        connect_timeout (float): Maximum seconds to establish a connection, if the backend
+            has its own pool.
+        temperature (float): The sampling temperature.
+        max_tokens (int): The default completion-length budget, if any.
+        pool (HTTPClientPool): A connection pool shared with other components. The
+            backend doesn't close it. By default, the backend has its own pool.
+        max_retries (int): How many times a request failing with a server error (5xx)
+            or a connection error is sent again.
+        retry_delay (float): Seconds before the first retry, doubled for every further one.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        api_key: str = None,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        temperature: float = 1.0,
+        max_tokens: int = None,
+        pool: HTTPClientPool = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+    ):
+        self.model_name = model_name
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self.owns_pool = pool is None
+        self.pool = pool or HTTPClientPool(
+            timeout=timeout, connect_timeout=connect_timeout
+        )
+        # The session may be shared, so the credentials are sent with every request
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _payload(
+        self,
+        prompt: str,
+        max_tokens: int,
+        stop: List[str],
+        stream: bool,
+        json_mode: bool = False,
+    ) -> Dict:
+        payload = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+        }
+        max_tokens = max_tokens or self.max_tokens
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        if stop:
+            payload["stop"] = stop
+        if stream:
+            payload["stream"] = True
+        if json_mode:
+            payload["response_format"] = JSON_RESPONSE_FORMAT
+        return payload
+
+    @staticmethod
+    async def _raise_for_status(response: aiohttp.ClientResponse):
+        if response.status >= 400:
+            body = await response.text()
+            error = RateLimitError if response.status == 429 else BackendError
+            raise error(
+                f"{response.method} {response.url} failed with status "
+                f"{response.status}: {body[:500]}",
+                status=response.status,
+            )
+
+    async def _post(self, payload: Dict) -> aiohttp.ClientResponse:
+        """
+        Sends a request, retrying server errors and connection failures with backoff.
+
+        Other failures are raised at once: client errors would fail the same way again,
+        and rate limits and timeouts are handled by the callers.
+        """
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self.pool.session.post(
+                    self.url, json=payload, headers=self.headers
+                )
+            except aiohttp.ClientError as e:
+                if last_attempt or isinstance(e, asyncio.TimeoutError):
+                    raise
+                reason = str(e) or type(e).__name__
+            else:
+                if response.status < 500 or last_attempt:
+                    if response.status >= 400:
+                        # The connection goes back to the pool even if the body can't
+                        # be read
+                        async with response:
+                            await self._raise_for_status(response)
+                    return response
+                response.release()
+                reason = f"status {response.status}"
+
+            delay = min(self.retry_delay * 2**attempt, MAX_RETRY_DELAY)
+            logging.warning(f"POST {self.url} failed ({reason}), retrying in {delay}s")
+            await asyncio.sleep(delay)
+
+    async def complete(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        stop: List[str] = None,
+        json_mode: bool = False,
+    ) -> Completion:
+        payload = self._payload(prompt, max_tokens, stop, False, json_mode)
+        async with await self._post(payload) as response:
+            data = await response.json(content_type=None)
+
+        choice = data["choices"][0]
+        usage = data.get("usage") or {}
+        return Completion(
+            text=choice["message"].get("content") or "",
+            finish_reason=choice.get("finish_reason"),
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+        )
+
+    async def stream(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        stop: List[str] = None,
+        json_mode: bool = False,
+    ) -> AsyncIterator[str]:
+        payload = self._payload(prompt, max_tokens, stop, True, json_mode)
+        # Leaving the context manager early releases (and cancels) the response
+        async with await self._post(payload) as response:
+            async for line in response.content:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[len(b"data:") :].strip()
+                if data == b"[DONE]":
+                    return
+
+                delta = json.loads(data)["choices"][0].get("delta") or {}
+                if delta.get("content"):
+                    yield delta["content"]
+
+    async def aclose(self):
+        if self.owns_pool:
+            await self.pool.aclose()
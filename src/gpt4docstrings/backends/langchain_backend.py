@@ -0,0 +1,73 @@
+from typing import AsyncIterator
+from typing import Dict
+from typing import List
+
+from langchain.chat_models import ChatOpenAI
+from langchain.schema import HumanMessage
+
+from gpt4docstrings.backends.base import Completion
+from gpt4docstrings.backends.base import CompletionBackend
+from gpt4docstrings.backends.base import JSON_RESPONSE_FORMAT
+
+
+class LangChainBackend(CompletionBackend):
+    """
+    A backend sending the requests through a langchain chat model.
+
+    Args:
+        model (ChatOpenAI): The chat model.
+    """
+
+    def __init__(self, model: ChatOpenAI):
+        self.model = model
+
+    @property
+    def model_name(self) -> str:
+        return self.model.model_name
+
+    @property
+    def max_tokens(self) -> int:
+        return self.model.max_tokens
+
+    @staticmethod
+    def _request_kwargs(max_tokens: int, json_mode: bool) -> Dict:
+        """Returns the request parameters sent along the model's own ones."""
+        kwargs = {"max_tokens": max_tokens} if max_tokens else {}
+        if json_mode:
+            kwargs["response_format"] = JSON_RESPONSE_FORMAT
+        return kwargs
+
+    async def complete(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        stop: List[str] = None,
+        json_mode: bool = False,
+    ) -> Completion:
+        kwargs = self._request_kwargs(max_tokens, json_mode)
+        result = await self.model.agenerate(
+            [[HumanMessage(content=prompt)]], stop=stop, **kwargs
+        )
+        generation = result.generations[0][0]
+        usage = (result.llm_output or {}).get("token_usage") or {}
+        return Completion(
+            text=generation.text,
+            finish_reason=(generation.generation_info or {}).get("finish_reason"),
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+        )
+
+    async def stream(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        stop: List[str] = None,
+        json_mode: bool = False,
+    ) -> AsyncIterator[str]:
+        kwargs = self._request_kwargs(max_tokens, json_mode)
+        stream = self.model.astream(prompt, stop=stop, **kwargs)
+        try:
+            async for chunk in stream:
+                yield chunk.content
+        finally:
+            await stream.aclose()
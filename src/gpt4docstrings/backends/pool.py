@@ -0,0 +1,92 @@
+import aiohttp
+import attr
+
+DEFAULT_POOL_SIZE = 32
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_KEEPALIVE_TIMEOUT = 30.0
+
+
+@attr.s
+class ConnectionStats:
+    """
+    Connection reuse of an HTTP client pool.
+
+    Args:
+        requests (int): Number of requests sent.
+        connections_opened (int): Number of new connections (TCP + TLS handshakes).
+        connections_reused (int): Number of requests served by a kept-alive connection.
+    """
+
+    requests = attr.ib(default=0)
+    connections_opened = attr.ib(default=0)
+    connections_reused = attr.ib(default=0)
+
+
+class HTTPClientPool:
+    """
+    A keep-alive HTTP connection pool shared by every component of a run.
+
+    The session is created lazily, since it's bound to the running event loop, and it
+    must be closed with `aclose` at the end of the run. aiohttp speaks HTTP/1.1, so the
+    pool relies on keep-alive connections rather than HTTP/2 multiplexing.
+
+    Args:
+        pool_size (int): Maximum number of simultaneous connections.
+        timeout (float): Maximum seconds for a whole request (or stream).
+        connect_timeout (float): Maximum seconds to establish a connection.
+        keepalive_timeout (float): Seconds an idle connection is kept open.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+    ):
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self.stats = ConnectionStats()
+        self._session = None
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Counts the requests and whether they opened or reused a connection."""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.stats.requests += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.stats.connections_opened += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.stats.connections_reused += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The shared HTTP session."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    async def aclose(self):
+        """Closes the session and all its connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
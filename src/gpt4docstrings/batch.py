@@ -0,0 +1,462 @@
+import abc
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+
+import aiohttp
+import attr
+
+from gpt4docstrings.backends.base import Completion
+from gpt4docstrings.backends.base import CompletionBackend
+from gpt4docstrings.backends.base import JSON_RESPONSE_FORMAT
+from gpt4docstrings.backends.http_backend import DEFAULT_BASE_URL
+from gpt4docstrings.backends.http_backend import OpenAICompatibleBackend
+from gpt4docstrings.backends.pool import HTTPClientPool
+from gpt4docstrings.exceptions import BackendError
+from gpt4docstrings.utils.token_budget import DOCSTRING_STOP_SEQUENCES
+
+DEFAULT_BATCH_DIR = ".gpt4docstrings_batch"
+REQUESTS_FILENAME = "requests.jsonl"
+RESULTS_FILENAME = "results.jsonl"
+STATE_FILENAME = "batch.json"
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_ENDPOINTS = ["openai", "local"]
+COMPLETION_WINDOW = "24h"
+# Statuses after which a batch won't change anymore
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def batch_request(
+    custom_id: str, model_name: str, prompt: str, json_mode: bool = False
+) -> Dict:
+    """
+    Returns a line of a batch request file (OpenAI's Batch API format).
+
+    No `max_tokens` budget is set: batches aren't latency-bound and the completion still
+    ends on the closing triple quotes of the docstring.
+
+    Args:
+        custom_id (str): The id the result is matched with.
+        model_name (str): The model the prompt is sent to.
+        prompt (str): The content of the user message.
+        json_mode (bool): If `True`, the answer is requested as a JSON object.
+
+    Returns:
+        Dict: The request.
+    """
+    body = {
+        "model": model_name,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 1.0,
+    }
+    if json_mode:
+        body["response_format"] = JSON_RESPONSE_FORMAT
+    else:
+        body["stop"] = DOCSTRING_STOP_SEQUENCES
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": body,
+    }
+
+
+def parse_batch_results(lines: Iterable[str]) -> Dict[str, Completion]:
+    """
+    Parses a batch results file (OpenAI's Batch API format).
+
+    Failed requests are left out, so their nodes fail when the batch is collected.
+
+    Args:
+        lines (Iterable[str]): The lines of the results file.
+
+    Returns:
+        Dict[str, Completion]: The completions, by request id.
+    """
+    results = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            continue
+        body = response["body"]
+        choice = body["choices"][0]
+        usage = body.get("usage") or {}
+        results[result["custom_id"]] = Completion(
+            text=choice["message"].get("content") or "",
+            finish_reason=choice.get("finish_reason"),
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+        )
+    return results
+
+
+@attr.s
+class BatchState:
+    """
+    The batch job submitted from a directory, saved until it's collected.
+
+    Args:
+        batch_id (str): The id of the batch job.
+        endpoint (str): The kind of batch endpoint ("openai" or "local").
+        requests (int): Number of requests of the batch.
+        submitted_at (float): When the batch was submitted (UNIX time).
+    """
+
+    batch_id = attr.ib()
+    endpoint = attr.ib()
+    requests = attr.ib()
+    submitted_at = attr.ib(factory=time.time)
+
+    @classmethod
+    def load(cls, batch_dir: str) -> "BatchState":
+        """Reads the state of the batch submitted from `batch_dir`."""
+        try:
+            with open(os.path.join(batch_dir, STATE_FILENAME), encoding="utf-8") as f:
+                return cls(**json.load(f))
+        except FileNotFoundError:
+            raise BackendError(
+                f"No batch has been submitted from {batch_dir}"
+            ) from None
+
+    def save(self, batch_dir: str):
+        """Writes the state into `batch_dir`."""
+        with open(os.path.join(batch_dir, STATE_FILENAME), "w", encoding="utf-8") as f:
+            json.dump(attr.asdict(self), f, indent=2)
+
+
+class BatchClient(abc.ABC):
+    """A batch-style endpoint, running many requests offline at a lower price."""
+
+    @abc.abstractmethod
+    async def submit(self, requests_path: str) -> str:
+        """
+        Submits a batch request file.
+
+        Args:
+            requests_path (str): The path of the JSONL request file.
+
+        Returns:
+            str: The id of the batch job.
+        """
+
+    @abc.abstractmethod
+    async def status(self, batch_id: str) -> str:
+        """Returns the status of a batch job (e.g. "in_progress", "completed")."""
+
+    @abc.abstractmethod
+    async def download(self, batch_id: str, results_path: str):
+        """
+        Downloads the results of a finished batch job.
+
+        Args:
+            batch_id (str): The id of the batch job.
+            results_path (str): Where the JSONL results file is written.
+
+        Raises:
+            BackendError: If the batch has no results.
+        """
+
+    async def aclose(self):
+        """Releases the resources (e.g., connections) held by the client."""
+
+
+class OpenAIBatchClient(BatchClient):
+    """
+    A client of OpenAI's Batch API (or any compatible API).
+
+    Args:
+        api_key (str): The API key, sent as a bearer token.
+        base_url (str): The base URL of the API.
+        pool (HTTPClientPool): A connection pool shared with other components. By
+            default, the client has its own pool.
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = DEFAULT_BASE_URL,
+        pool: HTTPClientPool = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.owns_pool = pool is None
+        self.pool = pool or HTTPClientPool()
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    async def _request(
+        self, method: str, path: str, **kwargs
+    ) -> aiohttp.ClientResponse:
+        response = await self.pool.session.request(
+            method, self.base_url + path, headers=self.headers, **kwargs
+        )
+        if response.status >= 400:
+            # The connection goes back to the pool even if the body can't be read
+            async with response:
+                body = await response.text(errors="replace")
+            raise BackendError(
+                f"{method} {path} failed with status {response.status}: {body[:500]}",
+                status=response.status,
+            )
+        return response
+
+    async def submit(self, requests_path: str) -> str:
+        form = aiohttp.FormData()
+        form.add_field("purpose", "batch")
+        with open(requests_path, "rb") as f:
+            form.add_field("file", f.read(), filename=os.path.basename(requests_path))
+        async with await self._request("POST", "/files", data=form) as response:
+            input_file_id = (await response.json())["id"]
+
+        batch = {
+            "input_file_id": input_file_id,
+            "endpoint": BATCH_ENDPOINT,
+            "completion_window": COMPLETION_WINDOW,
+        }
+        async with await self._request("POST", "/batches", json=batch) as response:
+            return (await response.json())["id"]
+
+    async def _batch(self, batch_id: str) -> Dict:
+        async with await self._request("GET", f"/batches/{batch_id}") as response:
+            return await response.json()
+
+    async def status(self, batch_id: str) -> str:
+        return (await self._batch(batch_id))["status"]
+
+    async def download(self, batch_id: str, results_path: str):
+        output_file_id = (await self._batch(batch_id)).get("output_file_id")
+        if not output_file_id:
+            raise BackendError(f"The batch {batch_id} has no results")
+        path = f"/files/{output_file_id}/content"
+        async with await self._request("GET", path) as response:
+            with open(results_path, "wb") as f:
+                async for chunk in response.content.iter_chunked(1 << 16):
+                    f.write(chunk)
+
+    async def aclose(self):
+        if self.owns_pool:
+            await self.pool.aclose()
+
+
+class LocalBatchClient(BatchClient):
+    """
+    A local stand-in for a batch endpoint, for tests and local inference servers.
+
+    The batches are stored in `directory` and run through regular completion backends
+    the first time their status is polled.
+
+    Args:
+        directory (str): Where the batches and their results are stored.
+        backend_factory (Callable[[str], CompletionBackend]): Creates the backend of a
+            model.
+        concurrency (int): Maximum number of requests in flight.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        backend_factory: Callable[[str], CompletionBackend],
+        concurrency: int = 8,
+    ):
+        self.directory = directory
+        self.backend_factory = backend_factory
+        self.concurrency = concurrency
+
+    def _path(self, batch_id: str, filename: str) -> str:
+        return os.path.join(self.directory, "batches", batch_id, filename)
+
+    async def submit(self, requests_path: str) -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex[:16]}"
+        os.makedirs(os.path.dirname(self._path(batch_id, "input.jsonl")))
+        with open(requests_path, encoding="utf-8") as src, open(
+            self._path(batch_id, "input.jsonl"), "w", encoding="utf-8"
+        ) as dst:
+            dst.write(src.read())
+        return batch_id
+
+    async def _answer(self, request: Dict, backends: Dict, semaphore) -> Dict:
+        body = request["body"]
+        model_name = body["model"]
+        if model_name not in backends:
+            backends[model_name] = self.backend_factory(model_name)
+        try:
+            async with semaphore:
+                completion = await backends[model_name].complete(
+                    body["messages"][0]["content"],
+                    max_tokens=body.get("max_tokens"),
+                    stop=body.get("stop"),
+                    json_mode="response_format" in body,
+                )
+        except Exception as e:
+            return {
+                "custom_id": request["custom_id"],
+                "response": None,
+                "error": str(e),
+            }
+
+        choice = {
+            "message": {"role": "assistant", "content": completion.text},
+            "finish_reason": completion.finish_reason,
+        }
+        usage = {
+            "prompt_tokens": completion.prompt_tokens,
+            "completion_tokens": completion.completion_tokens,
+        }
+        return {
+            "custom_id": request["custom_id"],
+            "response": {
+                "status_code": 200,
+                "body": {"choices": [choice], "usage": usage},
+            },
+            "error": None,
+        }
+
+    async def _process(self, batch_id: str):
+        with open(self._path(batch_id, "input.jsonl"), encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+
+        backends = {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            results = await asyncio.gather(
+                *(self._answer(request, backends, semaphore) for request in requests)
+            )
+        finally:
+            for backend in backends.values():
+                await backend.aclose()
+
+        with open(self._path(batch_id, "output.jsonl"), "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+    async def status(self, batch_id: str) -> str:
+        if not os.path.exists(self._path(batch_id, "input.jsonl")):
+            raise BackendError(f"Unknown batch {batch_id}")
+        if not os.path.exists(self._path(batch_id, "output.jsonl")):
+            await self._process(batch_id)
+        return "completed"
+
+    async def download(self, batch_id: str, results_path: str):
+        if not os.path.exists(self._path(batch_id, "output.jsonl")):
+            raise BackendError(f"The batch {batch_id} has no results")
+        with open(self._path(batch_id, "output.jsonl"), encoding="utf-8") as src, open(
+            results_path, "w", encoding="utf-8"
+        ) as dst:
+            dst.write(src.read())
+
+
+def make_batch_client(
+    endpoint: str,
+    batch_dir: str,
+    api_key: str = None,
+    base_url: str = None,
+    pool: HTTPClientPool = None,
+) -> BatchClient:
+    """
+    Creates the client of a batch endpoint.
+
+    Args:
+        endpoint (str): "openai" for OpenAI's Batch API, or "local" for a stand-in
+            running the batch through the chat completions endpoint.
+        batch_dir (str): The batch directory, where the local stand-in stores its batches.
+        api_key (str): The API key. Defaults to the `OPENAI_API_KEY` environment variable.
+        base_url (str): The base URL of the API.
+        pool (HTTPClientPool): A connection pool shared with other components, if any.
+
+    Returns:
+        BatchClient: The client.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    base_url = base_url or DEFAULT_BASE_URL
+    if endpoint not in BATCH_ENDPOINTS:
+        raise ValueError(
+            f"Batch endpoint must be one of the following: {BATCH_ENDPOINTS}"
+        )
+    if endpoint == "local":
+        return LocalBatchClient(
+            batch_dir,
+            lambda model_name: OpenAICompatibleBackend(
+                model_name, api_key=api_key, base_url=base_url, pool=pool
+            ),
+        )
+    return OpenAIBatchClient(api_key, base_url, pool=pool)
+
+
+async def submit_batch(
+    requests: Iterable[Dict], client: BatchClient, batch_dir: str, endpoint: str
+) -> BatchState:
+    """
+    Writes the batch request file into `batch_dir` and submits it.
+
+    Args:
+        requests (Iterable[Dict]): The batch requests.
+        client (BatchClient): The batch endpoint.
+        batch_dir (str): Where the request file and the batch state are saved.
+        endpoint (str): The kind of batch endpoint, saved to collect the batch later.
+
+    Returns:
+        BatchState: The submitted batch.
+    """
+    os.makedirs(batch_dir, exist_ok=True)
+    requests_path = os.path.join(batch_dir, REQUESTS_FILENAME)
+    count = 0
+    with open(requests_path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request) + "\n")
+            count += 1
+
+    results_path = os.path.join(batch_dir, RESULTS_FILENAME)
+    if os.path.exists(results_path):
+        # The results of a previous batch don't answer this one
+        os.remove(results_path)
+
+    state = BatchState(await client.submit(requests_path), endpoint, count)
+    state.save(batch_dir)
+    return state
+
+
+async def collect_batch(
+    client: BatchClient,
+    batch_dir: str,
+    poll_interval: float = 60.0,
+    wait: bool = True,
+) -> Optional[Dict[str, Completion]]:
+    """
+    Waits for the batch submitted from `batch_dir` and returns its results.
+
+    The results file is downloaded once, so a batch can be collected again offline.
+
+    Args:
+        client (BatchClient): The batch endpoint.
+        batch_dir (str): Where the batch was submitted from.
+        poll_interval (float): Seconds between two status checks.
+        wait (bool): If `False`, the status is checked once.
+
+    Returns:
+        Optional[Dict[str, Completion]]: The completions by request id, or `None` if the
+            batch isn't finished yet.
+
+    Raises:
+        BackendError: If the batch finished without results.
+    """
+    results_path = os.path.join(batch_dir, RESULTS_FILENAME)
+    if not os.path.exists(results_path):
+        state = BatchState.load(batch_dir)
+        status = await client.status(state.batch_id)
+        while wait and status not in TERMINAL_STATUSES:
+            await asyncio.sleep(poll_interval)
+            status = await client.status(state.batch_id)
+        if status not in TERMINAL_STATUSES:
+            return None
+        # Expired batches may still have the results of some requests
+        await client.download(state.batch_id, results_path)
+
+    with open(results_path, encoding="utf-8") as f:
+        return parse_batch_results(f)
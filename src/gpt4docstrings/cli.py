@@ -1,9 +1,195 @@
+import asyncio
+import json
 import os
 
 import click
+from colorama import Fore
+from tabulate import tabulate
 
 import gpt4docstrings
+from gpt4docstrings.artifact import apply_artifact
+from gpt4docstrings.artifact import DEFAULT_ARTIFACT_PATH
+from gpt4docstrings.backends import HTTPClientPool
+from gpt4docstrings.backends.balanced_backend import parse_endpoint
+from gpt4docstrings.backends.http_backend import DEFAULT_BASE_URL
+from gpt4docstrings.backends.pool import DEFAULT_POOL_SIZE
+from gpt4docstrings.backends.pool import DEFAULT_TIMEOUT
+from gpt4docstrings.batch import BATCH_ENDPOINTS
+from gpt4docstrings.batch import BatchState
+from gpt4docstrings.batch import collect_batch
+from gpt4docstrings.batch import DEFAULT_BATCH_DIR
+from gpt4docstrings.batch import make_batch_client
+from gpt4docstrings.batch import submit_batch
 from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.coverage import compute_coverage
+from gpt4docstrings.coverage import DEFAULT_CACHE_PATH
+from gpt4docstrings.docstrings_generators import OVERSIZED_POLICIES
+from gpt4docstrings.exceptions import BackendError
+from gpt4docstrings.exceptions import NoInputFilesError
+from gpt4docstrings.generate_docstrings import BACKENDS
+from gpt4docstrings.hedging import DEFAULT_MAX_HEDGE_RATE
+from gpt4docstrings.journal import DEFAULT_JOURNAL_PATH
+from gpt4docstrings.routing import parse_model_ladder
+from gpt4docstrings.scheduler import parse_context_window
+from gpt4docstrings.sharding import merge_patches
+from gpt4docstrings.sharding import parse_shard
+from gpt4docstrings.utils.discovery import discover_python_files
+from gpt4docstrings.utils.helpers import get_common_base
+
+PATCH_FILENAME = "gpt4docstring_docstring_generator_patch.diff"
+
+
+class DefaultCommandGroup(click.Group):
+    """
+    A command group that runs `default_command` when no subcommand is given.
+
+    A first argument naming both a subcommand and an existing path is ambiguous, and is
+    refused rather than guessed: the default command has to be given explicitly.
+    """
+
+    def __init__(self, *args, default_command: str = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        if args and args[0] in self.commands and os.path.exists(args[0]):
+            raise click.UsageError(
+                f"'{args[0]}' is both a command and a path. Use "
+                f"`{ctx.info_name} {self.default_command} {args[0]}` (or "
+                f"`./{args[0]}`) for the path, or run the command from another "
+                "directory.",
+                ctx,
+            )
+        if not args or (
+            args[0] not in self.commands and args[0] not in ("-h", "--help")
+        ):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultCommandGroup, default_command="run")
+@click.help_option("-h", "--help")
+def main():
+    """Generate docstrings for your Python code using GPT models."""
+
+
+def _parse_shard(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+
+
+def _parse_endpoints(ctx, param, value):
+    try:
+        return [parse_endpoint(endpoint) for endpoint in value]
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+
+
+def _parse_model_ladder(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return parse_model_ladder(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+
+
+def _parse_context_windows(ctx, param, value):
+    try:
+        return [parse_context_window(item) for item in value]
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+
+
+IGNORE_OPTIONS = [
+    click.option(
+        "-p",
+        "--ignore-private",
+        is_flag=True,
+        default=False,
+        show_default=False,
+        help=(
+            "Ignore private classes, methods, and functions starting with two "
+            "underscores.  [default: False]"
+        ),
+    ),
+    click.option(
+        "-s",
+        "--ignore-semiprivate",
+        is_flag=True,
+        default=False,
+        show_default=True,
+        help=(
+            "Ignore semiprivate classes, methods, and functions starting with a "
+            "single underscore."
+        ),
+    ),
+    click.option(
+        "-i",
+        "--ignore-init-method",
+        is_flag=True,
+        default=False,
+        show_default=True,
+        help="Ignore `__init__` method of classes.",
+    ),
+    click.option(
+        "-C",
+        "--ignore-nested-classes",
+        is_flag=True,
+        default=False,
+        show_default=True,
+        help="Ignore nested classes.",
+    ),
+    click.option(
+        "-n",
+        "--ignore-nested-functions",
+        is_flag=True,
+        default=False,
+        show_default=True,
+        help="Ignore nested functions and methods.",
+    ),
+    click.option(
+        "-P",
+        "--ignore-property-decorators",
+        is_flag=True,
+        default=False,
+        show_default=True,
+        help="Ignore methods with property setter/getter decorators.",
+    ),
+    click.option(
+        "-S",
+        "--ignore-setters",
+        is_flag=True,
+        default=False,
+        show_default=True,
+        help="Ignore methods with property setter decorators.",
+    ),
+]
+
+
+def _ignore_options(command):
+    """Adds the options selecting the ignored nodes, shared by several commands."""
+    for option in reversed(IGNORE_OPTIONS):
+        command = option(command)
+    return command
+
+
+def _config_from_options(options, **kwargs) -> GPT4DocstringsConfig:
+    """Builds the configuration of the ignored nodes from the command options."""
+    return GPT4DocstringsConfig(
+        ignore_private=options["ignore_private"],
+        ignore_semiprivate=options["ignore_semiprivate"],
+        ignore_init_method=options["ignore_init_method"],
+        ignore_nested_classes=options["ignore_nested_classes"],
+        ignore_nested_functions=options["ignore_nested_functions"],
+        ignore_property_setters=options["ignore_setters"],
+        ignore_property_decorators=options["ignore_property_decorators"],
+        **kwargs,
+    )
 
 
 @click.option(
@@ -13,6 +199,16 @@ from gpt4docstrings.config import GPT4DocstringsConfig
     default="gpt-3.5-turbo",
     help="The model to be used by `gpt4docstrings`. By default, `gpt-3.5-turbo`.",
 )
+@click.option(
+    "--model-ladder",
+    type=click.STRING,
+    default=None,
+    callback=_parse_model_ladder,
+    help=(
+        "Route each node to a model by complexity, from the cheapest to the strongest model "
+        "(e.g. `gpt-3.5-turbo:6,gpt-4`). Translations keep using `--model`."
+    ),
+)
 @click.option(
     "-t",
     "--translate",
@@ -21,6 +217,47 @@ from gpt4docstrings.config import GPT4DocstringsConfig
     show_default=True,
     help="If `True`, instead of creating new docstrings, it will translate the existing ones into the provided style",
 )
+@click.option(
+    "--no-local-translation",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Send every docstring to the model for translation, instead of converting well-formed ones locally.",
+)
+@click.option(
+    "--structured-output",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Request the docstrings as JSON objects (OpenAI's JSON mode), instead of free text.",
+)
+@click.option(
+    "--oversized",
+    type=click.Choice(OVERSIZED_POLICIES),
+    default="summarize",
+    show_default=True,
+    help=(
+        "What to do with nodes too large for the context window of the model: document "
+        "them from summaries of their body, or skip them."
+    ),
+)
+@click.option(
+    "--context-window",
+    type=click.STRING,
+    multiple=True,
+    callback=_parse_context_windows,
+    help=(
+        "Context window of `--model`, in tokens, or of another model of the ladder with "
+        "`MODEL=TOKENS`. Can be repeated. By default, the known window of each model."
+    ),
+)
+@click.option(
+    "--no-templates",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Send every node to the model, instead of documenting trivial ones (plain __init__, getters, dunders, wrappers) from templates.",
+)
 @click.option(
     "-st",
     "--style",
@@ -64,67 +301,155 @@ from gpt4docstrings.config import GPT4DocstringsConfig
     show_default=True,
     help="If `True`, it will directly write the docstrings into the files (it will not generate git patches)",
 )
+@_ignore_options
 @click.option(
-    "-p",
-    "--ignore-private",
-    is_flag=True,
-    default=False,
-    show_default=False,
-    help=(
-        "Ignore private classes, methods, and functions starting with two "
-        "underscores.  [default: False]"
-    ),
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Number of files documented concurrently while the rest of the tree is being read.",
 )
 @click.option(
-    "-s",
-    "--ignore-semiprivate",
+    "--stream",
     is_flag=True,
     default=False,
     show_default=True,
-    help=(
-        "Ignore semiprivate classes, methods, and functions starting with a "
-        "single underscore."
-    ),
+    help="Stream the completions and stop them as soon as the docstring is complete.",
 )
 @click.option(
-    "-i",
-    "--ignore-init-method",
+    "--resume",
     is_flag=True,
     default=False,
     show_default=True,
-    help="Ignore `__init__` method of classes.",
+    help="Replay the journal of an interrupted run and skip the nodes it already documented.",
 )
 @click.option(
-    "-C",
-    "--ignore-nested-classes",
-    is_flag=True,
-    default=False,
+    "--journal",
+    type=click.Path(dir_okay=False, writable=True),
+    default=DEFAULT_JOURNAL_PATH,
     show_default=True,
-    help="Ignore nested classes.",
+    help="Path of the journal where completed docstrings are saved as they arrive.",
 )
 @click.option(
-    "-n",
-    "--ignore-nested-functions",
+    "--max-concurrent-requests",
+    type=click.IntRange(min=1),
+    default=32,
+    show_default=True,
+    help="Maximum number of model requests in flight.",
+)
+@click.option(
+    "--adaptive-concurrency",
     is_flag=True,
     default=False,
     show_default=True,
-    help="Ignore nested functions and methods.",
+    help=(
+        "Adapt the number of requests in flight (up to `--max-concurrent-requests`) to the "
+        "observed latency and rate limits: raised while the latency stays flat, cut on "
+        "429s, timeouts and latency spikes."
+    ),
+)
+@click.option(
+    "--max-in-flight-per-file",
+    type=click.IntRange(min=1),
+    default=64,
+    show_default=True,
+    help="Maximum number of nodes of a single file being documented at the same time.",
+)
+@click.option(
+    "--max-time",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Stop sending requests after this many seconds and write the partial results.",
+)
+@click.option(
+    "--max-requests",
+    type=click.IntRange(min=0),
+    default=None,
+    help=(
+        "Stop after this many model requests (retries and hedges included) and write "
+        "the partial results."
+    ),
+)
+@click.option(
+    "--max-cost",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Stop once the estimated cost (USD) of the run would exceed this amount.",
 )
 @click.option(
-    "-P",
-    "--ignore-property-decorators",
+    "--backend",
+    type=click.Choice(BACKENDS),
+    default="langchain",
+    show_default=True,
+    help="How the model requests are sent: through langchain, or a lightweight HTTP client.",
+)
+@click.option(
+    "--base-url",
+    type=click.STRING,
+    default=None,
+    help=(
+        "Base URL of an OpenAI-compatible API (e.g. a local inference server) for the "
+        f"`http` backend. By default, `{DEFAULT_BASE_URL}`."
+    ),
+)
+@click.option(
+    "--endpoint",
+    multiple=True,
+    callback=_parse_endpoints,
+    help=(
+        "An endpoint of a pool the requests are balanced across, as "
+        "`URL[,key=KEY|$ENV_VAR][,max-in-flight=N][,name=NAME]`. Can be repeated. Each "
+        "request goes to the least-loaded healthy endpoint and fails over to the next "
+        "one on errors. Implies the `http` backend."
+    ),
+)
+@click.option(
+    "--request-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_TIMEOUT,
+    show_default=True,
+    help="Maximum seconds for a single model request, whatever the backend.",
+)
+@click.option(
+    "--hedge",
     is_flag=True,
     default=False,
     show_default=True,
-    help="Ignore methods with property setter/getter decorators.",
+    help=(
+        "Send a duplicate of the requests slower than the p95 latency of their model, "
+        "keep the first answer and cancel the other."
+    ),
+)
+@click.option(
+    "--max-hedge-rate",
+    type=click.FloatRange(min=0, max=1),
+    default=DEFAULT_MAX_HEDGE_RATE,
+    show_default=True,
+    help="Maximum ratio of hedged requests to requests.",
 )
 @click.option(
-    "-S",
-    "--ignore-setters",
+    "--http-pool-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_POOL_SIZE,
+    show_default=True,
+    help="Maximum number of keep-alive connections shared by all the model requests.",
+)
+@click.option(
+    "--no-gitignore",
     is_flag=True,
     default=False,
     show_default=True,
-    help="Ignore methods with property setter decorators.",
+    help="Also document files ignored by `.gitignore` files.",
+)
+@click.option(
+    "--shard",
+    type=click.STRING,
+    default=None,
+    callback=_parse_shard,
+    help=(
+        "Only document the i-th of N deterministic subsets of the files (e.g. `--shard 2/4`). "
+        "Combine the shard patches with `gpt4docstrings merge-patches`."
+    ),
 )
 @click.help_option("-h", "--help")
 @click.argument(
@@ -140,23 +465,20 @@ from gpt4docstrings.config import GPT4DocstringsConfig
     is_eager=True,
     nargs=-1,
 )
-@click.command()
-def main(paths, **kwargs):
+@main.command(name="run")
+def run(paths, **kwargs):
+    """Generate (or translate) the docstrings of PATHS. This is the default command."""
+    _gpt4docstrings_from_options(paths, kwargs).run()
+
+
+def _gpt4docstrings_from_options(paths, kwargs, **overrides):
+    """Creates the GPT4Docstrings instance configured by the options of `run`."""
     if not paths:
         paths = (os.path.abspath(os.getcwd()),)
 
-    config = GPT4DocstringsConfig(
-        overwrite=kwargs["overwrite"],
-        ignore_private=kwargs["ignore_private"],
-        ignore_semiprivate=kwargs["ignore_semiprivate"],
-        ignore_init_method=kwargs["ignore_init_method"],
-        ignore_nested_classes=kwargs["ignore_nested_classes"],
-        ignore_nested_functions=kwargs["ignore_nested_functions"],
-        ignore_property_setters=kwargs["ignore_setters"],
-        ignore_property_decorators=kwargs["ignore_property_decorators"],
-    )
+    config = _config_from_options(kwargs, overwrite=kwargs["overwrite"])
 
-    gpt4docs = gpt4docstrings.GPT4Docstrings(
+    return gpt4docstrings.GPT4Docstrings(
         paths=paths,
         excluded=kwargs["exclude"],
         model=kwargs["model"],
@@ -165,5 +487,377 @@ def main(paths, **kwargs):
         api_key=kwargs["api_key"],
         verbose=kwargs["verbose"],
         config=config,
+        workers=kwargs["workers"],
+        stream=kwargs["stream"],
+        resume=kwargs["resume"],
+        journal_path=kwargs["journal"],
+        max_concurrent_requests=kwargs["max_concurrent_requests"],
+        max_in_flight_per_file=kwargs["max_in_flight_per_file"],
+        max_time=kwargs["max_time"],
+        max_requests=kwargs["max_requests"],
+        max_cost=kwargs["max_cost"],
+        shard=kwargs["shard"],
+        respect_gitignore=not kwargs["no_gitignore"],
+        model_ladder=kwargs["model_ladder"],
+        backend=kwargs["backend"],
+        base_url=kwargs["base_url"],
+        endpoints=kwargs["endpoint"] or None,
+        request_timeout=kwargs["request_timeout"],
+        http_pool_size=kwargs["http_pool_size"],
+        local_translation=not kwargs["no_local_translation"],
+        templates=not kwargs["no_templates"],
+        structured_output=kwargs["structured_output"],
+        hedge=kwargs["hedge"],
+        max_hedge_rate=kwargs["max_hedge_rate"],
+        oversized=kwargs["oversized"],
+        context_windows={
+            model_name or kwargs["model"]: window
+            for model_name, window in kwargs["context_window"]
+        },
+        adaptive_concurrency=kwargs["adaptive_concurrency"],
+        **overrides,
+    )
+
+
+BATCH_OPTIONS = [
+    click.Option(
+        ["--batch-dir"],
+        type=click.Path(file_okay=False, writable=True),
+        default=DEFAULT_BATCH_DIR,
+        show_default=True,
+        help="Where the batch request file, its results and the batch id are saved.",
+    ),
+    click.Option(
+        ["--batch-endpoint"],
+        type=click.Choice(BATCH_ENDPOINTS),
+        default="openai",
+        show_default=True,
+        help=(
+            "OpenAI's Batch API (at `--base-url`), or a local stand-in sending the "
+            "requests to the chat completions endpoint of `--base-url`."
+        ),
+    ),
+]
+COLLECT_OPTIONS = [
+    click.Option(
+        ["--poll-interval"],
+        type=click.FloatRange(min=0),
+        default=60.0,
+        show_default=True,
+        help="Seconds between two checks of the status of the batch.",
+    ),
+    click.Option(
+        ["--no-wait"],
+        is_flag=True,
+        default=False,
+        show_default=True,
+        help="Check the status of the batch once, and exit with status 2 if it's not finished.",
+    ),
+]
+
+
+def _batch_client(endpoint, kwargs, pool):
+    return make_batch_client(
+        endpoint,
+        kwargs["batch_dir"],
+        api_key=kwargs["api_key"],
+        base_url=kwargs["base_url"],
+        pool=pool,
+    )
+
+
+def submit(paths, **kwargs):
+    """Send the requests of a run over PATHS as a single batch job (same options as `run`)."""
+    gpt4docs = _gpt4docstrings_from_options(paths, kwargs)
+
+    async def submit_requests():
+        async with gpt4docs:
+            client = _batch_client(kwargs["batch_endpoint"], kwargs, gpt4docs.http_pool)
+            return await submit_batch(
+                gpt4docs.iter_batch_requests(),
+                client,
+                kwargs["batch_dir"],
+                kwargs["batch_endpoint"],
+            )
+
+    try:
+        state = asyncio.run(submit_requests())
+    except (BackendError, NoInputFilesError) as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(
+        f"Batch {state.batch_id} submitted with {state.requests} requests. "
+        "Apply its docstrings with `gpt4docstrings collect` and the same options."
+    )
+
+
+def collect(paths, **kwargs):
+    """Apply the docstrings of the batch job sent by `submit`, with the same options."""
+    try:
+        state = BatchState.load(kwargs["batch_dir"])
+    except BackendError as e:
+        raise click.ClickException(str(e)) from e
+
+    async def collect_results():
+        pool = HTTPClientPool(timeout=kwargs["request_timeout"])
+        try:
+            return await collect_batch(
+                _batch_client(state.endpoint, kwargs, pool),
+                kwargs["batch_dir"],
+                poll_interval=kwargs["poll_interval"],
+                wait=not kwargs["no_wait"],
+            )
+        finally:
+            await pool.aclose()
+
+    try:
+        results = asyncio.run(collect_results())
+    except BackendError as e:
+        raise click.ClickException(str(e)) from e
+    if results is None:
+        click.echo(f"Batch {state.batch_id} isn't finished yet.")
+        raise SystemExit(2)
+
+    # Every request of the run is answered from the results, without any model client
+    _gpt4docstrings_from_options(paths, kwargs, batch_results=results).run()
+
+
+GENERATE_OPTIONS = [
+    click.Option(
+        ["-o", "--output"],
+        type=click.Path(dir_okay=False, writable=True),
+        default=DEFAULT_ARTIFACT_PATH,
+        show_default=True,
+        help="Path of the JSONL artifact the docstrings are written to.",
+    ),
+]
+
+
+def generate(paths, **kwargs):
+    """Write the docstrings of a run over PATHS to an artifact, leaving the files untouched."""
+    _gpt4docstrings_from_options(paths, kwargs, artifact_path=kwargs["output"]).run()
+    click.echo(
+        f"Docstrings written to {kwargs['output']}. "
+        f"Apply them with `gpt4docstrings apply {kwargs['output']}`."
+    )
+
+
+for _name, _callback, _options in (
+    ("submit", submit, BATCH_OPTIONS),
+    ("collect", collect, BATCH_OPTIONS + COLLECT_OPTIONS),
+    ("generate", generate, GENERATE_OPTIONS),
+):
+    main.add_command(
+        click.Command(
+            _name,
+            callback=_callback,
+            params=[*run.params, *_options],
+            help=_callback.__doc__,
+            context_settings={"help_option_names": ["-h", "--help"]},
+        )
     )
-    gpt4docs.run()
+
+
+@main.command(name="apply")
+@click.help_option("-h", "--help")
+@click.argument(
+    "artifact",
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+)
+@click.option(
+    "-w",
+    "--overwrite",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="If `True`, the files are overwritten. Otherwise, a patch is written to `--output`.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default=PATCH_FILENAME,
+    show_default=True,
+    help="Path of the patch.",
+)
+@click.option(
+    "--root",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="Directory the files of the artifact are relative to. By default, the current one.",
+)
+def apply_command(artifact, overwrite, output, root):
+    """Apply the docstrings of an ARTIFACT written by `generate`, without any model.
+
+    Nodes whose code changed since the artifact was generated are skipped.
+    """
+    patch, counts = apply_artifact(artifact, overwrite=overwrite, root=root)
+
+    rows = [
+        [name, counts[name]]
+        for name in (
+            "Docstrings applied",
+            "Docstrings stale",
+            "Translations identical to the original",
+            "Files changed",
+        )
+    ]
+    click.echo(Fore.GREEN + tabulate(rows, ["", "Count"], tablefmt="outline"))
+    if patch:
+        with open(output, "w", encoding="utf-8") as f:
+            f.writelines(patch)
+        click.echo(f"Patch written to {output}")
+
+
+@main.command(name="coverage")
+@click.help_option("-h", "--help")
+@click.argument(
+    "paths",
+    type=click.Path(
+        exists=True,
+        file_okay=True,
+        dir_okay=True,
+        writable=False,
+        readable=True,
+        resolve_path=True,
+    ),
+    nargs=-1,
+)
+@click.option(
+    "-e",
+    "--exclude",
+    multiple=True,
+    type=click.Path(resolve_path=True),
+    default=(),
+    help="Exclude PATHs of files and/or directories. Multiple `-e/--exclude` invocations supported.",
+)
+@_ignore_options
+@click.option(
+    "--fail-under",
+    type=click.FloatRange(min=0, max=100),
+    default=None,
+    help="Exit with status 1 if the coverage (in %) is below this value.",
+)
+@click.option(
+    "--json",
+    "as_json",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Print the report as JSON.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of processes parsing the files. By default, the number of CPUs.",
+)
+@click.option(
+    "--cache-path",
+    type=click.Path(dir_okay=False, writable=True),
+    default=DEFAULT_CACHE_PATH,
+    show_default=True,
+    help="Path of the cached node table, reused for the files unchanged since the last run.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Parse every file, without reading or writing the cached node table.",
+)
+@click.option(
+    "--no-gitignore",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Also report the files ignored by `.gitignore` files.",
+)
+def coverage_command(paths, **kwargs):
+    """Report the docstring coverage of PATHS, without any model."""
+    if not paths:
+        paths = (os.path.abspath(os.getcwd()),)
+
+    try:
+        filenames = list(
+            discover_python_files(
+                paths, kwargs["exclude"], respect_gitignore=not kwargs["no_gitignore"]
+            )
+        )
+    except NoInputFilesError as e:
+        raise click.ClickException(str(e)) from e
+
+    base = get_common_base(filenames) if filenames else ""
+    if os.path.isfile(base):
+        base = os.path.dirname(base)
+    report = compute_coverage(
+        filenames,
+        config=_config_from_options(kwargs),
+        jobs=kwargs["jobs"],
+        cache_path=None if kwargs["no_cache"] else kwargs["cache_path"],
+        base=base,
+    )
+    fail_under = kwargs["fail_under"]
+    failed = fail_under is not None and report.coverage < fail_under
+
+    if kwargs["as_json"]:
+        click.echo(json.dumps(report.to_dict(), indent=2))
+    else:
+        summary = report.to_dict()
+        headers = ["Covered", "Uncovered", "Total", "Coverage (%)"]
+        for title, rows in (
+            ("Node type", summary["node_types"]),
+            ("Package", summary["packages"]),
+        ):
+            table = [[name, *row.values()] for name, row in rows.items()]
+            click.echo(tabulate(table, [title, *headers], tablefmt="outline"))
+        for filename, error in summary["errors"].items():
+            click.echo(Fore.YELLOW + f"Couldn't parse {filename}: {error}")
+        color = Fore.RED if failed else Fore.GREEN
+        click.echo(
+            color
+            + f"Coverage: {report.coverage}% ({report.covered}/{report.total} nodes"
+            + f" in {len(report.files)} files, {report.cached} from the cache)"
+        )
+
+    if failed:
+        if not kwargs["as_json"]:
+            click.echo(f"Coverage is below the required {fail_under}%")
+        raise SystemExit(1)
+
+
+@main.command(name="merge-patches")
+@click.help_option("-h", "--help")
+@click.argument(
+    "patches",
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+    nargs=-1,
+    required=True,
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default=PATCH_FILENAME,
+    show_default=True,
+    help="Path of the merged patch.",
+)
+def merge_patches_command(patches, output):
+    """Merge the patches generated by the shards of a run into a single patch."""
+    contents = {}
+    for path in patches:
+        with open(path, encoding="utf-8") as f:
+            contents[path] = f.read()
+
+    try:
+        merged, report = merge_patches(contents)
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(merged)
+
+    headers = ["Patch", "Files", "Hunks", "Added lines", "Removed lines"]
+    report.append(["Total", *[sum(row[i] for row in report) for i in range(1, 5)]])
+    click.echo(Fore.GREEN + tabulate(report, headers, tablefmt="outline"))
+    click.echo(f"Merged patch written to {output}")
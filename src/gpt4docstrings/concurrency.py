@@ -0,0 +1,129 @@
+import logging
+import time
+from typing import Callable
+from typing import Dict
+
+import openai
+
+from gpt4docstrings.exceptions import RateLimitError
+from gpt4docstrings.report import RunReport
+
+# Errors telling that the API (or the quota shared with other jobs) is saturated
+RATE_LIMIT_ERRORS = (RateLimitError, openai.error.RateLimitError)
+
+DEFAULT_BACKOFF = 0.5
+# A latency this many times the baseline of its model is a spike
+DEFAULT_LATENCY_TOLERANCE = 2.0
+# Weight of the latest latency in the baseline (exponential moving average)
+BASELINE_WEIGHT = 0.1
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Tells whether a request failed because of the rate limit of the API."""
+    return isinstance(error, RATE_LIMIT_ERRORS)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD controller of the number of model requests in flight.
+
+    While the latency of the requests stays close to the baseline of their model, the
+    limit grows by one every answer until it's first cut (a slow start), and then by one
+    every `limit` answers. It's cut multiplicatively on rate-limit errors, timeouts and
+    latency spikes. Requests that were in flight when the limit was cut saw the same
+    congestion, so it's cut at most once per baseline latency. Every change is logged
+    and recorded in the run report.
+
+    Args:
+        max_limit (int): The maximum number of requests in flight.
+        min_limit (int): The minimum number of requests in flight.
+        initial_limit (int): The limit of the first requests. By default, a quarter of
+            `max_limit`.
+        backoff (float): The factor the limit is multiplied by when it's cut.
+        latency_tolerance (float): The ratio to the baseline from which a latency is a spike.
+        report (RunReport): The report the limit over time is recorded in.
+    """
+
+    def __init__(
+        self,
+        max_limit: int = 32,
+        min_limit: int = 1,
+        initial_limit: int = None,
+        backoff: float = DEFAULT_BACKOFF,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+        report: RunReport = None,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial_limit or max(min_limit, max_limit // 4))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.report = report or RunReport()
+        self.baselines: Dict[str, float] = {}
+        # Called when the limit changes, to dispatch the requests waiting for a slot
+        self.on_change: Callable[[], None] = None
+        self._start = time.monotonic()
+        self._last_cut = float("-inf")
+        self._slow_start = True
+
+    @property
+    def current(self) -> int:
+        """The number of requests allowed in flight."""
+        return int(self.limit)
+
+    def reset(self):
+        """Restarts the clock of the limit history, before a new run. The limit is kept."""
+        self._start = time.monotonic()
+        self._last_cut = float("-inf")
+        self._changed("run started")
+
+    def record_latency(self, key: str, latency: float):
+        """
+        Records the latency of an answered request, raising the limit unless it's a spike.
+
+        Args:
+            key (str): The latencies the request is compared with (e.g. the model name).
+            latency (float): Seconds until the request was answered.
+        """
+        baseline = self.baselines.get(key, latency)
+        if latency > self.latency_tolerance * baseline:
+            self._cut("latency spike", baseline)
+            return
+
+        self.baselines[key] = (
+            1 - BASELINE_WEIGHT
+        ) * baseline + BASELINE_WEIGHT * latency
+        before = self.current
+        step = 1 if self._slow_start else 1 / self.limit
+        self.limit = min(self.limit + step, self.max_limit)
+        if self.current != before:
+            self._changed("latency flat")
+
+    def record_overload(self, key: str = None, reason: str = "rate limited"):
+        """
+        Records a request rejected by the rate limit (or timed out), cutting the limit.
+
+        Args:
+            key (str): The model the request was sent to, if known.
+            reason (str): Why the limit is cut, for the logs and the report.
+        """
+        self._cut(reason, self.baselines.get(key, 0.0))
+
+    def _cut(self, reason: str, round_trip: float):
+        now = time.monotonic()
+        if now - self._last_cut < round_trip:
+            return
+        self._last_cut = now
+        self._slow_start = False
+        self.report.incr(f"Concurrency cuts ({reason})")
+        before = self.current
+        self.limit = max(self.limit * self.backoff, self.min_limit)
+        if self.current != before:
+            self._changed(reason)
+
+    def _changed(self, reason: str):
+        elapsed = time.monotonic() - self._start
+        self.report.add_concurrency_limit(elapsed, self.current)
+        logging.info(f"Concurrency limit: {self.current} at {elapsed:.1f} s ({reason})")
+        if self.on_change is not None:
+            self.on_change()
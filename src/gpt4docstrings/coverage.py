@@ -0,0 +1,285 @@
+import ast
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Sequence
+
+import attr
+
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.visit import GPT4DocstringsVisitor
+
+DEFAULT_CACHE_PATH = ".gpt4docstrings_coverage_cache.json"
+CACHE_VERSION = 1
+NODE_TYPES = ["Module", "ClassDef", "FunctionDef", "AsyncFunctionDef"]
+# Below this number of files, starting the worker processes costs more than it saves
+MIN_FILES_PER_PROCESS_POOL = 32
+
+
+@attr.s
+class FileCoverage:
+    """
+    Docstring coverage of a single file.
+
+    Args:
+        filename (str): The path of the file.
+        mtime_ns (int): Modification time of the file when it was parsed.
+        size (int): Size of the file when it was parsed.
+        counts (Dict[str, List[int]]): Covered and total nodes, by node type.
+        error (str): Why the file couldn't be parsed, if it failed.
+    """
+
+    filename = attr.ib()
+    mtime_ns = attr.ib()
+    size = attr.ib()
+    counts = attr.ib(factory=dict)
+    error = attr.ib(default=None)
+
+    @property
+    def covered(self) -> int:
+        """Number of documented nodes."""
+        return sum(covered for covered, _ in self.counts.values())
+
+    @property
+    def total(self) -> int:
+        """Number of nodes."""
+        return sum(total for _, total in self.counts.values())
+
+
+def _percentage(covered: int, total: int) -> float:
+    return round(100 * covered / total, 1) if total else 100.0
+
+
+def _row(covered: int, total: int) -> Dict:
+    return {
+        "covered": covered,
+        "uncovered": total - covered,
+        "total": total,
+        "coverage": _percentage(covered, total),
+    }
+
+
+def file_coverage(
+    filename: str, config: GPT4DocstringsConfig, stat: os.stat_result = None
+) -> FileCoverage:
+    """
+    Computes the docstring coverage of a file, honouring the `ignore_*` options.
+
+    Args:
+        filename (str): The path of the file.
+        config (GPT4DocstringsConfig): The configuration of the ignored nodes.
+        stat (os.stat_result): The stat of the file, if already known.
+
+    Returns:
+        FileCoverage: The covered and total nodes of the file, by node type.
+    """
+    stat = stat or os.stat(filename)
+    coverage = FileCoverage(filename, stat.st_mtime_ns, stat.st_size)
+    try:
+        with open(filename, encoding="utf-8") as f:
+            file_content = f.read()
+        tree = ast.parse(file_content)
+    except (SyntaxError, UnicodeDecodeError, ValueError) as e:
+        coverage.error = f"{type(e).__name__}: {e}"
+        return coverage
+
+    visitor = GPT4DocstringsVisitor(filename, config, file_content, analyze=False)
+    visitor.visit(tree)
+    for node in visitor.nodes:
+        if config.ignore_nested_functions and node.is_nested_func:
+            continue
+        if config.ignore_nested_classes and node.is_nested_cls:
+            continue
+        counts = coverage.counts.setdefault(node.node_type, [0, 0])
+        counts[0] += node.covered
+        counts[1] += 1
+    return coverage
+
+
+def _file_coverage_job(args) -> FileCoverage:
+    """Entry point of the worker processes."""
+    return file_coverage(*args)
+
+
+class CoverageCache:
+    """
+    The node table of the previous coverage runs, stored as JSON.
+
+    The entry of a file is reused as long as its modification time and size are
+    unchanged. The whole table is discarded when the `ignore_*` options change.
+
+    Args:
+        path (str): Path of the cache file.
+        config (GPT4DocstringsConfig): The configuration of the ignored nodes.
+    """
+
+    def __init__(self, path: str, config: GPT4DocstringsConfig):
+        self.path = path
+        self.config_key = attr.asdict(config)
+        self.entries: Dict[str, FileCoverage] = {}
+
+        try:
+            with open(path, encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return
+        if cache.get("version") != CACHE_VERSION or cache.get("config") != (
+            self.config_key
+        ):
+            return
+        for entry in cache.get("files", []):
+            self.entries[entry["filename"]] = FileCoverage(**entry)
+
+    def get(self, filename: str, stat: os.stat_result) -> Optional[FileCoverage]:
+        """Returns the cached coverage of a file, unless it has changed since."""
+        entry = self.entries.get(filename)
+        if entry is None:
+            return None
+        if entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+            return None
+        return entry
+
+    def save(self, files: Iterable[FileCoverage]):
+        """Replaces the cached table with the coverage of the last run."""
+        cache = {
+            "version": CACHE_VERSION,
+            "config": self.config_key,
+            "files": [attr.asdict(file) for file in files],
+        }
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+
+
+@attr.s
+class CoverageReport:
+    """
+    Docstring coverage of a set of files.
+
+    Args:
+        files (List[FileCoverage]): The coverage of every file.
+        base (str): The directory the packages are relative to.
+        cached (int): Number of files whose coverage was read from the cache.
+    """
+
+    files = attr.ib()
+    base = attr.ib(default="")
+    cached = attr.ib(default=0)
+
+    @property
+    def covered(self) -> int:
+        """Number of documented nodes."""
+        return sum(file.covered for file in self.files)
+
+    @property
+    def total(self) -> int:
+        """Number of nodes."""
+        return sum(file.total for file in self.files)
+
+    @property
+    def coverage(self) -> float:
+        """Percentage of documented nodes."""
+        return _percentage(self.covered, self.total)
+
+    def _relative(self, filename: str) -> str:
+        return os.path.relpath(filename, self.base) if self.base else filename
+
+    def by_package(self) -> Dict[str, Dict]:
+        """Returns the covered and uncovered nodes of every directory."""
+        packages = {}
+        for file in self.files:
+            package = os.path.dirname(self._relative(file.filename)) or "."
+            counts = packages.setdefault(package, [0, 0])
+            counts[0] += file.covered
+            counts[1] += file.total
+        return {package: _row(*counts) for package, counts in sorted(packages.items())}
+
+    def by_node_type(self) -> Dict[str, Dict]:
+        """Returns the covered and uncovered nodes of every node type."""
+        types = {}
+        for file in self.files:
+            for node_type, (covered, total) in file.counts.items():
+                counts = types.setdefault(node_type, [0, 0])
+                counts[0] += covered
+                counts[1] += total
+        return {
+            node_type: _row(*types[node_type])
+            for node_type in NODE_TYPES
+            if node_type in types
+        }
+
+    def to_dict(self) -> Dict:
+        """Returns the report as a JSON-serializable dictionary."""
+        return {
+            "summary": {**_row(self.covered, self.total), "files": len(self.files)},
+            "node_types": self.by_node_type(),
+            "packages": self.by_package(),
+            "files": {
+                self._relative(file.filename): _row(file.covered, file.total)
+                for file in self.files
+                if file.error is None
+            },
+            "errors": {
+                self._relative(file.filename): file.error
+                for file in self.files
+                if file.error is not None
+            },
+        }
+
+
+def compute_coverage(
+    filenames: Sequence[str],
+    config: GPT4DocstringsConfig = None,
+    jobs: int = None,
+    cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+    base: str = "",
+) -> CoverageReport:
+    """
+    Computes the docstring coverage of many files, without any model.
+
+    Unchanged files are read from the cache, and the others are parsed by a pool of
+    worker processes.
+
+    Args:
+        filenames (Sequence[str]): The Python files.
+        config (GPT4DocstringsConfig): The configuration of the ignored nodes.
+        jobs (int): Number of worker processes. Defaults to the number of CPUs.
+        cache_path (str): Path of the cache file, or `None` to disable the cache.
+        base (str): The directory the packages are relative to.
+
+    Returns:
+        CoverageReport: The coverage of every file.
+    """
+    config = config or GPT4DocstringsConfig()
+    cache = CoverageCache(cache_path, config) if cache_path else None
+
+    results = {}
+    pending = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        cached = cache.get(filename, stat) if cache else None
+        if cached is not None:
+            results[filename] = cached
+        else:
+            pending.append((filename, config, stat))
+    cached = len(results)
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(pending) >= MIN_FILES_PER_PROCESS_POOL:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(len(pending) // (jobs * 4), 1)
+            for coverage in executor.map(
+                _file_coverage_job, pending, chunksize=chunksize
+            ):
+                results[coverage.filename] = coverage
+    else:
+        for job in pending:
+            coverage = _file_coverage_job(job)
+            results[coverage.filename] = coverage
+
+    files = [results[filename] for filename in filenames]
+    if cache is not None:
+        cache.save(files)
+    return CoverageReport(files, base=base, cached=cached)
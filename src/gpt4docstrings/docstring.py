@@ -51,9 +51,9 @@ class Docstring:
         Returns:
             str: The string representation of the docstring, with indentation applied.
         """
-        self.text = "\n" + self.text + "\n"
+        text = "\n" + self.text + "\n"
 
         if add_triple_quotes:
-            self.text = '"""' + self.text + '"""'
+            text = '"""' + text + '"""'
 
-        return textwrap.indent(self.text + self.indentation, self.indentation)
+        return textwrap.indent(text + self.indentation, self.indentation)
@@ -1 +1,4 @@
 from .chatgpt_generator import ChatGPTDocstringGenerator  # noqa F401
+from .chatgpt_generator import OVERSIZED_POLICIES  # noqa F401
+from .routed_generator import RoutedDocstringGenerator  # noqa F401
+from .template_generator import TemplateDocstringGenerator  # noqa F401
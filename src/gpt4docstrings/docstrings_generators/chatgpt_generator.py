@@ -5,50 +5,145 @@ import openai
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
 
+from gpt4docstrings.backends import CompletionBackend
+from gpt4docstrings.backends import LangChainBackend
 from gpt4docstrings.docstring import Docstring
 from gpt4docstrings.docstrings_generators.base import DocstringGenerator
+from gpt4docstrings.exceptions import ContextWindowExceededError
+from gpt4docstrings.hedging import RequestHedger
 from gpt4docstrings.prompts.generation.chatgpt import CLASS_PROMPTS
 from gpt4docstrings.prompts.generation.chatgpt import FUNCTION_PROMPTS
+from gpt4docstrings.prompts.structured import STRUCTURED_OUTPUT_INSTRUCTIONS
+from gpt4docstrings.prompts.summary import SUMMARY_PROMPT
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.scheduler import estimate_tokens
+from gpt4docstrings.scheduler import get_context_window
+from gpt4docstrings.utils.completions import get_docstring_completion
 from gpt4docstrings.utils.decorators import retry
-from gpt4docstrings.utils.parsers import DocstringParser
+from gpt4docstrings.utils.parsers import extract_docstring
+from gpt4docstrings.utils.summaries import chunk_lines
+from gpt4docstrings.utils.summaries import condense_source
+from gpt4docstrings.utils.summaries import split_source
 from gpt4docstrings.visit import GPT4DocstringsNode
 
+OVERSIZED_POLICIES = ["summarize", "skip"]
+SUMMARY_MAX_TOKENS = 256
+# Summaries of summaries are requested until the prompt fits, at most this many times
+MAX_SUMMARY_LEVELS = 3
+
 
 class ChatGPTDocstringGenerator(DocstringGenerator):
-    """A class for generating Python docstrings using ChatGPT."""
+    """
+    A class for generating Python docstrings using ChatGPT.
+
+    The size of every prompt is estimated before it's sent. Nodes too large for the
+    context window of the model are either skipped, or summarized chunk by chunk and
+    documented from the summaries (`oversized="summarize"`). Failed requests are retried
+    unless `retry_failures` is `False` (e.g. when the answers are fixed batch results).
+    """
 
     def __init__(
         self,
         api_key: str,
         model_name: str,
         docstring_style: str,
+        stream: bool = False,
+        report: RunReport = None,
+        backend: CompletionBackend = None,
+        structured_output: bool = False,
+        hedger: RequestHedger = None,
+        oversized: str = "summarize",
+        context_window: int = None,
+        retry_failures: bool = True,
     ):
-        self.api_key = api_key if api_key else os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("Please, provide the OpenAI API Key")
-
-        openai.api_key = self.api_key
-
+        if oversized not in OVERSIZED_POLICIES:
+            raise ValueError(
+                f"Oversized policy must be one of the following: {OVERSIZED_POLICIES}"
+            )
         self.model_name = model_name
+        self.oversized = oversized
+        self.context_window = context_window or get_context_window(model_name)
         self.docstring_style = docstring_style
+        self.stream = stream
+        self.structured_output = structured_output
+        self.hedger = hedger
+        self.retry_failures = retry_failures
+        self.report = report or RunReport()
+        self.api_key = api_key if api_key else os.getenv("OPENAI_API_KEY")
 
-        self.model = ChatOpenAI(
-            model_name=model_name, temperature=1.0, openai_api_key=self.api_key
-        )
+        # Without an explicit backend, the requests go through langchain's `ChatOpenAI`
+        if backend is None:
+            if not self.api_key:
+                raise ValueError("Please, provide the OpenAI API Key")
+
+            openai.api_key = self.api_key
+            backend = LangChainBackend(
+                ChatOpenAI(
+                    model_name=model_name, temperature=1.0, openai_api_key=self.api_key
+                )
+            )
+        self.backend = backend
         self.function_prompt_template = FUNCTION_PROMPTS.get(docstring_style)
         self.class_prompt_template = CLASS_PROMPTS.get(docstring_style)
 
-    async def _get_completion(self, prompt: str) -> str:
+    async def _get_completion(
+        self, prompt: str, path: str = None, max_tokens: int = None
+    ) -> str:
         """
-        Generates a completion using the ChatGPT model.
+        Generates a completion using the backend of the ChatGPT model.
+
+        The completion is stopped on the closing triple quotes of the docstring. When
+        streaming is enabled, the stream is cancelled as soon as they are received. In
+        structured-output mode, the completion is requested as a JSON object instead.
 
         Args:
             prompt (str): The prompt for generating the completion.
+            path (str): Pseudo-import path to the node the completion is requested for.
+            max_tokens (int): The completion-length budget, if any.
 
         Returns:
             str: The generated completion.
         """
-        return await self.model.apredict(prompt)
+        return await get_docstring_completion(
+            self.backend,
+            prompt,
+            path=path,
+            max_tokens=max_tokens,
+            stream=self.stream,
+            report=self.report,
+            json_mode=self.structured_output,
+            hedger=self.hedger,
+        )
+
+    def _parse_completion(self, completion: str) -> str:
+        """
+        Extracts the docstring from a completion, salvaging malformed answers locally.
+
+        Args:
+            completion (str): The completion.
+
+        Returns:
+            str: The docstring text.
+
+        Raises:
+            DocstringParsingError: If the completion can't be salvaged.
+        """
+        docstring, tier = extract_docstring(completion, self.structured_output)
+        if tier not in ("strict", "json"):
+            # Without the lenient tiers, the request would have been sent again
+            self.report.incr(f"Responses salvaged ({tier})")
+        return docstring
+
+    def retries_allowed(self) -> bool:
+        """Tells whether a failed request can be sent again: not once the budget is spent."""
+        if not self.retry_failures:
+            return False
+        budget = self.hedger.budget if self.hedger is not None else None
+        return budget is None or not budget.exhausted()
+
+    def model_name_for(self, node: GPT4DocstringsNode) -> str:
+        """Returns the name of the model documenting a node."""
+        return self.model_name
 
     def _get_template(self, node: GPT4DocstringsNode):
         """Returns a function template or a class template depending on the node type"""
@@ -57,29 +152,147 @@ class ChatGPTDocstringGenerator(DocstringGenerator):
         else:
             return self.class_prompt_template
 
-    @retry()
-    async def generate_docstring(self, node: GPT4DocstringsNode) -> Docstring:
+    def build_prompt(self, node: GPT4DocstringsNode, code: str = None) -> str:
         """
-        Generates a docstring for a function.
+        Renders the prompt requesting the docstring of a node.
 
         Args:
             node (GPT4DocstringsNode): A GPT4DocstringsNode node
+            code (str): The code shown in the prompt, if not the source of the node
+                (e.g. the condensed source of an oversized node).
 
         Returns:
-            Docstring: A Docstring object
+            str: The prompt, with the JSON instructions in structured-output mode.
         """
-        source = node.source.strip()
+        source = (node.source if code is None else code).strip()
         stripped_source = textwrap.dedent(source)
-        prompt_template = self._get_template(node)
-        parent_offset = node.col_offset
 
         prompt = PromptTemplate(
-            template=prompt_template,
+            template=self._get_template(node),
             input_variables=["code"],
         )
-        _input = prompt.format_prompt(code=stripped_source)
-        docstring = DocstringParser().parse(
-            await self._get_completion(_input.to_string())
+        _input = prompt.format_prompt(code=stripped_source).to_string()
+        if self.structured_output:
+            _input += STRUCTURED_OUTPUT_INSTRUCTIONS
+        return _input
+
+    def fits_context_window(self, node: GPT4DocstringsNode, code: str = None) -> bool:
+        """
+        Tells whether the prompt of a node and its completion fit in the context window.
+
+        Args:
+            node (GPT4DocstringsNode): A GPT4DocstringsNode node
+            code (str): The code shown in the prompt, if not the source of the node.
+
+        Returns:
+            bool: `True` if the estimated tokens of the request are within the window.
+        """
+        prompt_tokens = estimate_tokens(self.build_prompt(node, code))
+        return prompt_tokens + (node.token_budget or 0) <= self.context_window
+
+    async def _summarize(
+        self, node: GPT4DocstringsNode, code: str, part: int, parts: int
+    ) -> str:
+        """Requests the summary of a chunk of the body of a node."""
+        prompt = SUMMARY_PROMPT.format(
+            part=part,
+            parts=parts,
+            kind="class" if node.node_type == "ClassDef" else "function",
+            name=node.name,
+            code=code,
+        )
+
+        async def request():
+            return await self.backend.complete(prompt, max_tokens=SUMMARY_MAX_TOKENS)
+
+        prompt_tokens = estimate_tokens(prompt)
+        hedger = self.hedger or RequestHedger()
+        completion = await hedger.run(
+            request,
+            key=self.backend.model_name,
+            report=self.report,
+            tokens=(prompt_tokens, SUMMARY_MAX_TOKENS),
+            usage=lambda answer: (
+                answer.prompt_tokens or prompt_tokens,
+                answer.completion_tokens or estimate_tokens(answer.text),
+            ),
+        )
+        return completion.text.strip()
+
+    async def summarize_source(self, node: GPT4DocstringsNode) -> str:
+        """
+        Condenses the source of an oversized node, replacing its body by a summary.
+
+        The body is split into chunks that fit in the context window, and each chunk is
+        summarized in turn: the summaries are sent from the scheduler slot of the node, so
+        they stay within the concurrency limit, and each one is charged to the budget. If
+        the summaries are still too long, they are summarized again.
+
+        Args:
+            node (GPT4DocstringsNode): A GPT4DocstringsNode node
+
+        Returns:
+            str: The header of the node followed by the summary of its body.
+
+        Raises:
+            ContextWindowExceededError: If the summaries don't fit either.
+        """
+        header, body = split_source(node)
+        # Half of the window is left for the prompt and the summary
+        chunk_tokens = self.context_window // 2
+        lines = body
+        for _ in range(MAX_SUMMARY_LEVELS):
+            chunks = chunk_lines(lines, chunk_tokens)
+            self.report.incr("Summary requests", len(chunks))
+            summaries = [
+                await self._summarize(node, chunk, part, len(chunks))
+                for part, chunk in enumerate(chunks, start=1)
+            ]
+            code = condense_source(header, body, "\n\n".join(summaries))
+            if self.fits_context_window(node, code):
+                return code
+            lines = "\n".join(summaries).splitlines()
+        raise ContextWindowExceededError(
+            f"The summary of {node.path} doesn't fit in the context window of "
+            f"{self.model_name} ({self.context_window} tokens)"
+        )
+
+    async def generate_docstring(self, node: GPT4DocstringsNode) -> Docstring:
+        """
+        Generates a docstring for a function, summarizing it first if it's too large.
+
+        Args:
+            node (GPT4DocstringsNode): A GPT4DocstringsNode node
+
+        Returns:
+            Docstring: A Docstring object
+
+        Raises:
+            ContextWindowExceededError: If the node is too large for the context window
+                and can't be summarized. It's never retried.
+        """
+        code = None
+        if not self.fits_context_window(node):
+            if self.oversized == "skip":
+                self.report.incr("Oversized nodes skipped")
+                raise ContextWindowExceededError(
+                    f"{node.path} doesn't fit in the context window of "
+                    f"{self.model_name} ({self.context_window} tokens)"
+                )
+            self.report.incr("Oversized nodes summarized")
+            code = await self.summarize_source(node)
+        return await self._generate_from_code(node, code)
+
+    @retry()
+    async def _generate_from_code(
+        self, node: GPT4DocstringsNode, code: str = None
+    ) -> Docstring:
+        """Requests the docstring of a node from its source (or the given code)."""
+        parent_offset = node.col_offset
+        docstring = self._parse_completion(
+            await self._get_completion(
+                self.build_prompt(node, code), node.path, node.token_budget
+            )
         )
 
         return Docstring(
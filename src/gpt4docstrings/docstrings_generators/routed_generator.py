@@ -0,0 +1,85 @@
+from typing import Callable
+from typing import Dict
+from typing import Sequence
+
+from gpt4docstrings.backends import CompletionBackend
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.docstrings_generators.base import DocstringGenerator
+from gpt4docstrings.docstrings_generators.chatgpt_generator import (
+    ChatGPTDocstringGenerator,
+)
+from gpt4docstrings.hedging import RequestHedger
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.routing import ModelRouter
+from gpt4docstrings.routing import ModelTier
+from gpt4docstrings.visit import GPT4DocstringsNode
+
+
+class RoutedDocstringGenerator(DocstringGenerator):
+    """
+    A docstring generator sending every node to a model of a ladder, by complexity.
+
+    Trivial nodes are documented by the cheap models of the ladder and complex ones by
+    the strong models. Each tier is served by its own `ChatGPTDocstringGenerator`, whose
+    backend (if any) is created by `backend_factory` from the model name, and whose
+    context window is looked up in `context_windows`, or is the known one of its model.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        ladder: Sequence[ModelTier],
+        docstring_style: str,
+        stream: bool = False,
+        report: RunReport = None,
+        backend_factory: Callable[[str], CompletionBackend] = None,
+        structured_output: bool = False,
+        hedger: RequestHedger = None,
+        oversized: str = "summarize",
+        context_windows: Dict[str, int] = None,
+        retry_failures: bool = True,
+    ):
+        self.router = ModelRouter(ladder)
+        self.report = report or RunReport()
+        context_windows = context_windows or {}
+        self.generators = {
+            tier.model_name: ChatGPTDocstringGenerator(
+                api_key=api_key,
+                model_name=tier.model_name,
+                docstring_style=docstring_style,
+                stream=stream,
+                report=self.report,
+                backend=backend_factory(tier.model_name) if backend_factory else None,
+                structured_output=structured_output,
+                hedger=hedger,
+                oversized=oversized,
+                context_window=context_windows.get(tier.model_name),
+                retry_failures=retry_failures,
+            )
+            for tier in ladder
+        }
+
+    def model_name_for(self, node: GPT4DocstringsNode) -> str:
+        """Returns the name of the model documenting a node."""
+        return self.router.route(node).model_name
+
+    def build_prompt(self, node: GPT4DocstringsNode) -> str:
+        """Renders the prompt sent to the model of the tier of a node."""
+        return self.generators[self.model_name_for(node)].build_prompt(node)
+
+    def fits_context_window(self, node: GPT4DocstringsNode) -> bool:
+        """Tells whether a node fits in the context window of the model of its tier."""
+        return self.generators[self.model_name_for(node)].fits_context_window(node)
+
+    async def generate_docstring(self, node: GPT4DocstringsNode) -> Docstring:
+        """
+        Generates a docstring for a node with the model of its tier.
+
+        Args:
+            node (GPT4DocstringsNode): A GPT4DocstringsNode node
+
+        Returns:
+            Docstring: A Docstring object
+        """
+        generator = self.generators[self.model_name_for(node)]
+        return await generator.generate_docstring(node)
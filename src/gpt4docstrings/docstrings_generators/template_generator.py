@@ -0,0 +1,35 @@
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.docstrings_generators.base import DocstringGenerator
+from gpt4docstrings.styles import render_docstring
+from gpt4docstrings.visit import GPT4DocstringsNode
+
+
+class TemplateDocstringGenerator(DocstringGenerator):
+    """
+    A docstring generator writing the docstrings of trivial functions from templates.
+
+    The functions are recognised by the visitor (see `utils.templates`), so their
+    docstrings are rendered in the target style without any model.
+    """
+
+    def __init__(self, docstring_style: str):
+        self.docstring_style = docstring_style
+
+    def generate_docstring(self, node: GPT4DocstringsNode) -> Docstring:
+        """
+        Generates the docstring of a trivial node from its template.
+
+        Args:
+            node (GPT4DocstringsNode): A GPT4DocstringsNode node with a `template`
+
+        Returns:
+            Docstring: A Docstring object
+
+        Raises:
+            DocstringStyleError: If the template can't be rendered in the target style.
+        """
+        return Docstring(
+            text=render_docstring(node.template, self.docstring_style),
+            col_offset=4 + node.col_offset,
+            lineno=node.docstring_lineno,
+        )
@@ -1 +1,2 @@
 from .chatgpt_translator import ChatGPTDocstringTranslator  # noqa F401
+from .rule_based_translator import RuleBasedDocstringTranslator  # noqa F401
@@ -1,4 +1,3 @@
-import ast
 import os
 import textwrap
 
@@ -6,11 +5,18 @@ import openai
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
 
+from gpt4docstrings.backends import CompletionBackend
+from gpt4docstrings.backends import LangChainBackend
 from gpt4docstrings.docstring import Docstring
 from gpt4docstrings.docstrings_translators.base import DocstringTranslator
+from gpt4docstrings.hedging import RequestHedger
+from gpt4docstrings.prompts.structured import STRUCTURED_OUTPUT_INSTRUCTIONS
 from gpt4docstrings.prompts.translation.chatgpt import PROMPT
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.utils.completions import get_docstring_completion
 from gpt4docstrings.utils.decorators import retry
-from gpt4docstrings.utils.parsers import DocstringParser
+from gpt4docstrings.utils.parsers import extract_docstring
+from gpt4docstrings.utils.token_budget import estimate_translation_budget
 from gpt4docstrings.visit import GPT4DocstringsNode
 
 
@@ -22,57 +28,130 @@ class ChatGPTDocstringTranslator(DocstringTranslator):
         api_key: str,
         model_name: str,
         docstring_style: str,
+        stream: bool = False,
+        report: RunReport = None,
+        backend: CompletionBackend = None,
+        structured_output: bool = False,
+        hedger: RequestHedger = None,
+        retry_failures: bool = True,
     ):
-        self.api_key = api_key if api_key else os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("Please, provide the OpenAI API Key")
-
-        openai.api_key = self.api_key
-
         self.model_name = model_name
         self.docstring_style = docstring_style
+        self.stream = stream
+        self.structured_output = structured_output
+        self.hedger = hedger
+        self.retry_failures = retry_failures
+        self.report = report or RunReport()
+        self.api_key = api_key if api_key else os.getenv("OPENAI_API_KEY")
 
-        self.model = ChatOpenAI(
-            model_name=model_name, temperature=1.0, openai_api_key=self.api_key
-        )
+        # Without an explicit backend, the requests go through langchain's `ChatOpenAI`
+        if backend is None:
+            if not self.api_key:
+                raise ValueError("Please, provide the OpenAI API Key")
+
+            openai.api_key = self.api_key
+            backend = LangChainBackend(
+                ChatOpenAI(
+                    model_name=model_name, temperature=1.0, openai_api_key=self.api_key
+                )
+            )
+        self.backend = backend
         self.prompt_template = PROMPT
 
-    async def _get_completion(self, prompt: str) -> str:
+    async def _get_completion(
+        self, prompt: str, path: str = None, max_tokens: int = None
+    ) -> str:
         """
-        Generates a completion using the ChatGPT model.
+        Generates a completion using the backend of the ChatGPT model.
+
+        The completion is stopped on the closing triple quotes of the docstring. When
+        streaming is enabled, the stream is cancelled as soon as they are received. In
+        structured-output mode, the completion is requested as a JSON object instead.
 
         Args:
             prompt (str): The prompt for generating the completion.
+            path (str): Pseudo-import path to the node the completion is requested for.
+            max_tokens (int): The completion-length budget, if any.
 
         Returns:
             str: The generated completion.
         """
-        return await self.model.apredict(prompt)
+        return await get_docstring_completion(
+            self.backend,
+            prompt,
+            path=path,
+            max_tokens=max_tokens,
+            stream=self.stream,
+            report=self.report,
+            json_mode=self.structured_output,
+            hedger=self.hedger,
+        )
 
-    @retry()
-    async def translate_docstring(self, node: GPT4DocstringsNode) -> Docstring:
+    def _parse_completion(self, completion: str) -> str:
         """
-        Translates a docstring for a function.
+        Extracts the docstring from a completion, salvaging malformed answers locally.
 
         Args:
-            node (GPT4DocstringsNode): A GPT4DocstringsNode node
+            completion (str): The completion.
 
         Returns:
-            Docstring: A Docstring object
+            str: The docstring text.
+
+        Raises:
+            DocstringParsingError: If the completion can't be salvaged.
         """
-        docstring = ast.get_docstring(node.ast_node)
-        stripped_source = textwrap.dedent(docstring)
-        parent_offset = node.col_offset
+        docstring, tier = extract_docstring(completion, self.structured_output)
+        if tier not in ("strict", "json"):
+            # Without the lenient tiers, the request would have been sent again
+            self.report.incr(f"Responses salvaged ({tier})")
+        return docstring
+
+    def retries_allowed(self) -> bool:
+        """Tells whether a failed request can be sent again: not once the budget is spent."""
+        if not self.retry_failures:
+            return False
+        budget = self.hedger.budget if self.hedger is not None else None
+        return budget is None or not budget.exhausted()
+
+    def build_prompt(self, node: GPT4DocstringsNode) -> str:
+        """
+        Renders the prompt requesting the translation of the docstring of a node.
+
+        Args:
+            node (GPT4DocstringsNode): A GPT4DocstringsNode node
 
+        Returns:
+            str: The prompt, with the JSON instructions in structured-output mode.
+        """
         prompt = PromptTemplate(
             template=self.prompt_template,
             input_variables=["docstring", "style"],
         )
         _input = prompt.format_prompt(
-            docstring=stripped_source, style=self.docstring_style
-        )
-        docstring = DocstringParser().parse(
-            await self._get_completion(_input.to_string())
+            docstring=textwrap.dedent(node.docstring), style=self.docstring_style
+        ).to_string()
+        if self.structured_output:
+            _input += STRUCTURED_OUTPUT_INSTRUCTIONS
+        return _input
+
+    @retry()
+    async def translate_docstring(self, node: GPT4DocstringsNode) -> Docstring:
+        """
+        Translates a docstring for a function.
+
+        Args:
+            node (GPT4DocstringsNode): A GPT4DocstringsNode node
+
+        Returns:
+            Docstring: A Docstring object
+        """
+        parent_offset = node.col_offset
+        docstring = self._parse_completion(
+            await self._get_completion(
+                self.build_prompt(node),
+                node.path,
+                estimate_translation_budget(textwrap.dedent(node.docstring)),
+            )
         )
 
         return Docstring(
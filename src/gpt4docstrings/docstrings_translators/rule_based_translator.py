@@ -0,0 +1,35 @@
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.docstrings_translators.base import DocstringTranslator
+from gpt4docstrings.styles import convert_docstring
+from gpt4docstrings.visit import GPT4DocstringsNode
+
+
+class RuleBasedDocstringTranslator(DocstringTranslator):
+    """
+    A docstring translator converting between styles with local rules, without any model.
+
+    Docstrings that can't be parsed confidently raise `DocstringStyleError`, so they can
+    be sent to a model-based translator instead.
+    """
+
+    def __init__(self, docstring_style: str):
+        self.docstring_style = docstring_style
+
+    def translate_docstring(self, node: GPT4DocstringsNode) -> Docstring:
+        """
+        Translates the docstring of a node into the target style.
+
+        Args:
+            node (GPT4DocstringsNode): A GPT4DocstringsNode node
+
+        Returns:
+            Docstring: A Docstring object
+
+        Raises:
+            DocstringStyleError: If the docstring can't be converted confidently.
+        """
+        return Docstring(
+            text=convert_docstring(node.docstring, self.docstring_style),
+            col_offset=4 + node.col_offset,
+            lineno=node.docstring_lineno,
+        )
@@ -0,0 +1,172 @@
+import re
+from typing import List
+from typing import Sequence
+
+import attr
+
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.visit import GPT4DocstringsNode
+
+STRING_START = re.compile(r"[rRuUbBfF]*(\"\"\"|'''|\"|')")
+
+
+@attr.s(slots=True)
+class Edit:
+    """
+    A change to the lines of a file: `lines` replace the original lines `[start, end)`.
+
+    Insertions are edits with `start == end`.
+
+    Args:
+        start (int): First replaced line (0-based).
+        end (int): Line after the last replaced one (0-based).
+        lines (List[str]): The new lines, without line breaks.
+    """
+
+    start = attr.ib()
+    end = attr.ib()
+    lines = attr.ib()
+
+
+def split_lines(content: str) -> List[str]:
+    """Splits a file into lines the same way AST line numbers count them."""
+    return content.split("\n")
+
+
+def insertion_edit(docstring: Docstring) -> Edit:
+    """Returns the edit inserting a new docstring after the definition line of its node."""
+    return Edit(docstring.lineno, docstring.lineno, docstring.to_str().splitlines())
+
+
+def replacement_edit(
+    lines: Sequence[str], node: GPT4DocstringsNode, docstring: Docstring
+) -> Edit:
+    """
+    Returns the edit replacing the existing docstring of a node.
+
+    The string prefix, the quotes and whatever surrounds the docstring expression on
+    its first and last lines are kept.
+
+    Args:
+        lines (Sequence[str]): The original lines of the file.
+        node (GPT4DocstringsNode): The node whose docstring is replaced.
+        docstring (Docstring): The new docstring.
+
+    Returns:
+        Edit: The replacement edit.
+    """
+    lineno, col_offset, end_lineno, end_col_offset = node.docstring_span
+    # AST column offsets are UTF-8 byte offsets
+    first = lines[lineno - 1].encode("utf-8")
+    last = lines[end_lineno - 1].encode("utf-8")
+    before = first[:col_offset].decode("utf-8")
+    after = last[end_col_offset:].decode("utf-8")
+
+    literal = first[col_offset:].decode("utf-8")
+    match = STRING_START.match(literal)
+    prefix, quote = match.group(0)[: -len(match.group(1))], match.group(1)
+    if len(quote) == 1:
+        # The new docstring spans several lines
+        quote = quote * 3
+
+    text = (
+        before
+        + prefix
+        + quote
+        + docstring.to_str(add_triple_quotes=False)
+        + quote
+        + after
+    )
+    return Edit(lineno - 1, end_lineno, text.split("\n"))
+
+
+def apply_edits(lines: Sequence[str], edits: Sequence[Edit]) -> List[str]:
+    """
+    Applies non-overlapping edits to the lines of a file.
+
+    Args:
+        lines (Sequence[str]): The original lines.
+        edits (Sequence[Edit]): The edits to apply.
+
+    Returns:
+        List[str]: The new lines.
+    """
+    new_lines = []
+    position = 0
+    for edit in sorted(edits, key=lambda e: (e.start, e.end)):
+        new_lines.extend(lines[position : edit.start])
+        new_lines.extend(edit.lines)
+        position = max(position, edit.end)
+    new_lines.extend(lines[position:])
+    return new_lines
+
+
+def _format_range(start: int, length: int) -> str:
+    """Formats a hunk range like `difflib.unified_diff`."""
+    if length == 1:
+        return str(start + 1)
+    if length == 0:
+        return f"{start},0"
+    return f"{start + 1},{length}"
+
+
+def unified_diff(
+    lines: Sequence[str], edits: Sequence[Edit], filename: str, context: int = 3
+) -> List[str]:
+    """
+    Emits the unified diff of a set of edits without diffing the whole file.
+
+    The output is the same as `difflib.unified_diff` over the original and edited
+    lines, but only the lines around the edits are visited.
+
+    Args:
+        lines (Sequence[str]): The original lines of the file (as returned by `split_lines`).
+        edits (Sequence[Edit]): The edits applied to the file.
+        filename (str): The path of the file, used in the patch header.
+        context (int): Number of unchanged lines around each change.
+
+    Returns:
+        List[str]: The lines of the patch, empty if the edits don't change anything.
+    """
+    # A trailing line break doesn't start a new line
+    n_lines = len(lines) - 1 if lines and lines[-1] == "" else len(lines)
+    edits = [
+        e
+        for e in sorted(edits, key=lambda e: (e.start, e.end))
+        if list(lines[e.start : e.end]) != list(e.lines)
+    ]
+    if not edits:
+        return []
+
+    # Group the edits whose context windows overlap into hunks
+    groups = [[edits[0]]]
+    for edit in edits[1:]:
+        if edit.start - groups[-1][-1].end <= 2 * context:
+            groups[-1].append(edit)
+        else:
+            groups.append([edit])
+
+    patch = [f"--- a/{filename}\n", f"+++ b/{filename}\n"]
+    offset = 0  # new lines minus old lines of the previous hunks
+    for group in groups:
+        start = max(group[0].start - context, 0)
+        end = min(group[-1].end + context, n_lines)
+
+        body = []
+        position = start
+        new_length = 0
+        for edit in group:
+            body.extend(" " + line + "\n" for line in lines[position : edit.start])
+            body.extend("-" + line + "\n" for line in lines[edit.start : edit.end])
+            body.extend("+" + line + "\n" for line in edit.lines)
+            new_length += (edit.start - position) + len(edit.lines)
+            position = edit.end
+        body.extend(" " + line + "\n" for line in lines[position:end])
+        new_length += end - position
+
+        old_range = _format_range(start, end - start)
+        new_range = _format_range(start + offset, new_length)
+        patch.append(f"@@ -{old_range} +{new_range} @@\n")
+        patch.extend(body)
+        offset += new_length - (end - start)
+    return patch
@@ -2,3 +2,53 @@ class DocstringParsingError(Exception):
     """Custom exception for docstring parsing errors."""
 
     pass
+
+
+class BackendError(Exception):
+    """
+    Custom exception for failed requests to a completion backend.
+
+    Args:
+        message (str): What went wrong.
+        status (int): The HTTP status of the failed request, if any.
+    """
+
+    def __init__(self, message: str = "", status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+class RateLimitError(BackendError):
+    """Custom exception for requests rejected by the rate limit or quota of the API (HTTP 429)."""
+
+    pass
+
+
+class DocstringStyleError(Exception):
+    """Custom exception for docstrings that can't be converted between styles locally."""
+
+    pass
+
+
+class NoInputFilesError(Exception):
+    """Custom exception for runs whose input paths contain no Python file to document."""
+
+    pass
+
+
+class RequestTimeoutError(Exception):
+    """Custom exception for model requests that didn't answer within their timeout."""
+
+    pass
+
+
+class BudgetExhaustedError(Exception):
+    """Custom exception for model requests refused because the budget of the run is exhausted."""
+
+    pass
+
+
+class ContextWindowExceededError(Exception):
+    """Custom exception for nodes whose prompt doesn't fit in the context window of the model."""
+
+    pass
@@ -1,28 +1,151 @@
 import ast
 import asyncio
-import difflib
+import inspect
+import logging
 import os
 import pathlib
+import signal
 import sys
-from fnmatch import fnmatch
+import time
+from collections import Counter
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Iterator
 from typing import List
+from typing import Optional
+from typing import Tuple
 from typing import Union
 
+import aiofiles
+import attr
 import click
+import openai
 from colorama import Fore
 from tabulate import tabulate
 from tqdm.asyncio import tqdm_asyncio
 
+from gpt4docstrings.artifact import ArtifactWriter
 from gpt4docstrings.ascii_title import title
+from gpt4docstrings.backends import Completion
+from gpt4docstrings.backends import CompletionBackend
+from gpt4docstrings.backends import HTTPClientPool
+from gpt4docstrings.backends import OpenAICompatibleBackend
+from gpt4docstrings.backends.balanced_backend import BalancedBackend
+from gpt4docstrings.backends.balanced_backend import Endpoint
+from gpt4docstrings.backends.batch_backend import batch_request_id
+from gpt4docstrings.backends.batch_backend import BatchResultsBackend
+from gpt4docstrings.backends.http_backend import DEFAULT_BASE_URL
+from gpt4docstrings.backends.http_backend import DEFAULT_MAX_RETRIES
+from gpt4docstrings.backends.pool import ConnectionStats
+from gpt4docstrings.backends.pool import DEFAULT_POOL_SIZE
+from gpt4docstrings.backends.pool import DEFAULT_TIMEOUT
+from gpt4docstrings.batch import batch_request
+from gpt4docstrings.concurrency import AdaptiveConcurrencyLimiter
 from gpt4docstrings.config import GPT4DocstringsConfig
 from gpt4docstrings.docstring import Docstring
 from gpt4docstrings.docstrings_generators import ChatGPTDocstringGenerator
+from gpt4docstrings.docstrings_generators import RoutedDocstringGenerator
+from gpt4docstrings.docstrings_generators import TemplateDocstringGenerator
 from gpt4docstrings.docstrings_translators import ChatGPTDocstringTranslator
+from gpt4docstrings.docstrings_translators import RuleBasedDocstringTranslator
+from gpt4docstrings.edits import apply_edits
+from gpt4docstrings.edits import Edit
+from gpt4docstrings.edits import insertion_edit
+from gpt4docstrings.edits import replacement_edit
+from gpt4docstrings.edits import split_lines
+from gpt4docstrings.edits import unified_diff
+from gpt4docstrings.exceptions import BudgetExhaustedError
+from gpt4docstrings.exceptions import DocstringStyleError
+from gpt4docstrings.exceptions import NoInputFilesError
+from gpt4docstrings.hedging import DEFAULT_MAX_HEDGE_RATE
+from gpt4docstrings.hedging import RequestHedger
+from gpt4docstrings.journal import DEFAULT_JOURNAL_PATH
+from gpt4docstrings.journal import Journal
+from gpt4docstrings.journal import source_hash
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.routing import ModelTier
+from gpt4docstrings.scheduler import estimate_tokens
+from gpt4docstrings.scheduler import node_priority
+from gpt4docstrings.scheduler import NodeScheduler
+from gpt4docstrings.scheduler import PROMPT_TEMPLATE_TOKENS
+from gpt4docstrings.scheduler import reference_counts
+from gpt4docstrings.scheduler import RunBudget
+from gpt4docstrings.sharding import get_shard_base
+from gpt4docstrings.sharding import shard_of
+from gpt4docstrings.styles import in_style
+from gpt4docstrings.styles import STYLES
+from gpt4docstrings.utils.discovery import discover_python_files
 from gpt4docstrings.utils.helpers import get_common_base
+from gpt4docstrings.utils.token_budget import estimate_translation_budget
 from gpt4docstrings.visit import GPT4DocstringsNode
 from gpt4docstrings.visit import GPT4DocstringsVisitor
 
 
+@attr.s(eq=False)
+class FileJob:
+    """
+    A unit of work flowing through the documentation pipeline.
+
+    Args:
+        filename (str): The path of the file being documented.
+        file_content (str): The original content of the file.
+        nodes (List[GPT4DocstringsNode]): The nodes extracted from the file.
+        edits (List[Edit]): The changes to apply to the file once its docstrings are ready.
+        generated (Dict[Tuple[str, int], Docstring]): The generated docstrings, keyed by
+            node path and line.
+        translated (Dict[Tuple[str, int], Docstring]): The translated docstrings, keyed
+            by node path and line.
+    """
+
+    filename = attr.ib()
+    file_content = attr.ib()
+    nodes = attr.ib()
+    edits = attr.ib(factory=list)
+    generated = attr.ib(factory=dict)
+    translated = attr.ib(factory=dict)
+
+
+@attr.s(slots=True)
+class NodeResult:
+    """
+    The outcome of documenting a single node, as yielded by `GPT4Docstrings.aiter_results`.
+
+    Args:
+        filename (str): The path of the file containing the node.
+        path (str): Pseudo-import path to the node (e.g., "sample.py:MyClass.my_method").
+        kind (str): Either "generation" or "translation".
+        docstring (Docstring): The new docstring, or `None` if the node failed.
+        source (str): Where the docstring comes from: "model", "journal", "template" or
+            "local" (converted between styles without any model).
+        model_name (str): The model the request was sent to, if any.
+        elapsed (float): Seconds spent on the request, including its retries.
+        prompt_tokens (int): Estimated tokens of the prompt, if a request was sent.
+        completion_tokens (int): Estimated tokens of the docstring, if a request was sent.
+        cost (float): Estimated cost of the request in USD.
+        error (str): Why the node could not be documented, if it failed.
+        source_hash (str): Hash of the node source, to tell whether the docstring still
+            applies to the code.
+    """
+
+    filename = attr.ib()
+    path = attr.ib()
+    kind = attr.ib()
+    docstring = attr.ib(default=None)
+    source = attr.ib(default=None)
+    model_name = attr.ib(default=None)
+    elapsed = attr.ib(default=0.0)
+    prompt_tokens = attr.ib(default=None)
+    completion_tokens = attr.ib(default=None)
+    cost = attr.ib(default=0.0)
+    error = attr.ib(default=None)
+    source_hash = attr.ib(default=None)
+
+
+BACKENDS = ["langchain", "http"]
+
+
 class GPT4Docstrings:
     def __init__(
         self,
@@ -34,85 +157,259 @@ class GPT4Docstrings:
         api_key: str = None,
         verbose: int = 0,
         config: GPT4DocstringsConfig = None,
+        workers: int = 4,
+        max_queued_files: int = 8,
+        stream: bool = False,
+        resume: bool = False,
+        journal_path: str = DEFAULT_JOURNAL_PATH,
+        max_concurrent_requests: int = 32,
+        max_time: float = None,
+        max_requests: int = None,
+        max_cost: float = None,
+        shard: Tuple[int, int] = None,
+        respect_gitignore: bool = True,
+        max_in_flight_per_file: int = 64,
+        model_ladder: List[ModelTier] = None,
+        backend: str = "langchain",
+        base_url: str = None,
+        request_timeout: float = DEFAULT_TIMEOUT,
+        http_pool_size: int = DEFAULT_POOL_SIZE,
+        local_translation: bool = True,
+        templates: bool = True,
+        structured_output: bool = False,
+        hedge: bool = False,
+        max_hedge_rate: float = DEFAULT_MAX_HEDGE_RATE,
+        batch_results: Dict[str, Completion] = None,
+        artifact_path: str = None,
+        oversized: str = "summarize",
+        context_windows: Dict[str, int] = None,
+        adaptive_concurrency: bool = False,
+        endpoints: List[Endpoint] = None,
     ):
         self.paths = paths
         self.excluded = excluded or ()
         self.common_base = pathlib.Path("/")
 
-        if docstring_style not in ["google", "numpy", "reStructuredText", "epytext"]:
-            raise ValueError(
-                "Docstring Style must be one of the following: "
-                '["google", "numpy", "reStructuredText", "epytext"]'
+        if docstring_style not in STYLES:
+            raise ValueError(f"Docstring Style must be one of the following: {STYLES}")
+        self.docstring_style = docstring_style
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend must be one of the following: {BACKENDS}")
+        self.backend_name = backend
+        self.api_key = api_key
+        self.base_url = base_url
+        # With a pool of endpoints, the requests of each model are balanced across them
+        self.endpoints = endpoints
+        self._balanced_backends: Dict[str, BalancedBackend] = {}
+        # When collecting a batch job, every request is answered from its results
+        self.batch_results = batch_results
+        self.structured_output = structured_output
+        if batch_results is not None:
+            # A batch has no answer to the summary requests of oversized nodes
+            oversized = "skip"
+        # A single keep-alive pool serves the generator and the translator, whatever
+        # their backend, for the whole run
+        self.http_pool = HTTPClientPool(
+            pool_size=http_pool_size, timeout=request_timeout
+        )
+        self.report = RunReport()
+        # The requests in flight follow the observed latency and rate limits, up to
+        # `max_concurrent_requests`
+        self.limiter = (
+            AdaptiveConcurrencyLimiter(
+                max_limit=max_concurrent_requests, report=self.report
             )
-        self.docstring_generator = ChatGPTDocstringGenerator(
-            api_key=api_key, model_name=model, docstring_style=docstring_style
+            if adaptive_concurrency
+            else None
+        )
+        self.budget = RunBudget(
+            model_name=model,
+            max_time=max_time,
+            max_requests=max_requests,
+            max_cost=max_cost,
         )
+        # Every model request, whatever its backend, is bounded by `request_timeout`
+        # and charged to the budget
+        self.hedger = RequestHedger(
+            timeout=request_timeout,
+            hedge=hedge,
+            max_hedge_rate=max_hedge_rate,
+            limiter=self.limiter,
+            budget=self.budget,
+        )
+
+        # Batch results are fixed: a malformed answer would fail the same way again
+        retry_failures = batch_results is None
+        if model_ladder:
+            self.docstring_generator = RoutedDocstringGenerator(
+                api_key=api_key,
+                ladder=model_ladder,
+                docstring_style=docstring_style,
+                stream=stream,
+                report=self.report,
+                backend_factory=self._make_backend,
+                structured_output=structured_output,
+                hedger=self.hedger,
+                oversized=oversized,
+                context_windows=context_windows,
+                retry_failures=retry_failures,
+            )
+        else:
+            self.docstring_generator = ChatGPTDocstringGenerator(
+                api_key=api_key,
+                model_name=model,
+                docstring_style=docstring_style,
+                stream=stream,
+                report=self.report,
+                backend=self._make_backend(model),
+                structured_output=structured_output,
+                hedger=self.hedger,
+                oversized=oversized,
+                context_window=(context_windows or {}).get(model),
+                retry_failures=retry_failures,
+            )
         self.docstring_translator = ChatGPTDocstringTranslator(
-            api_key=api_key, model_name=model, docstring_style=docstring_style
+            api_key=api_key,
+            model_name=model,
+            docstring_style=docstring_style,
+            stream=stream,
+            report=self.report,
+            backend=self._make_backend(model),
+            structured_output=structured_output,
+            hedger=self.hedger,
+            retry_failures=retry_failures,
+        )
+        self.local_translator = (
+            RuleBasedDocstringTranslator(docstring_style) if local_translation else None
+        )
+        self.template_generator = (
+            TemplateDocstringGenerator(docstring_style) if templates else None
         )
 
         self.verbose = verbose
         self.documented_nodes = []
         self.config = config
         self.translate = translate
+        self.workers = workers
+        self.max_queued_files = max_queued_files
+        self.resume = resume
+        self.journal_path = journal_path
+        self.journal = None
+        # When set, the results are written to an artifact instead of the files
+        self.artifact_path = artifact_path
+        self.artifact = None
+        self._stopping = False
+        self._running = False
+        self._result_queue = None
+
+        self.max_concurrent_requests = max_concurrent_requests
+        self.scheduler = None
+        self.references = Counter()
+        self.shard = shard
+        self.respect_gitignore = respect_gitignore
+        self.max_in_flight_per_file = max_in_flight_per_file
 
         self.patches = []
 
+    def _make_backend(self, model_name: str) -> Optional[CompletionBackend]:
+        """
+        Creates the backend of a model, or `None` to let the component use langchain.
+
+        Args:
+            model_name (str): The name of the model.
+
+        Returns:
+            Optional[CompletionBackend]: The backend, using the shared connection pool.
+        """
+        if self.batch_results is not None:
+            return BatchResultsBackend(model_name, self.batch_results)
+        if self.endpoints:
+            return self._make_balanced_backend(model_name)
+        if self.backend_name == "langchain":
+            return None
+
+        backend = OpenAICompatibleBackend(
+            model_name=model_name,
+            api_key=self.api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=self.base_url or DEFAULT_BASE_URL,
+            pool=self.http_pool,
+        )
+        return backend
+
+    def _make_balanced_backend(self, model_name: str) -> BalancedBackend:
+        """
+        Returns the backend balancing the requests of a model across the endpoints.
+
+        The generator and the translator share it, so the quotas of the endpoints hold
+        for all the requests of the model. With several endpoints, a failing request is
+        sent to the next one rather than retried on the same endpoint.
+        """
+        max_retries = 0 if len(self.endpoints) > 1 else DEFAULT_MAX_RETRIES
+        if model_name not in self._balanced_backends:
+            self._balanced_backends[model_name] = BalancedBackend(
+                model_name,
+                self.endpoints,
+                backend_factory=lambda endpoint: OpenAICompatibleBackend(
+                    model_name=model_name,
+                    api_key=endpoint.api_key
+                    or self.api_key
+                    or os.getenv("OPENAI_API_KEY"),
+                    base_url=endpoint.base_url,
+                    pool=self.http_pool,
+                    max_retries=max_retries,
+                ),
+                report=self.report,
+            )
+        return self._balanced_backends[model_name]
+
     def __print_pretty_documentation_table(self):
         """Prints a pretty table of the documented functions and classes."""
         headers = ["Filename", "Documented Functions / Classes"]
         table = [x for x in self.documented_nodes]
         print(Fore.GREEN + tabulate(table, headers, tablefmt="outline"))
 
-    def __filter_files(self, files: List[str]):
-        """Filters the input files based on the excluded patterns.
-
-        Args:
-            files (List[str]): The list of file paths to filter.
+    def _iter_filenames(self) -> Iterator[str]:
+        """Lazily yields the filenames from the input paths that belong to this run's shard.
 
         Yields:
-            str: The filtered file paths.
+            str: The path of each Python file to be documented.
         """
-        for f in files:
-            if not f.endswith(".py"):
-                continue
+        if self.shard is None:
+            yield from self._discover_filenames()
+            return
 
-            # By default, we will ignore __init__.py files
-            basename = os.path.basename(f)
-            if basename == "__init__.py":
-                continue
+        index, count = self.shard
+        base = get_shard_base(self.paths)
+        for filename in self._discover_filenames():
+            if shard_of(filename, base, count) == index:
+                yield filename
 
-            if any(fnmatch(f, exc + "*") for exc in self.excluded):
-                continue
-            yield f
+    def _discover_filenames(self) -> Iterator[str]:
+        """Lazily yields the filenames from the input paths.
+
+        Yields:
+            str: The path of each Python file found in the input paths.
+        """
+        return discover_python_files(
+            self.paths, self.excluded, respect_gitignore=self.respect_gitignore
+        )
 
     def get_filenames_from_paths(self) -> List[str]:
         """Retrieves the filenames from the input paths.
 
         Returns:
             List[str]: The list of filenames.
-        """
-        filenames = []
-
-        for path in self.paths:
-            if path.startswith("./"):
-                path = path[2:]
 
-            if os.path.isfile(path):
-                if not path.endswith(".py"):
-                    return sys.exit(1)
-
-                if not any(fnmatch(path, exc + "*") for exc in self.excluded):
-                    filenames.append(path)
-
-                continue
-
-            for root, _, fs in os.walk(path):
-                full_paths = [os.path.join(root, f) for f in fs]
-                filenames.extend(self.__filter_files(full_paths))
+        Raises:
+            NoInputFilesError: If the input paths contain no Python file (an empty shard
+                is not an error).
+        """
+        filenames = list(self._iter_filenames())
 
         if not filenames:
-            return sys.exit(1)
+            if self.shard is None:
+                raise NoInputFilesError("No Python files found in the input paths")
+            return filenames
 
         self.common_base = get_common_base(filenames)
         return filenames
@@ -141,11 +438,22 @@ class GPT4Docstrings:
             )
         ]
 
+    def _filter_nodes_in_style(self, nodes):
+        """Filters out the nodes whose docstring is already in the target style."""
+        filtered_nodes = [
+            n for n in nodes if not in_style(n.docstring, self.docstring_style)
+        ]
+        skipped = len(nodes) - len(filtered_nodes)
+        if skipped:
+            self.report.incr("Docstrings already in the target style", skipped)
+        return filtered_nodes
+
     @staticmethod
     def _filter_inner_nested(nodes):
         """Filters out children of ignored nested funcs / classes."""
         nested_cls = [n for n in nodes if n.is_nested_cls]
-        inner_nested_nodes = [n for n in nodes if n.parent in nested_cls]
+        nested_cls_paths = {n.path for n in nested_cls}
+        inner_nested_nodes = [n for n in nodes if n.parent_path in nested_cls_paths]
 
         filtered_nodes = [n for n in nodes if n not in inner_nested_nodes]
         filtered_nodes = [n for n in filtered_nodes if n not in nested_cls]
@@ -161,58 +469,279 @@ class GPT4Docstrings:
         with open(filename, "w", encoding="utf-8") as f:
             f.write(content)
 
+    def _generate_patch(self, lines: List[str], edits: List[Edit], filename: str):
+        """Stores the patch of a file, built directly from its edits."""
+        patch = unified_diff(lines, edits, filename)
+        if patch:
+            self.patches.append(patch)
+
+    def _write_concatenated_patch_file(self):
+        concatenated_patch = []
+
+        for patch in self.patches:
+            concatenated_patch.extend(patch)
+            concatenated_patch.append("\n")
+
+        if concatenated_patch:
+            with open(
+                "gpt4docstring_docstring_generator_patch.diff", "w"
+            ) as patch_file:
+                patch_file.writelines(concatenated_patch)
+
     @staticmethod
-    def _build_file_with_docstrings(source_file: str, docstrings: List[Docstring]):
-        docstrings_positions = {
-            docstring.lineno - 1: docstring.to_str() for docstring in docstrings
-        }
+    def _completed(result: NodeResult) -> Awaitable[NodeResult]:
+        """Returns an already completed result."""
+        future = asyncio.get_event_loop().create_future()
+        future.set_result(result)
+        return future
+
+    def _document_node(
+        self,
+        kind: str,
+        filename: str,
+        node: GPT4DocstringsNode,
+        request: Callable[[], Awaitable[Docstring]],
+        completion_tokens: int,
+        model_name: str,
+    ) -> Awaitable[Optional[NodeResult]]:
+        """
+        Schedules the request for a node, unless its result is already in the journal.
+
+        The request is queued synchronously, so all the nodes of a file are ordered by
+        priority together.
+
+        Args:
+            kind (str): Either "generation" or "translation".
+            filename (str): The path of the file containing the node.
+            node (GPT4DocstringsNode): The node to be documented.
+            request (Callable[[], Awaitable[Docstring]]): Factory of the request coroutine.
+            completion_tokens (int): The expected length of the completion, to estimate its cost.
+            model_name (str): The model the request is sent to.
 
-        lines = []
+        Returns:
+            Awaitable[Optional[NodeResult]]: The result, or `None` if the budget was exhausted.
+        """
+        if self.journal is not None:
+            docstring = self.journal.get(kind, filename, node)
+            if docstring is not None:
+                self.report.incr("Nodes restored from journal")
+                return self._completed(
+                    NodeResult(filename, node.path, kind, docstring, "journal")
+                )
 
-        for i, line in enumerate(source_file.split("\n")):
-            lines.append(line)
-            if i in docstrings_positions:
-                lines.extend(docstrings_positions[i].splitlines())
+        prompt_tokens = PROMPT_TEMPLATE_TOKENS + estimate_tokens(node.source)
+        cost = self.budget.estimate_cost(prompt_tokens, completion_tokens, model_name)
+        elapsed = 0.0
 
-        target_file = "\n".join(lines)
+        async def timed_request():
+            nonlocal elapsed
+            start = time.monotonic()
+            try:
+                return await request()
+            finally:
+                elapsed = time.monotonic() - start
 
-        return target_file
+        result = self.scheduler.submit(
+            node_priority(node, self.references), timed_request, cost
+        )
 
-    @staticmethod
-    def _get_patch_lines(src: str, target: str, filename: str):
-        src_lines = [line + "\n" for line in src.splitlines()]
-        target_lines = [line + "\n" for line in target.splitlines()]
+        async def wait_for_result():
+            try:
+                docstring = await result
+            except BudgetExhaustedError:
+                # A retry (or another further request) of the node was refused
+                self.scheduler.skipped += 1
+                docstring = None
+            if docstring is None:
+                self.report.incr(
+                    "Nodes skipped by interrupt"
+                    if self._stopping
+                    else "Nodes skipped by budget"
+                )
+                return None
 
-        fromfile = "a/" + filename
-        tofile = "b/" + filename
+            # The budget was settled request by request; this is the node's share
+            received_tokens = estimate_tokens(docstring.text)
+            actual_cost = self.budget.estimate_cost(
+                prompt_tokens, received_tokens, model_name
+            )
+            self.report.add_tier_usage(
+                model_name, elapsed, received_tokens, actual_cost
+            )
+            if self.journal is not None:
+                self.journal.record(kind, filename, node, docstring)
+            return NodeResult(
+                filename,
+                node.path,
+                kind,
+                docstring,
+                "model",
+                model_name=model_name,
+                elapsed=elapsed,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=received_tokens,
+                cost=actual_cost,
+            )
+
+        waiter = asyncio.ensure_future(wait_for_result())
+        # Cancelled before it starts, the waiter never awaits (and cancels) the result
+        waiter.add_done_callback(lambda _: result.cancel())
+        return waiter
+
+    def _local_generation(self, node: GPT4DocstringsNode) -> Optional[Docstring]:
+        """Returns the docstring of a trivial node from its template, if it has one."""
+        if self.template_generator is None or node.template is None:
+            return None
+        try:
+            return self.template_generator.generate_docstring(node)
+        except DocstringStyleError:
+            return None
+
+    def _local_translation(self, node: GPT4DocstringsNode) -> Optional[Docstring]:
+        """Returns the docstring converted by the local rules, if they can parse it."""
+        if self.local_translator is None:
+            return None
+        try:
+            return self.local_translator.translate_docstring(node)
+        except DocstringStyleError:
+            return None
 
-        differ = list(
-            difflib.unified_diff(
-                src_lines, target_lines, fromfile=fromfile, tofile=tofile
+    def _generate_node_docstring(
+        self, filename: str, node: GPT4DocstringsNode
+    ) -> Awaitable[Optional[NodeResult]]:
+        """
+        Schedules the generation of the docstring of a node.
+
+        Trivial nodes recognised by the visitor are documented from a template, without
+        any request.
+        """
+        docstring = self._local_generation(node)
+        if docstring is not None:
+            self.report.incr("Requests avoided by templates")
+            return self._completed(
+                NodeResult(filename, node.path, "generation", docstring, "template")
             )
+
+        return self._document_node(
+            "generation",
+            filename,
+            node,
+            lambda: self.docstring_generator.generate_docstring(node),
+            node.token_budget or 0,
+            self.docstring_generator.model_name_for(node),
         )
-        return differ
 
-    def _generate_patch_file(self, src: str, target: str, filename: str):
-        differ = self._get_patch_lines(src, target, filename)
-        self.patches.append(differ)
+    def _translate_node_docstring(
+        self, filename: str, node: GPT4DocstringsNode
+    ) -> Awaitable[Optional[NodeResult]]:
+        """
+        Schedules the translation of the docstring of a node.
 
-    def _write_concatenated_patch_file(self):
-        concatenated_patch = []
+        Docstrings are converted locally when possible; only the ones the local rules
+        can't parse confidently are sent to the model.
+        """
+        docstring = self._local_translation(node)
+        if docstring is not None:
+            self.report.incr("Docstrings translated locally")
+            return self._completed(
+                NodeResult(filename, node.path, "translation", docstring, "local")
+            )
 
-        for patch in self.patches:
-            concatenated_patch.extend(patch)
-            concatenated_patch.append("\n")
+        self.report.incr("Docstrings translated by the model")
+        return self._document_node(
+            "translation",
+            filename,
+            node,
+            lambda: self.docstring_translator.translate_docstring(node),
+            estimate_translation_budget(node.docstring),
+            self.docstring_translator.model_name,
+        )
 
-        if concatenated_patch:
-            with open(
-                "gpt4docstring_docstring_generator_patch.diff", "w"
-            ) as patch_file:
-                patch_file.writelines(concatenated_patch)
+    async def _document_nodes(
+        self,
+        filename: str,
+        nodes: List[GPT4DocstringsNode],
+        kind: str,
+        schedule: Callable[[str, GPT4DocstringsNode], Awaitable[Optional[NodeResult]]],
+        results: Dict[Tuple[str, int], Docstring],
+    ):
+        """
+        Documents the nodes of a file with a bounded number of them in flight.
+
+        Only `max_in_flight_per_file` nodes are scheduled at a time, highest priority
+        first, so very large files don't keep all their prompts and coroutines in memory. Completed docstrings are
+        stored in `results` as they arrive, and published to `aiter_results`; a failing
+        node is logged and skipped without discarding the rest of the file.
+
+        Args:
+            filename (str): The path of the file containing the nodes.
+            nodes (List[GPT4DocstringsNode]): The nodes to document.
+            kind (str): Either "generation" or "translation".
+            schedule (Callable): Schedules the request for a node (generation or translation).
+            results (Dict[Tuple[str, int], Docstring]): The result table of the file,
+                keyed by node path and line, since a property getter and its setter (or
+                redefinitions of a function) share the same path.
+        """
+        # The window is filled by priority, so that the scheduler spends the budget on
+        # the most important nodes of the file rather than on the first ones
+        remaining = iter(
+            sorted(nodes, key=lambda node: node_priority(node, self.references))
+        )
+        in_flight: Dict[asyncio.Future, GPT4DocstringsNode] = {}
+
+        def fill():
+            # After an interrupt, the requests in flight drain but no new one starts
+            while len(in_flight) < self.max_in_flight_per_file and not self._stopping:
+                node = next(remaining, None)
+                if node is None:
+                    return
+                in_flight[asyncio.ensure_future(schedule(filename, node))] = node
+
+        progress = tqdm_asyncio(total=len(nodes))
+        try:
+            fill()
+            while in_flight:
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    node = in_flight.pop(task)
+                    progress.update()
+
+                    if task.exception() is not None:
+                        logging.warning(
+                            f"Could not document {node.path}: {task.exception()}"
+                        )
+                        self.report.incr("Nodes failed")
+                        self._publish(
+                            NodeResult(
+                                filename,
+                                node.path,
+                                kind,
+                                error=str(task.exception()),
+                            )
+                        )
+                        continue
+                    result = task.result()
+                    if result is not None:
+                        result.source_hash = source_hash(node.source)
+                        results[node.path, node.docstring_lineno] = result.docstring
+                        self._publish(result)
+                        if self.verbose > 0:
+                            self.documented_nodes.append([filename, node.name])
+                fill()
+        finally:
+            for task in in_flight:
+                task.cancel()
+            progress.close()
 
     async def generate_file_docstrings(
-        self, filename: str, file_content: str, nodes: List[GPT4DocstringsNode]
-    ) -> str:
+        self,
+        filename: str,
+        file_content: str,
+        nodes: List[GPT4DocstringsNode],
+        results: Dict[Tuple[str, int], Docstring] = None,
+    ) -> List[Edit]:
         """
         Generates docstrings for a single file.
 
@@ -221,90 +750,460 @@ class GPT4Docstrings:
             file_content (str): The content of the file to be processed.
             nodes (List[GPT4DocstringsNode]): The list of `GPT4DocstringsNode` containing nodes from classes and
                 functions
+            results (Dict[Tuple[str, int], Docstring]): The result table where generated
+                docstrings are stored, keyed by node path and line.
 
         Returns:
-            The new file content
+            List[Edit]: The edits inserting the new docstrings into `file_content`.
         """
         nodes = self._filter_inner_nested(self._filter_nodes_generation(nodes))
+        results = {} if results is None else results
 
-        tasks = []
-
-        for node in nodes:
-            tasks.append(self.docstring_generator.generate_docstring(node))
-            self.documented_nodes.append([filename, node.name])
+        await self._document_nodes(
+            filename, nodes, "generation", self._generate_node_docstring, results
+        )
 
-        docstrings = await tqdm_asyncio.gather(*tasks)
-        new_file_content = self._build_file_with_docstrings(file_content, docstrings)
-        return new_file_content
+        return [insertion_edit(docstring) for docstring in results.values()]
 
     async def translate_file_docstrings(
-        self, filename: str, file_content: str, nodes: List[GPT4DocstringsNode]
-    ) -> str:
+        self,
+        filename: str,
+        file_content: str,
+        nodes: List[GPT4DocstringsNode],
+        results: Dict[Tuple[str, int], Docstring] = None,
+    ) -> List[Edit]:
         """
-        Generates docstrings for a single file.
+        Translates the existing docstrings of a single file.
 
         Args:
-            filename (str): The path of the file to generate docstrings for.
+            filename (str): The path of the file to translate docstrings for.
             file_content (str): The content of the file to be processed.
             nodes (List[GPT4DocstringsNode]): The list of `GPT4DocstringsNode` containing nodes from classes and
                 functions
+            results (Dict[Tuple[str, int], Docstring]): The result table where translated
+                docstrings are stored, keyed by node path and line.
 
         Returns:
-            The new file content
+            List[Edit]: The edits replacing the existing docstrings of `file_content`.
         """
         nodes = self._filter_inner_nested(self._filter_nodes_translation(nodes))
+        # Checked before any request, so docstrings already in the style cost nothing
+        nodes = self._filter_nodes_in_style(nodes)
+        results = {} if results is None else results
 
-        tasks = []
+        await self._document_nodes(
+            filename, nodes, "translation", self._translate_node_docstring, results
+        )
 
+        lines = split_lines(file_content)
+        edits = []
         for node in nodes:
-            tasks.append(self.docstring_translator.translate_docstring(node))
-            self.documented_nodes.append([filename, node.name])
+            docstring = results.get((node.path, node.docstring_lineno))
+            if docstring is None:
+                continue
+            if inspect.cleandoc(docstring.text) == node.docstring:
+                # Rewriting it would only change the layout of the docstring
+                self.report.incr("Translations identical to the original")
+                continue
+            edits.append(replacement_edit(lines, node, docstring))
+        return edits
 
-        docstrings = await tqdm_asyncio.gather(*tasks)
+    def _parse_file(self, filename: str, file_content: str) -> List[GPT4DocstringsNode]:
+        """Parses a file and returns its classes / functions nodes."""
+        parsed_tree = ast.parse(file_content)
+        visitor = GPT4DocstringsVisitor(
+            filename=filename, config=GPT4DocstringsConfig(), file_content=file_content
+        )
+        visitor.visit(parsed_tree)
+        self.references.update(reference_counts(parsed_tree))
+        # The nodes don't reference the AST, so the tree is released here
+        return visitor.nodes
 
-        new_file_content = file_content
+    async def _read_files(self, file_queue: asyncio.Queue, n_consumers: int):
+        """
+        Producer stage of the pipeline: discovers, reads and parses the input files.
 
-        for node, docstring in zip(nodes, docstrings, strict=True):
-            new_file_content = new_file_content.replace(
-                node.ast_node.body[0].value.value,
-                docstring.to_str(add_triple_quotes=False),
-            )
-        return new_file_content
+        Files are read asynchronously and pushed into a bounded queue, so the request workers
+        can start documenting the first files while the rest of the tree is still being
+        discovered.
 
-    def run(self):
-        """Generates docstrings for the input files or directories."""
-        filenames = self.get_filenames_from_paths()
-        click.echo(click.style(title, fg="green"))
-        loop = asyncio.get_event_loop()
+        Args:
+            file_queue (asyncio.Queue): The queue feeding the request workers.
+            n_consumers (int): The number of request workers, used to signal the end of the input.
+        """
+        filenames = []
+        try:
+            for filename in self._iter_filenames():
+                if self._stopping or self.budget.exhausted():
+                    break
 
-        for filename in filenames:
-            click.echo(f"\n\n Documenting filename {filename} ... ")
-            with open(filename, encoding="utf-8") as f:
-                file_content = f.read()
+                async with aiofiles.open(filename, encoding="utf-8") as f:
+                    file_content = await f.read()
 
-            parsed_tree = ast.parse(file_content)
-            visitor = GPT4DocstringsVisitor(
-                filename=filename, config=GPT4DocstringsConfig()
-            )
-            visitor.visit(parsed_tree)
+                nodes = self._parse_file(filename, file_content)
+                filenames.append(filename)
+                await file_queue.put(FileJob(filename, file_content, nodes))
+        finally:
+            for _ in range(n_consumers):
+                await file_queue.put(None)
+
+        if filenames:
+            self.common_base = get_common_base(filenames)
+        return filenames
+
+    async def _document_file(self, job: FileJob, write_queue: asyncio.Queue):
+        """
+        Sends the requests for a single file and passes it to the writer stage.
 
-            new_file_content = loop.run_until_complete(
-                self.generate_file_docstrings(filename, file_content, visitor.nodes)
+        Args:
+            job (FileJob): The parsed file.
+            write_queue (asyncio.Queue): The queue feeding the writer stage.
+        """
+        click.echo(f"\n\n Documenting filename {job.filename} ... ")
+        job.edits = await self.generate_file_docstrings(
+            job.filename, job.file_content, job.nodes, job.generated
+        )
+        if self.translate:
+            job.edits += await self.translate_file_docstrings(
+                job.filename, job.file_content, job.nodes, job.translated
             )
-            if self.translate:
-                new_file_content = loop.run_until_complete(
-                    self.translate_file_docstrings(
-                        filename, new_file_content, visitor.nodes
-                    )
+
+        await write_queue.put(job)
+
+    async def _document_files(
+        self,
+        file_queue: asyncio.Queue,
+        write_queue: asyncio.Queue,
+        all_at_once: bool = False,
+    ):
+        """
+        Consumer stage of the pipeline: sends the requests for each file in the queue.
+
+        Args:
+            file_queue (asyncio.Queue): The queue of parsed files.
+            write_queue (asyncio.Queue): The queue feeding the writer stage.
+            all_at_once (bool): If `True`, all the files are documented concurrently and the
+                scheduler is released once every node has been queued, so the nodes of the
+                whole run are ordered by priority.
+        """
+        tasks = []
+        while True:
+            job = await file_queue.get()
+            if job is None:
+                break
+            if self._stopping:
+                # Files that haven't started yet are left for a resumed run
+                continue
+
+            if all_at_once:
+                tasks.append(
+                    asyncio.ensure_future(self._document_file(job, write_queue))
                 )
+            else:
+                await self._document_file(job, write_queue)
+
+        if all_at_once:
+            # Let every file task queue its nodes before dispatching the first one
+            await asyncio.sleep(0)
+            self.scheduler.release()
+            await asyncio.gather(*tasks)
+
+    async def _write_files(self, write_queue: asyncio.Queue):
+        """
+        Writer stage of the pipeline: overwrites the files or stores their patches.
+
+        Args:
+            write_queue (asyncio.Queue): The queue of documented files.
+        """
+        while True:
+            job = await write_queue.get()
+            if job is None:
+                break
 
+            if not job.edits or self.artifact is not None:
+                # Unchanged files are neither rewritten nor diffed, and artifact runs
+                # leave every file untouched
+                continue
+
+            lines = split_lines(job.file_content)
             if self.config.overwrite:
-                self._write_to_file(filename, new_file_content)
+                async with aiofiles.open(job.filename, "w", encoding="utf-8") as f:
+                    await f.write("\n".join(apply_edits(lines, job.edits)))
             else:
-                self._generate_patch_file(file_content, new_file_content, filename)
+                self._generate_patch(lines, job.edits, job.filename)
+
+    async def _run_pipeline(self) -> List[str]:
+        """
+        Runs the read -> request -> write pipeline over all the input files.
+
+        Returns:
+            List[str]: The list of processed filenames.
+        """
+        # With a limited budget, the nodes of the whole run are ordered before spending it
+        all_at_once = self.budget.limited
+        workers = 1 if all_at_once else self.workers
 
-        if not self.config.overwrite:
+        self.budget.start()
+        self.scheduler = NodeScheduler(
+            max_concurrency=self.max_concurrent_requests,
+            budget=self.budget,
+            hold=all_at_once,
+            limiter=self.limiter,
+        )
+        # langchain's requests go through `openai`, which uses this session if it's set
+        # (instead of opening a new session, and connection, for every request)
+        session_token = openai.aiosession.set(self.http_pool.session)
+        file_queue = asyncio.Queue(maxsize=0 if all_at_once else self.max_queued_files)
+        write_queue = asyncio.Queue(maxsize=self.max_queued_files)
+
+        async def document_and_close():
+            await asyncio.gather(
+                *[
+                    self._document_files(file_queue, write_queue, all_at_once)
+                    for _ in range(workers)
+                ]
+            )
+            await write_queue.put(None)
+
+        stages = [
+            asyncio.ensure_future(self._read_files(file_queue, workers)),
+            asyncio.ensure_future(document_and_close()),
+            asyncio.ensure_future(self._write_files(write_queue)),
+        ]
+        try:
+            filenames, _, _ = await asyncio.gather(*stages)
+        finally:
+            for stage in stages:
+                stage.cancel()
+            openai.aiosession.reset(session_token)
+            self._report_connection_stats()
+
+        return filenames
+
+    def _report_connection_stats(self):
+        """Adds the connection reuse of the shared HTTP pool to the run report."""
+        stats = self.http_pool.stats
+        self.report.incr("HTTP requests", stats.requests)
+        self.report.incr("HTTP connections opened", stats.connections_opened)
+        self.report.incr("HTTP connections reused", stats.connections_reused)
+
+    def _request_stop(self):
+        """
+        Handles SIGINT: drops the queued requests and lets the in-flight ones finish.
+
+        A second SIGINT aborts the run immediately.
+        """
+        if self._stopping:
+            raise KeyboardInterrupt
+        self._stopping = True
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        click.echo(
+            "\nInterrupted: finishing in-flight requests. Press Ctrl-C again to abort."
+        )
+
+    def _publish(self, result: NodeResult):
+        """Passes a node result to the artifact and `aiter_results`, if they're used."""
+        if self.artifact is not None:
+            self.artifact.record(result)
+        if self._result_queue is not None:
+            self._result_queue.put_nowait(result)
+
+    def iter_batch_requests(self) -> Iterator[Dict]:
+        """
+        Yields the model requests of a run as batch requests, without sending any.
+
+        The nodes are selected as in a run: the ones documented from templates or
+        translated locally need no request. Identical prompts are requested once.
+
+        Yields:
+            Dict: A line of the batch request file.
+        """
+        seen = set()
+        for filename in self._iter_filenames():
+            nodes = self._parse_file(filename, self._read_file(filename))
+
+            # Oversized nodes can't be requested in a single prompt, so they're left out
+            prompts = [
+                (self.docstring_generator.model_name_for(node), node, "generation")
+                for node in self._filter_inner_nested(
+                    self._filter_nodes_generation(nodes)
+                )
+                if self._local_generation(node) is None
+                and self.docstring_generator.fits_context_window(node)
+            ]
+            if self.translate:
+                nodes = self._filter_inner_nested(self._filter_nodes_translation(nodes))
+                prompts += [
+                    (self.docstring_translator.model_name, node, "translation")
+                    for node in self._filter_nodes_in_style(nodes)
+                    if self._local_translation(node) is None
+                ]
+
+            for model_name, node, kind in prompts:
+                component = (
+                    self.docstring_generator
+                    if kind == "generation"
+                    else self.docstring_translator
+                )
+                prompt = component.build_prompt(node)
+                custom_id = batch_request_id(model_name, prompt)
+                if custom_id in seen:
+                    continue
+                seen.add(custom_id)
+                yield batch_request(
+                    custom_id, model_name, prompt, json_mode=self.structured_output
+                )
+
+    def _start_run(self):
+        """Clears the state of the previous run, so one instance can run many times."""
+        if self._running:
+            raise RuntimeError("GPT4Docstrings runs can't overlap")
+        self._stopping = False
+        self.common_base = pathlib.Path("/")
+        self.documented_nodes = []
+        self.patches = []
+        self.references = Counter()
+        self.report.reset()
+        self.hedger.reset()
+        if self.limiter is not None:
+            self.limiter.reset()
+        self.http_pool.stats = ConnectionStats()
+        self.journal = Journal(self.journal_path, resume=self.resume)
+        if self.artifact_path is not None:
+            self.artifact = ArtifactWriter(self.artifact_path)
+        self._running = True
+
+    async def arun(self) -> List[str]:
+        """
+        Generates docstrings for the input files or directories in the running event loop.
+
+        The instance (and its connection pool) can be reused for several runs, one at a
+        time; call `aclose` once done. Nothing is printed besides the progress, and the
+        process is never exited.
+
+        Returns:
+            List[str]: The list of processed filenames.
+
+        Raises:
+            NoInputFilesError: If the input paths contain no Python file (an empty shard
+                is not an error).
+        """
+        self._start_run()
+        return await self._execute_run()
+
+    async def _execute_run(self) -> List[str]:
+        """Runs the pipeline of a run started by `_start_run`, and writes its results."""
+        try:
+            filenames = await self._run_pipeline()
+        finally:
+            self.journal.close()
+            if self.artifact is not None:
+                self.artifact.close()
+            self._running = False
+
+        if not filenames:
+            self.journal.remove()
+            if self.shard is None:
+                raise NoInputFilesError("No Python files found in the input paths")
+            return filenames
+
+        if not self.config.overwrite and self.artifact is None:
             self._write_concatenated_patch_file()
+        # Unfinished runs keep their journal, to be resumed
+        if not (self.scheduler.skipped or self._stopping):
+            self.journal.remove()
+        return filenames
+
+    async def aiter_results(self) -> AsyncIterator[NodeResult]:
+        """
+        Runs `arun` and yields the result of every node as soon as it's documented.
+
+        Leaving the loop early cancels the run.
+
+        Yields:
+            NodeResult: The docstring (or error) of a node, with its usage and timings.
+        """
+        # An overlapping run is refused before the queue of the active one is replaced
+        self._start_run()
+        self._result_queue = queue = asyncio.Queue()
+        run = asyncio.ensure_future(self._execute_run())
+        run.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                result = await queue.get()
+                if result is None:
+                    break
+                yield result
+            await run
+        finally:
+            self._result_queue = None
+            if not run.done():
+                run.cancel()
+                await asyncio.gather(run, return_exceptions=True)
+
+    async def aclose(self):
+        """Releases the connections kept alive between runs."""
+        await self.http_pool.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def run(self):
+        """Generates docstrings for the input files or directories.
+
+        This is the command-line entry point: it owns the event loop, handles SIGINT and
+        exits the process on errors. Use `arun` or `aiter_results` inside an existing
+        event loop.
+        """
+        click.echo(click.style(title, fg="green"))
+        try:
+            loop = asyncio.get_event_loop()
+        except RuntimeError:
+            # The current loop may have been closed and unset by `asyncio.run`
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._request_stop)
+        except (NotImplementedError, RuntimeError):
+            # Signal handlers are not available on Windows nor outside the main thread
+            pass
+
+        try:
+            filenames = loop.run_until_complete(self.arun())
+        except NoInputFilesError as e:
+            logging.error(e)
+            return sys.exit(1)
+        finally:
+            try:
+                loop.remove_signal_handler(signal.SIGINT)
+            except (NotImplementedError, RuntimeError):
+                pass
+            loop.run_until_complete(self.aclose())
+
+        if not filenames:
+            click.echo("No files belong to this shard.")
+            return
 
         if self.verbose > 0:
             self.__print_pretty_documentation_table()
+            self.report.print()
+
+        if self.scheduler.skipped:
+            click.echo(
+                f"Budget exhausted: {self.scheduler.skipped} nodes were left undocumented. "
+                f"Completed docstrings are kept in {self.journal_path}, "
+                "run again with `--resume` and a new budget to continue."
+            )
+            return
+
+        if self._stopping:
+            click.echo(
+                f"Run interrupted. Completed docstrings are kept in {self.journal_path}, "
+                "run again with `--resume` to continue."
+            )
+            return sys.exit(130)
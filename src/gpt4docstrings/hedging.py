@@ -0,0 +1,202 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable
+from typing import Callable
+from typing import Deque
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+
+from gpt4docstrings.concurrency import AdaptiveConcurrencyLimiter
+from gpt4docstrings.concurrency import is_rate_limit_error
+from gpt4docstrings.exceptions import RequestTimeoutError
+from gpt4docstrings.report import percentile
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.scheduler import RunBudget
+
+T = TypeVar("T")
+
+DEFAULT_MAX_HEDGE_RATE = 0.1
+# Latencies observed before a model's percentile is trusted to trigger hedges
+MIN_LATENCY_SAMPLES = 20
+LATENCY_WINDOW = 500
+
+
+class RequestHedger:
+    """
+    Bounds the latency of the model requests with timeouts and hedged requests.
+
+    Every request is given `timeout` seconds to answer. With hedging enabled, once a
+    request has been waiting longer than the `hedge_percentile` of the latencies recently
+    observed for its model, a duplicate request is sent: the first answer is kept and the
+    other request is cancelled. The share of hedged requests is capped by
+    `max_hedge_rate`, so a slow API isn't flooded with duplicates.
+
+    The latencies, rate-limit errors and timeouts of the requests are also reported to
+    the adaptive concurrency `limiter`, if any. Every request sent, hedges included, is
+    charged to the `budget` of the run, if any, and settled against its actual usage.
+
+    Args:
+        timeout (float): Maximum seconds for a request, hedges included, if any.
+        hedge (bool): If `True`, slow requests are hedged.
+        max_hedge_rate (float): Maximum ratio of hedged requests to requests.
+        hedge_percentile (float): Latency percentile after which a request is hedged.
+        limiter (AdaptiveConcurrencyLimiter): The controller of the requests in flight.
+        budget (RunBudget): The budget the requests are charged to.
+    """
+
+    def __init__(
+        self,
+        timeout: float = None,
+        hedge: bool = False,
+        max_hedge_rate: float = DEFAULT_MAX_HEDGE_RATE,
+        hedge_percentile: float = 95,
+        limiter: AdaptiveConcurrencyLimiter = None,
+        budget: RunBudget = None,
+    ):
+        self.timeout = timeout
+        self.hedge = hedge
+        self.max_hedge_rate = max_hedge_rate
+        self.hedge_percentile = hedge_percentile
+        self.limiter = limiter
+        self.budget = budget
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.requests = 0
+        self.hedges = 0
+
+    def reset(self):
+        """Clears the hedge rate counts, before a new run. Latencies are kept."""
+        self.requests = 0
+        self.hedges = 0
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """Returns how long a request of `key` waits before being hedged, if it can be."""
+        latencies = self.latencies.get(key, ())
+        if not self.hedge or len(latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        return percentile(latencies, self.hedge_percentile)
+
+    def _can_hedge(self) -> bool:
+        return self.hedges + 1 <= self.max_hedge_rate * self.requests
+
+    def _budget_exhausted(self, tokens: Tuple[int, int], key: str) -> bool:
+        if self.budget is None:
+            return False
+        return self.budget.exhausted(self.budget.estimate_cost(*tokens, key))
+
+    def _record(self, key: str, latency: float):
+        window = self.latencies.setdefault(key, deque(maxlen=LATENCY_WINDOW))
+        window.append(latency)
+
+    async def _attempt(
+        self,
+        request: Callable[[], Awaitable[T]],
+        key: str,
+        tokens: Tuple[int, int],
+        usage: Callable[[T], Tuple[int, int]],
+    ):
+        """Runs a single request, charging it to the budget, and records its own latency."""
+        charged = None
+        if self.budget is not None:
+            charged = self.budget.charge_request(
+                self.budget.estimate_cost(*tokens, key)
+            )
+        start = time.monotonic()
+        try:
+            result = await request()
+        except Exception as e:
+            if self.limiter is not None and is_rate_limit_error(e):
+                self.limiter.record_overload(key)
+            raise
+        latency = time.monotonic() - start
+        self._record(key, latency)
+        if self.limiter is not None:
+            self.limiter.record_latency(key, latency)
+        if charged is not None and usage is not None:
+            self.budget.settle(charged, self.budget.estimate_cost(*usage(result), key))
+        return result
+
+    async def run(
+        self,
+        request: Callable[[], Awaitable[T]],
+        key: str = None,
+        report: RunReport = None,
+        tokens: Tuple[int, int] = (0, 0),
+        usage: Callable[[T], Tuple[int, int]] = None,
+    ) -> T:
+        """
+        Runs a request, hedging it if it's too slow.
+
+        Args:
+            request (Callable[[], Awaitable[T]]): Sends the request. It's called again for
+                the hedge, so it must be safe to run twice.
+            key (str): The latencies the request is compared with (e.g. the model name).
+            report (RunReport): The report collecting the latencies and hedge counts.
+            tokens (Tuple[int, int]): The estimated (prompt, completion) tokens of the
+                request, charged to the budget before it's sent.
+            usage (Callable[[T], Tuple[int, int]]): Returns the actual (prompt,
+                completion) tokens of a result, to settle its cost.
+
+        Returns:
+            T: The result of the first request to succeed.
+
+        Raises:
+            RequestTimeoutError: If no answer arrived within `timeout` seconds.
+            BudgetExhaustedError: If the budget can't afford the request.
+        """
+        report = report or RunReport()
+        self.requests += 1
+        start = time.monotonic()
+        deadline = start + self.timeout if self.timeout else None
+        primary = asyncio.ensure_future(self._attempt(request, key, tokens, usage))
+        tasks = {primary}
+        hedge_at = self.hedge_delay(key)
+
+        try:
+            while True:
+                now = time.monotonic()
+                wait_until = deadline
+                if hedge_at is not None:
+                    wait_until = min(start + hedge_at, deadline or float("inf"))
+                done, _ = await asyncio.wait(
+                    tasks,
+                    timeout=None if wait_until is None else max(wait_until - now, 0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None:
+                        if task is not primary:
+                            report.incr("Hedges won")
+                        report.add_latency(time.monotonic() - start)
+                        return task.result()
+                    if not tasks:
+                        raise task.exception()
+
+                if done:
+                    continue
+                if deadline is not None and time.monotonic() >= deadline:
+                    report.incr("Requests timed out")
+                    if self.limiter is not None:
+                        self.limiter.record_overload(key, reason="timed out")
+                    raise RequestTimeoutError(
+                        f"No answer from {key or 'the model'} within {self.timeout} s"
+                    )
+                # The hedge point is reached: hedge at most once, within the rate cap
+                hedge_at = None
+                if self._can_hedge() and not self._budget_exhausted(tokens, key):
+                    self.hedges += 1
+                    report.incr("Hedged requests")
+                    tasks.add(
+                        asyncio.ensure_future(
+                            self._attempt(request, key, tokens, usage)
+                        )
+                    )
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+import attr
+
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.visit import GPT4DocstringsNode
+
+DEFAULT_JOURNAL_PATH = ".gpt4docstrings_journal.jsonl"
+
+
+def source_hash(source: str) -> str:
+    """Returns a stable hash of a node source, used to detect stale results."""
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+@attr.s
+class JournalEntry:
+    """
+    A completed node result stored in the journal.
+
+    Args:
+        kind (str): Either "generation" or "translation".
+        filename (str): The path of the file containing the node.
+        path (str): Pseudo-import path to the node (e.g., "sample.py:MyClass.my_method").
+        source_hash (str): Hash of the node source when the docstring was generated.
+        docstring (str): The text of the docstring, without quotes or indentation.
+    """
+
+    kind = attr.ib()
+    filename = attr.ib()
+    path = attr.ib()
+    source_hash = attr.ib()
+    docstring = attr.ib()
+
+    @property
+    def key(self) -> Tuple[str, str, str, str]:
+        return self.kind, self.filename, self.path, self.source_hash
+
+
+class Journal:
+    """
+    Append-only journal of completed node results.
+
+    Every result is appended and flushed as soon as it arrives, so a run that dies
+    halfway can be resumed without requesting the completed nodes again.
+
+    Args:
+        path (str): The path of the journal file.
+        resume (bool): If `True`, the existing journal is replayed and extended. Otherwise, it's truncated.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH, resume: bool = False):
+        self.path = path
+        self.entries: Dict[Tuple[str, str, str, str], JournalEntry] = {}
+
+        if resume and os.path.exists(path):
+            self._replay()
+
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _replay(self):
+        """Loads the entries of an existing journal, ignoring a torn last line."""
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = JournalEntry(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue
+                self.entries[entry.key] = entry
+
+    def get(
+        self, kind: str, filename: str, node: GPT4DocstringsNode
+    ) -> Optional[Docstring]:
+        """
+        Returns the journaled docstring of a node, if its source hasn't changed.
+
+        Args:
+            kind (str): Either "generation" or "translation".
+            filename (str): The path of the file containing the node.
+            node (GPT4DocstringsNode): The node to look up.
+
+        Returns:
+            Optional[Docstring]: The journaled docstring or `None` if the node is not finished.
+        """
+        entry = self.entries.get((kind, filename, node.path, source_hash(node.source)))
+        if entry is None:
+            return None
+        return Docstring(
+            text=entry.docstring,
+            col_offset=4 + node.col_offset,
+            lineno=node.docstring_lineno,
+        )
+
+    def record(
+        self, kind: str, filename: str, node: GPT4DocstringsNode, docstring: Docstring
+    ):
+        """
+        Appends a completed node result to the journal and flushes it.
+
+        Args:
+            kind (str): Either "generation" or "translation".
+            filename (str): The path of the file containing the node.
+            node (GPT4DocstringsNode): The documented node.
+            docstring (Docstring): The generated docstring.
+        """
+        entry = JournalEntry(
+            kind=kind,
+            filename=filename,
+            path=node.path,
+            source_hash=source_hash(node.source),
+            docstring=docstring.text,
+        )
+        self.entries[entry.key] = entry
+        self._file.write(json.dumps(attr.asdict(entry)) + "\n")
+        self._file.flush()
+
+    def close(self):
+        """Syncs the journal to disk and closes it."""
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    def remove(self):
+        """Closes and deletes the journal once the run has completed."""
+        self.close()
+        os.remove(self.path)
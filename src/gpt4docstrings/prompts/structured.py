@@ -0,0 +1,8 @@
+# Appended to the prompts in structured-output mode, where the model answers with JSON
+STRUCTURED_OUTPUT_INSTRUCTIONS = """
+
+Answer with a JSON object with a single "docstring" key, whose value is the text of the
+docstring, without the triple quotes nor any indentation. For example:
+
+{"docstring": "Calculate the average of a list of numbers.\\n\\nArgs:\\n    ..."}
+"""
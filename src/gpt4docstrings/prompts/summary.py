@@ -0,0 +1,11 @@
+# Sent for each chunk of the body of a node too large for the context window
+SUMMARY_PROMPT = """
+This is part {part} of {parts} of the body of the Python {kind} `{name}`:
+
+```python
+{code}
+```
+
+Summarize what this part does in a few sentences. Mention the parameters and attributes
+it uses, the values it returns or yields, and the exceptions it raises.
+"""
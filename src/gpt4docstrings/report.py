@@ -0,0 +1,309 @@
+import math
+from collections import Counter
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import attr
+from colorama import Fore
+from tabulate import tabulate
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """
+    Returns the `q`-th percentile of `values` (nearest rank), or `None` if empty.
+
+    Args:
+        values (Sequence[float]): The values.
+        q (float): The percentile, between 0 and 100.
+
+    Returns:
+        Optional[float]: The smallest value greater than or equal to `q`% of the values.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(math.ceil(q * len(values) / 100), 1)
+    return values[rank - 1]
+
+
+@attr.s
+class CompletionStats:
+    """
+    Metrics collected for a single completion request.
+
+    Args:
+        path (str): Pseudo-import path to the node (e.g., "sample.py:MyClass.my_method").
+        elapsed (float): Seconds until the completion was available.
+        time_to_first_docstring (float): Seconds until the opening triple quotes were received, if any.
+        tokens_received (int): Number of tokens (stream chunks) received from the model.
+        budget_unused (int): Tokens of `max_tokens` left unused because the stream was stopped
+            early, if known. It bounds the tokens saved: the model may have stopped sooner.
+        stopped_early (bool): Indicates whether the stream was cancelled after the closing triple quotes.
+        truncated (bool): Indicates whether the completion hit its `max_tokens` budget.
+    """
+
+    path = attr.ib()
+    elapsed = attr.ib()
+    time_to_first_docstring = attr.ib(default=None)
+    tokens_received = attr.ib(default=0)
+    budget_unused = attr.ib(default=None)
+    stopped_early = attr.ib(default=False)
+    truncated = attr.ib(default=False)
+
+
+@attr.s
+class EndpointStats:
+    """
+    Throughput and health of the requests sent to a member of an endpoint pool.
+
+    Args:
+        name (str): The name of the endpoint.
+        requests (int): Number of requests answered by the endpoint.
+        failures (int): Number of requests failed (and failed over) by the endpoint.
+        elapsed (float): Total seconds spent waiting for the answered requests.
+        completion_tokens (int): Tokens (reported or estimated) of the completions.
+        ejections (int): Number of times the endpoint was taken out as unhealthy.
+    """
+
+    name = attr.ib()
+    requests = attr.ib(default=0)
+    failures = attr.ib(default=0)
+    elapsed = attr.ib(default=0.0)
+    completion_tokens = attr.ib(default=0)
+    ejections = attr.ib(default=0)
+
+
+@attr.s
+class TierStats:
+    """
+    Throughput and cost of the requests sent to a model.
+
+    Args:
+        model_name (str): The model the requests were sent to.
+        nodes (int): Number of nodes documented by the model.
+        elapsed (float): Total seconds spent waiting for the completions.
+        completion_tokens (int): Estimated number of tokens of the completions.
+        cost (float): Estimated cost of the requests in USD.
+    """
+
+    model_name = attr.ib()
+    nodes = attr.ib(default=0)
+    elapsed = attr.ib(default=0.0)
+    completion_tokens = attr.ib(default=0)
+    cost = attr.ib(default=0.0)
+
+
+class RunReport:
+    """
+    Collects the metrics of a run and prints them as tables at the end of it.
+
+    Attributes:
+        counters (Counter): Run-level counters (e.g., number of requests avoided).
+        completions (List[CompletionStats]): Per-node completion metrics.
+        tiers (Dict[str, TierStats]): Per-model throughput and cost.
+        latencies (List[float]): Seconds until each model request was answered, hedges
+            and timeouts included.
+        concurrency_limits (List[Tuple[float, int]]): The adaptive concurrency limit over
+            time, as (seconds since the start of the run, limit) pairs.
+        endpoints (Dict[str, EndpointStats]): Per-endpoint throughput and health, when
+            the requests are balanced across several endpoints.
+    """
+
+    def __init__(self):
+        self.counters: Counter = Counter()
+        self.completions: List[CompletionStats] = []
+        self.tiers: Dict[str, TierStats] = {}
+        self.latencies: List[float] = []
+        self.concurrency_limits: List[Tuple[float, int]] = []
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    def reset(self):
+        """Clears the metrics, before a new run."""
+        self.counters.clear()
+        self.completions.clear()
+        self.tiers.clear()
+        self.latencies.clear()
+        self.concurrency_limits.clear()
+        self.endpoints.clear()
+
+    def incr(self, name: str, value: int = 1):
+        """Increments the run-level counter `name` by `value`."""
+        self.counters[name] += value
+
+    def add_completion(self, stats: CompletionStats):
+        """Records the metrics of a completion request."""
+        self.completions.append(stats)
+
+    def add_latency(self, elapsed: float):
+        """Records the latency of an answered model request."""
+        self.latencies.append(elapsed)
+
+    def add_concurrency_limit(self, elapsed: float, limit: int):
+        """Records a change of the adaptive concurrency limit."""
+        self.concurrency_limits.append((elapsed, limit))
+
+    def concurrency_rows(self, max_rows: int = 20) -> List[List]:
+        """Returns the concurrency limit over time as table rows, evenly sampled."""
+        limits = self.concurrency_limits
+        if len(limits) > max_rows:
+            step = (len(limits) - 1) / (max_rows - 1)
+            limits = [limits[round(i * step)] for i in range(max_rows)]
+        return [[round(elapsed, 1), limit] for elapsed, limit in limits]
+
+    def latency_percentiles(self) -> Dict[str, float]:
+        """Returns the p50, p95 and p99 request latencies, in seconds."""
+        if not self.latencies:
+            return {}
+        return {f"p{q}": percentile(self.latencies, q) for q in (50, 95, 99)}
+
+    def add_tier_usage(
+        self, model_name: str, elapsed: float, completion_tokens: int, cost: float
+    ):
+        """Records a node documented by `model_name`."""
+        stats = self.tiers.setdefault(model_name, TierStats(model_name))
+        stats.nodes += 1
+        stats.elapsed += elapsed
+        stats.completion_tokens += completion_tokens
+        stats.cost += cost
+
+    def endpoint_stats(self, name: str) -> EndpointStats:
+        """Returns the stats of an endpoint, created on first use."""
+        return self.endpoints.setdefault(name, EndpointStats(name))
+
+    def endpoint_rows(self) -> List[List]:
+        """Returns the per-endpoint throughput and health as table rows."""
+        total = sum(stats.requests for stats in self.endpoints.values())
+        return [
+            [
+                stats.name,
+                stats.requests,
+                f"{stats.requests / total:.0%}" if total else "-",
+                stats.failures,
+                stats.ejections,
+                round(stats.elapsed / stats.requests, 2) if stats.requests else "-",
+                (
+                    round(stats.completion_tokens / stats.elapsed, 1)
+                    if stats.elapsed
+                    else "-"
+                ),
+            ]
+            for stats in self.endpoints.values()
+        ]
+
+    def tier_rows(self) -> List[List]:
+        """Returns the per-model throughput and cost as table rows."""
+        return [
+            [
+                stats.model_name,
+                stats.nodes,
+                round(stats.elapsed / stats.nodes, 2),
+                (
+                    round(stats.completion_tokens / stats.elapsed, 1)
+                    if stats.elapsed
+                    else "-"
+                ),
+                round(stats.cost, 4),
+            ]
+            for stats in self.tiers.values()
+        ]
+
+    def completion_rows(self) -> List[List]:
+        """Returns the per-node completion metrics as table rows."""
+        return [
+            [
+                stats.path,
+                round(stats.elapsed, 2),
+                (
+                    "-"
+                    if stats.time_to_first_docstring is None
+                    else round(stats.time_to_first_docstring, 2)
+                ),
+                stats.tokens_received,
+                "-" if stats.budget_unused is None else stats.budget_unused,
+                stats.stopped_early,
+            ]
+            for stats in self.completions
+        ]
+
+    def summary(self) -> Dict[str, int]:
+        """Returns the run-level counters sorted by name."""
+        return dict(sorted(self.counters.items()))
+
+    def print(self):
+        """Prints the collected metrics."""
+        if self.completions:
+            headers = [
+                "Node",
+                "Elapsed (s)",
+                "Time to first docstring (s)",
+                "Tokens received",
+                "Budget unused",
+                "Stopped early",
+            ]
+            print(
+                Fore.GREEN
+                + tabulate(self.completion_rows(), headers, tablefmt="outline")
+            )
+
+        if self.tiers:
+            headers = [
+                "Model",
+                "Nodes",
+                "Mean latency (s)",
+                "Tokens / s",
+                "Estimated cost ($)",
+            ]
+            print(Fore.GREEN + tabulate(self.tier_rows(), headers, tablefmt="outline"))
+
+        if self.endpoints:
+            headers = [
+                "Endpoint",
+                "Requests",
+                "Share",
+                "Failures",
+                "Ejections",
+                "Mean latency (s)",
+                "Tokens / s",
+            ]
+            print(
+                Fore.GREEN + tabulate(self.endpoint_rows(), headers, tablefmt="outline")
+            )
+
+        if self.latencies:
+            percentiles = self.latency_percentiles()
+            print(
+                Fore.GREEN
+                + tabulate(
+                    [
+                        [
+                            len(self.latencies),
+                            *map("{:.2f}".format, percentiles.values()),
+                        ]
+                    ],
+                    ["Requests", *[f"{name} latency (s)" for name in percentiles]],
+                    tablefmt="outline",
+                )
+            )
+
+        if self.concurrency_limits:
+            print(
+                Fore.GREEN
+                + tabulate(
+                    self.concurrency_rows(),
+                    ["Time (s)", "Concurrency limit"],
+                    tablefmt="outline",
+                )
+            )
+
+        if self.counters:
+            print(
+                Fore.GREEN
+                + tabulate(
+                    list(self.summary().items()),
+                    ["Metric", "Value"],
+                    tablefmt="outline",
+                )
+            )
@@ -0,0 +1,85 @@
+import re
+from typing import List
+from typing import Sequence
+
+import attr
+
+from gpt4docstrings.visit import GPT4DocstringsNode
+
+# A threshold is a trailing `:<integer>`. Fine-tuned model names contain colons too
+# (`ft:gpt-3.5-turbo:org::id`), so an empty field before it belongs to the name.
+_TIER_PATTERN = re.compile(r"(?P<model_name>.+?)(?:(?<!:):(?P<max_complexity>\d+))?")
+
+
+@attr.s(frozen=True)
+class ModelTier:
+    """
+    A rung of the model ladder.
+
+    Args:
+        model_name (str): The model documenting the nodes of this tier.
+        max_complexity (int): Highest complexity score routed to this tier, or `None`
+            for the last tier, which takes every remaining node.
+    """
+
+    model_name = attr.ib()
+    max_complexity = attr.ib(default=None)
+
+
+def parse_model_ladder(value: str) -> List[ModelTier]:
+    """
+    Parses a model ladder such as "gpt-3.5-turbo:6,gpt-4".
+
+    Every tier but the last one is given as `model:max_complexity`, with increasing
+    thresholds. The last tier takes every node above the previous thresholds. Only a
+    trailing integer is read as a threshold, so model names may contain colons.
+
+    Args:
+        value (str): The ladder specification.
+
+    Returns:
+        List[ModelTier]: The tiers, from the cheapest to the strongest model.
+
+    Raises:
+        ValueError: If the specification is malformed.
+    """
+    ladder = []
+    for item in (item.strip() for item in value.split(",")):
+        match = _TIER_PATTERN.fullmatch(item)
+        if match is None or match["model_name"].startswith(":"):
+            raise ValueError(f"Invalid model tier '{item}'")
+
+        threshold = match["max_complexity"]
+        if threshold is not None:
+            threshold = int(threshold)
+        ladder.append(ModelTier(match["model_name"], threshold))
+
+    if ladder[-1].max_complexity is not None:
+        raise ValueError("The last model tier can't have a complexity threshold")
+
+    thresholds = [tier.max_complexity for tier in ladder[:-1]]
+    if None in thresholds:
+        raise ValueError("Every model tier but the last one needs a threshold")
+    if thresholds != sorted(set(thresholds)):
+        raise ValueError("The complexity thresholds must be increasing")
+    return ladder
+
+
+class ModelRouter:
+    """
+    Routes every node to the cheapest tier of a model ladder able to document it.
+
+    Args:
+        ladder (Sequence[ModelTier]): The tiers, from the cheapest to the strongest model.
+    """
+
+    def __init__(self, ladder: Sequence[ModelTier]):
+        self.ladder = list(ladder)
+
+    def route(self, node: GPT4DocstringsNode) -> ModelTier:
+        """Returns the tier a node is sent to, according to its complexity score."""
+        complexity = node.complexity or 0
+        for tier in self.ladder[:-1]:
+            if complexity <= tier.max_complexity:
+                return tier
+        return self.ladder[-1]
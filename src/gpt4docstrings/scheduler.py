@@ -0,0 +1,390 @@
+import ast
+import asyncio
+import heapq
+import itertools
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Awaitable
+from typing import Callable
+from typing import Optional
+from typing import Tuple
+
+import attr
+
+from gpt4docstrings.concurrency import AdaptiveConcurrencyLimiter
+from gpt4docstrings.exceptions import BudgetExhaustedError
+from gpt4docstrings.visit import GPT4DocstringsNode
+from gpt4docstrings.visit import GPT4DocstringsVisitor
+
+# USD per 1K (prompt, completion) tokens
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.0015, 0.002),
+    "gpt-3.5-turbo-16k": (0.003, 0.004),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-32k": (0.06, 0.12),
+}
+# Unknown models are priced as the most expensive one, so `max_cost` is never exceeded
+DEFAULT_PRICE = max(MODEL_PRICES.values())
+
+# Tokens of the prompt and completion a model can take at once
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16385,
+    "gpt-3.5-turbo-1106": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-1106-preview": 128000,
+}
+# Unknown models get the smallest window, so no request is sent beyond their limit
+DEFAULT_CONTEXT_WINDOW = min(MODEL_CONTEXT_WINDOWS.values())
+
+# Tokens of the few-shot prompt templates surrounding the node source
+PROMPT_TEMPLATE_TOKENS = 350
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimates the number of tokens of a text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def get_context_window(model_name: str) -> int:
+    """Returns the context window of a model, in tokens."""
+    return MODEL_CONTEXT_WINDOWS.get(model_name, DEFAULT_CONTEXT_WINDOW)
+
+
+def parse_context_window(value: str) -> Tuple[Optional[str], int]:
+    """
+    Parses a context window given as "8192" or as "model=8192".
+
+    Args:
+        value (str): The context window, optionally prefixed by the model it applies to.
+
+    Returns:
+        Tuple[Optional[str], int]: The model name (`None` if not given) and the window.
+
+    Raises:
+        ValueError: If the specification is malformed.
+    """
+    model_name, _, window = value.rpartition("=")
+    model_name = model_name.strip()
+    try:
+        window = int(window)
+    except ValueError:
+        raise ValueError(
+            f"The context window of '{value}' must be an integer"
+        ) from None
+    if window < 1:
+        raise ValueError(f"The context window of '{value}' must be positive")
+    return model_name or None, window
+
+
+@attr.s
+class Reservation:
+    """
+    The budget charged by the scheduler for the first request of a node.
+
+    Args:
+        cost (float): The estimated cost of the request in USD.
+        used (bool): Whether a request was sent against it.
+    """
+
+    cost = attr.ib()
+    used = attr.ib(default=False)
+
+
+# The reservation of the node whose requests are sent by the current task
+current_reservation: ContextVar[Optional[Reservation]] = ContextVar(
+    "current_reservation", default=None
+)
+
+
+@attr.s
+class RunBudget:
+    """
+    Limits of a run, by wall-clock time, number of requests and estimated cost.
+
+    Args:
+        model_name (str): The model used for the requests, to estimate their cost.
+        max_time (float): Maximum wall-clock seconds, if any.
+        max_requests (int): Maximum number of requests, if any.
+        max_cost (float): Maximum estimated cost in USD, if any.
+    """
+
+    model_name = attr.ib(default="gpt-3.5-turbo")
+    max_time = attr.ib(default=None)
+    max_requests = attr.ib(default=None)
+    max_cost = attr.ib(default=None)
+    requests = attr.ib(default=0, init=False)
+    cost = attr.ib(default=0.0, init=False)
+    started_at = attr.ib(factory=time.monotonic, init=False)
+
+    @property
+    def limited(self) -> bool:
+        """Whether any limit has been set."""
+        return any(
+            limit is not None
+            for limit in (self.max_time, self.max_requests, self.max_cost)
+        )
+
+    def start(self):
+        """Starts the wall-clock of the run and clears the spent budget."""
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.cost = 0.0
+
+    def estimate_cost(
+        self, prompt_tokens: int, completion_tokens: int, model_name: str = None
+    ) -> float:
+        """Estimates the cost of a request in USD, sent to `model_name` or the run's model."""
+        prompt_price, completion_price = MODEL_PRICES.get(
+            model_name or self.model_name, DEFAULT_PRICE
+        )
+        return (
+            prompt_tokens * prompt_price + completion_tokens * completion_price
+        ) / 1000
+
+    def exhausted(self, cost: float = 0.0) -> bool:
+        """
+        Checks whether the budget is exhausted or can't afford a new request.
+
+        Args:
+            cost (float): The estimated cost of the next request.
+
+        Returns:
+            bool: `True` if no more requests should be sent.
+        """
+        if (
+            self.max_time is not None
+            and time.monotonic() - self.started_at >= self.max_time
+        ):
+            return True
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            return True
+        if self.max_cost is not None and self.cost + cost > self.max_cost:
+            return True
+        return False
+
+    def charge(self, cost: float):
+        """Accounts for a request about to be sent."""
+        self.requests += 1
+        self.cost += cost
+
+    def charge_request(self, cost: float) -> float:
+        """
+        Accounts for a model request about to be sent to the backend.
+
+        The first request of a node uses the reservation charged when the scheduler
+        dispatched the node. The following ones (retries, re-requests of truncated
+        completions, hedges, summaries) are charged here, and refused once the budget is
+        exhausted.
+
+        Args:
+            cost (float): The estimated cost of the request in USD.
+
+        Returns:
+            float: The cost charged, to be settled against the actual cost of the request.
+
+        Raises:
+            BudgetExhaustedError: If the budget can't afford the request.
+        """
+        reservation = current_reservation.get()
+        if reservation is not None and not reservation.used:
+            reservation.used = True
+            return reservation.cost
+        if self.exhausted(cost):
+            raise BudgetExhaustedError("The budget of the run is exhausted")
+        self.charge(cost)
+        return cost
+
+    def refund(self, cost: float):
+        """Cancels the charge of a request that was never sent."""
+        self.requests -= 1
+        self.cost -= cost
+
+    def settle(self, reserved: float, actual: float):
+        """Replaces the reserved cost of a request with its actual estimate."""
+        self.cost += actual - reserved
+
+
+def reference_counts(tree: ast.AST) -> Counter:
+    """Counts how many times each name is referenced in a module."""
+    counts = Counter()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            counts[node.id] += 1
+        elif isinstance(node, ast.Attribute):
+            counts[node.attr] += 1
+    return counts
+
+
+def node_priority(
+    node: GPT4DocstringsNode, references: Counter
+) -> Tuple[int, int, int]:
+    """
+    Returns the priority of a node (lower goes first).
+
+    Public nodes go before semiprivate and private ones, top-level nodes before nested
+    ones, and heavily referenced nodes before rarely referenced ones.
+
+    Args:
+        node (GPT4DocstringsNode): The node to be documented.
+        references (Counter): Number of references to each name in the run.
+
+    Returns:
+        Tuple[int, int, int]: The priority of the node.
+    """
+    if GPT4DocstringsVisitor._is_private(node):
+        visibility = 2
+    elif GPT4DocstringsVisitor._is_semiprivate(node):
+        visibility = 1
+    else:
+        visibility = 0
+    return visibility, node.level, -references[node.name]
+
+
+class NodeScheduler:
+    """
+    Priority queue in front of the docstring generator and translator.
+
+    Requests are dispatched by priority with a bounded number of requests in flight.
+    A request the budget can't afford waits for the requests in flight to be settled,
+    and is dropped (resolving to `None`) if it still can't be afforded once they are.
+    Cancelling the future of a request drops it, or cancels it if it's running. After
+    `stop`, only the requests in flight are completed.
+    Each dispatched request is charged one model request, its `Reservation`; the further
+    requests it sends are charged by `RunBudget.charge_request`.
+
+    Args:
+        max_concurrency (int): Maximum number of requests in flight.
+        budget (RunBudget): The limits of the run.
+        hold (bool): If `True`, nothing is dispatched until `release` is called, so all
+            the nodes of the run are ordered before the budget is spent.
+        limiter (AdaptiveConcurrencyLimiter): If set, the requests in flight are also
+            bounded by its adaptive limit.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        budget: RunBudget = None,
+        hold: bool = False,
+        limiter: AdaptiveConcurrencyLimiter = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.limiter = limiter
+        if limiter is not None:
+            # A raised limit starts the waiting requests at once
+            limiter.on_change = self._dispatch
+        self.budget = budget or RunBudget()
+        self.held = hold
+        self.stopped = False
+        self.running = 0
+        self.skipped = 0
+        self._heap = []
+        self._counter = itertools.count()
+
+    def release(self):
+        """Starts dispatching the held requests."""
+        self.held = False
+        self._dispatch()
+
+    def stop(self):
+        """Lets the requests in flight finish, and drops the queued and future ones."""
+        self.stopped = True
+        while self._heap:
+            *_, future = heapq.heappop(self._heap)
+            if not future.done():
+                future.set_result(None)
+
+    def submit(
+        self,
+        priority: Tuple,
+        request: Callable[[], Awaitable],
+        cost: float = 0.0,
+    ) -> asyncio.Future:
+        """
+        Queues a request.
+
+        The request is queued as soon as this method is called, so all the requests
+        submitted before yielding to the event loop are ordered together.
+
+        Args:
+            priority (Tuple): The priority of the request (lower goes first).
+            request (Callable[[], Awaitable]): Factory of the request coroutine.
+            cost (float): The estimated cost of the request in USD.
+
+        Returns:
+            asyncio.Future: The result of the request, or `None` if it was dropped by the
+                budget or by `stop`.
+        """
+        future = asyncio.get_event_loop().create_future()
+        if self.stopped:
+            future.set_result(None)
+            return future
+        heapq.heappush(
+            self._heap, (priority, next(self._counter), request, cost, future)
+        )
+        self._dispatch()
+        return future
+
+    @property
+    def concurrency(self) -> int:
+        """The number of requests allowed in flight."""
+        if self.limiter is None:
+            return self.max_concurrency
+        return min(self.max_concurrency, self.limiter.current)
+
+    def _dispatch(self):
+        """Starts the highest-priority requests while there are free slots."""
+        while self._heap and not self.held and self.running < self.concurrency:
+            _, _, request, cost, future = self._heap[0]
+            if future.cancelled():
+                heapq.heappop(self._heap)
+                continue
+            if self.budget.exhausted(cost):
+                if self.running and not self.budget.exhausted():
+                    # The reservations of the requests in flight are pessimistic: the
+                    # request waits until they're settled against their actual usage
+                    return
+                heapq.heappop(self._heap)
+                self.skipped += 1
+                future.set_result(None)
+                continue
+
+            heapq.heappop(self._heap)
+            self.budget.charge(cost)
+            self.running += 1
+            reservation = Reservation(cost)
+            task = asyncio.ensure_future(self._run(request, reservation))
+            task.add_done_callback(
+                lambda t, f=future, r=reservation: self._on_done(t, f, r)
+            )
+            # A caller giving up on the result stops the request, so nothing more is
+            # sent or paid for in the background
+            future.add_done_callback(
+                lambda f, t=task: t.cancel() if f.cancelled() else None
+            )
+
+    @staticmethod
+    async def _run(request: Callable[[], Awaitable], reservation: Reservation):
+        # Every task runs in its own copy of the context
+        current_reservation.set(reservation)
+        return await request()
+
+    def _on_done(
+        self, task: asyncio.Task, future: asyncio.Future, reservation: Reservation
+    ):
+        self.running -= 1
+        if not reservation.used and (task.cancelled() or task.exception() is not None):
+            # The request failed before reaching the model
+            self.budget.refund(reservation.cost)
+        if not future.cancelled():
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        self._dispatch()
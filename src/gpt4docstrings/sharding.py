@@ -0,0 +1,155 @@
+import hashlib
+import os
+import re
+from typing import Dict
+from typing import List
+from typing import Sequence
+from typing import Tuple
+
+from gpt4docstrings.utils.helpers import get_common_base
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,(\d+))? \+\d+(?:,(\d+))? @@")
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    Parses a shard specification such as "2/5" (the second of five shards).
+
+    Args:
+        value (str): The shard specification, `i/N` with `1 <= i <= N`.
+
+    Returns:
+        Tuple[int, int]: The shard index (starting at 1) and the number of shards.
+
+    Raises:
+        ValueError: If the specification is malformed or out of range.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", value)
+    if not match:
+        raise ValueError(f"Shard must be of the form i/N, got {value!r}")
+
+    index, count = int(match.group(1)), int(match.group(2))
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and {count}, got {index}")
+    return index, count
+
+
+def get_shard_base(paths: Sequence[str]) -> str:
+    """Returns the directory file paths are made relative to before hashing them."""
+    base = get_common_base([os.path.abspath(p) for p in paths])
+    return os.path.dirname(base) if os.path.isfile(base) else base
+
+
+def shard_of(filename: str, base: str, count: int) -> int:
+    """
+    Returns the shard (starting at 1) a file belongs to.
+
+    The shard only depends on the path relative to `base`, so every worker computes the
+    same partition regardless of where the repository is checked out.
+
+    Args:
+        filename (str): The path of the file.
+        base (str): The directory the path is made relative to.
+        count (int): The number of shards.
+
+    Returns:
+        int: The shard of the file.
+    """
+    relative = os.path.relpath(os.path.abspath(filename), base).replace(os.sep, "/")
+    digest = hashlib.sha1(relative.encode("utf-8")).hexdigest()  # noqa: S324
+    return int(digest, 16) % count + 1
+
+
+def split_patch(text: str) -> Dict[str, List[str]]:
+    """
+    Splits a unified diff into its per-file sections.
+
+    Args:
+        text (str): The content of the patch.
+
+    Returns:
+        Dict[str, List[str]]: The lines of each file section, keyed by the `+++` path.
+
+    Raises:
+        ValueError: If the patch is malformed.
+    """
+    lines = text.splitlines(keepends=True)
+    sections = {}
+    i = 0
+    while i < len(lines):
+        if not (lines[i].startswith("--- ") and i + 1 < len(lines)):
+            i += 1
+            continue
+        if not lines[i + 1].startswith("+++ "):
+            raise ValueError(f"Malformed patch header at line {i + 1}")
+
+        path = lines[i + 1][4:].rstrip("\n")
+        section = lines[i : i + 2]
+        i += 2
+
+        while i < len(lines) and lines[i].startswith("@@"):
+            match = HUNK_HEADER.match(lines[i])
+            if not match:
+                raise ValueError(f"Malformed hunk header at line {i + 1}")
+            old_count = int(match.group(1) or 1)
+            new_count = int(match.group(2) or 1)
+            section.append(lines[i])
+            i += 1
+
+            while (old_count > 0 or new_count > 0) and i < len(lines):
+                line = lines[i]
+                if line.startswith("-"):
+                    old_count -= 1
+                elif line.startswith("+"):
+                    new_count -= 1
+                elif not line.startswith("\\"):
+                    old_count -= 1
+                    new_count -= 1
+                section.append(line)
+                i += 1
+
+        if path in sections and sections[path] != section:
+            raise ValueError(f"Conflicting changes for {path}")
+        sections[path] = section
+    return sections
+
+
+def merge_patches(patches: Dict[str, str]) -> Tuple[str, List[List]]:
+    """
+    Combines the patches of several shards into a single patch.
+
+    File sections are sorted by path, so the merged patch doesn't depend on the order
+    the shards finished in.
+
+    Args:
+        patches (Dict[str, str]): The content of each shard patch, keyed by its name.
+
+    Returns:
+        Tuple[str, List[List]]: The merged patch and a report row per shard
+            (name, files, hunks, added lines, removed lines).
+
+    Raises:
+        ValueError: If a patch is malformed or two shards changed the same file differently.
+    """
+    merged: Dict[str, List[str]] = {}
+    report = []
+
+    for name, text in patches.items():
+        sections = split_patch(text)
+        hunks = added = removed = 0
+        for path, section in sections.items():
+            if path in merged and merged[path] != section:
+                raise ValueError(f"Conflicting changes for {path} in {name}")
+            merged[path] = section
+
+            body = section[2:]
+            hunks += sum(line.startswith("@@") for line in body)
+            added += sum(line.startswith("+") for line in body)
+            removed += sum(line.startswith("-") for line in body)
+        report.append([name, len(sections), hunks, added, removed])
+
+    merged_lines = []
+    for path in sorted(merged):
+        merged_lines.extend(merged[path])
+        merged_lines.append("\n")
+    return "".join(merged_lines), report
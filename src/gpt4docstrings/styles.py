@@ -0,0 +1,511 @@
+"""Local parsing and rendering of the docstring styles supported by `gpt4docstrings`."""
+
+import re
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+import attr
+
+from gpt4docstrings.exceptions import DocstringStyleError
+
+STYLES = ["google", "numpy", "reStructuredText", "epytext"]
+
+GOOGLE_SECTIONS = {
+    "Args": "params",
+    "Arguments": "params",
+    "Parameters": "params",
+    "Params": "params",
+    "Attributes": "attributes",
+    "Returns": "returns",
+    "Return": "returns",
+    "Yields": "yields",
+    "Yield": "yields",
+    "Raises": "raises",
+}
+NUMPY_SECTIONS = {
+    "Parameters": "params",
+    "Attributes": "attributes",
+    "Returns": "returns",
+    "Yields": "yields",
+    "Raises": "raises",
+}
+FIELD_KINDS = {
+    "param": "params",
+    "parameter": "params",
+    "arg": "params",
+    "argument": "params",
+    "type": "type",
+    "ivar": "attributes",
+    "var": "attributes",
+    "cvar": "attributes",
+    "vartype": "type",
+    "return": "returns",
+    "returns": "returns",
+    "rtype": "rtype",
+    "yield": "yields",
+    "yields": "yields",
+    "ytype": "ytype",
+    "raise": "raises",
+    "raises": "raises",
+    "except": "raises",
+    "exception": "raises",
+}
+
+GOOGLE_HEADER = re.compile(r"^([A-Z][A-Za-z ]*):\s*$")
+NUMPY_UNDERLINE = re.compile(r"^-{3,}\s*$")
+REST_FIELD = re.compile(r"^:(\w+)(?:\s+([^:]+?))?:(?:\s+(.*))?$")
+EPYTEXT_FIELD = re.compile(r"^@(\w+)(?:\s+([^:]+?))?:(?:\s+(.*))?$")
+
+NAME = r"\*{0,2}[A-Za-z_]\w*"
+TYPE = r"[A-Za-z_][\w.]*(?:\[.*\])?(?:,\s*optional)?(?:\s+or\s+[A-Za-z_][\w.]*(?:\[.*\])?)*"
+GOOGLE_ITEM = re.compile(rf"^({NAME})\s*(?:\((.+)\))?\s*:\s*(.*)$")
+GOOGLE_TYPED = re.compile(rf"^({TYPE}):\s+(.*)$")
+EXCEPTION_ITEM = re.compile(r"^([A-Za-z_][\w.]*)\s*:\s*(.*)$")
+NUMPY_ITEM = re.compile(rf"^({NAME})\s*(?::\s*(.+))?$")
+
+
+@attr.s
+class DocstringItem:
+    """
+    An entry of a docstring section (a parameter, an exception, the return value...).
+
+    Args:
+        name (str): The name of the parameter / attribute, or the exception type.
+        type (str): The type of the entry, if any.
+        description (str): The description, possibly spanning several lines.
+    """
+
+    name = attr.ib(default=None)
+    type = attr.ib(default=None)
+    description = attr.ib(default="")
+
+
+@attr.s
+class ParsedDocstring:
+    """
+    The style-independent content of a docstring.
+
+    Args:
+        description (str): The summary and extended description, verbatim.
+        params (List[DocstringItem]): The parameters.
+        attributes (List[DocstringItem]): The attributes.
+        returns (DocstringItem): The return value, if any.
+        yields (DocstringItem): The yielded values, if any.
+        raises (List[DocstringItem]): The raised exceptions.
+    """
+
+    description = attr.ib(default="")
+    params = attr.ib(factory=list)
+    attributes = attr.ib(factory=list)
+    returns = attr.ib(default=None)
+    yields = attr.ib(default=None)
+    raises = attr.ib(factory=list)
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def _join(lines: List[str]) -> str:
+    return "\n".join(lines).strip("\n")
+
+
+def _markers(lines: List[str]) -> Set[str]:
+    """Returns the styles whose section headers or field markers appear in the lines."""
+    found = set()
+    for i, line in enumerate(lines):
+        header = GOOGLE_HEADER.match(line)
+        field = REST_FIELD.match(line) or EPYTEXT_FIELD.match(line)
+        if header and header.group(1) in GOOGLE_SECTIONS:
+            found.add("google")
+        elif field and field.group(1) in FIELD_KINDS:
+            found.add("reStructuredText" if line.startswith(":") else "epytext")
+        elif (
+            line.strip() and i + 1 < len(lines) and NUMPY_UNDERLINE.match(lines[i + 1])
+        ):
+            found.add("numpy")
+    return found
+
+
+def detect_style(text: str) -> Optional[str]:
+    """
+    Classifies a docstring by its section headers and field markers.
+
+    Args:
+        text (str): The cleaned docstring (as returned by `inspect.cleandoc`).
+
+    Returns:
+        Optional[str]: The style of the docstring, or `None` if it has no sections
+            (it's valid in any style) or mixes several styles.
+    """
+    found = _markers(text.splitlines())
+    return found.pop() if len(found) == 1 else None
+
+
+def in_style(text: str, style: str) -> bool:
+    """
+    Checks whether a docstring is already written in a style.
+
+    Args:
+        text (str): The cleaned docstring (as returned by `inspect.cleandoc`).
+        style (str): One of "google", "numpy", "reStructuredText" or "epytext".
+
+    Returns:
+        bool: `True` if every section header and field marker of the docstring belongs to
+            the style. Docstrings without any are valid in every style.
+    """
+    return _markers(text.splitlines()) <= {style}
+
+
+def _split_entries(body: List[str]) -> List[List[str]]:
+    """Splits a section body into entries: a line at the base indent and its continuations."""
+    while body and not body[-1].strip():
+        body = body[:-1]
+    if not body:
+        raise DocstringStyleError("Empty section")
+    if any(not line.strip() for line in body):
+        raise DocstringStyleError("Blank line inside a section")
+
+    base = _indent(body[0])
+    entries = []
+    for line in body:
+        if _indent(line) < base:
+            raise DocstringStyleError(f"Unexpected indentation: {line!r}")
+        if _indent(line) == base:
+            entries.append([line.strip()])
+        else:
+            entries[-1].append(line.strip())
+    return entries
+
+
+def _set_section(parsed: ParsedDocstring, section: str, value):
+    current = getattr(parsed, section)
+    if current:
+        raise DocstringStyleError(f"Duplicated section: {section}")
+    setattr(parsed, section, value)
+
+
+def _parse_google(lines: List[str]) -> ParsedDocstring:
+    parsed = ParsedDocstring()
+    description = []
+    sections = []
+    for line in lines:
+        header = GOOGLE_HEADER.match(line)
+        if header:
+            if header.group(1) not in GOOGLE_SECTIONS:
+                raise DocstringStyleError(f"Unknown section: {header.group(1)}")
+            sections.append((GOOGLE_SECTIONS[header.group(1)], []))
+        elif sections:
+            if line.strip() and not _indent(line):
+                raise DocstringStyleError(f"Text after a section: {line!r}")
+            sections[-1][1].append(line)
+        else:
+            description.append(line)
+
+    parsed.description = _join(description)
+    for section, body in sections:
+        if section in ("returns", "yields"):
+            entries = _split_entries(body)
+            text = _join([line for entry in entries for line in entry])
+            typed = GOOGLE_TYPED.match(text)
+            item = (
+                DocstringItem(type=typed.group(1), description=typed.group(2))
+                if typed
+                else DocstringItem(description=text)
+            )
+            _set_section(parsed, section, item)
+            continue
+
+        items = []
+        pattern = EXCEPTION_ITEM if section == "raises" else GOOGLE_ITEM
+        for entry in _split_entries(body):
+            match = pattern.match(entry[0])
+            if not match:
+                raise DocstringStyleError(f"Can't parse the entry {entry[0]!r}")
+            if section == "raises":
+                name, type_, first = match.group(1), None, match.group(2)
+            else:
+                name, type_, first = match.groups()
+            items.append(DocstringItem(name, type_, _join([first, *entry[1:]])))
+        _set_section(parsed, section, items)
+    return parsed
+
+
+def _parse_numpy(lines: List[str]) -> ParsedDocstring:
+    parsed = ParsedDocstring()
+    description = []
+    sections = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.strip() and i + 1 < len(lines) and NUMPY_UNDERLINE.match(lines[i + 1]):
+            if line.strip() not in NUMPY_SECTIONS:
+                raise DocstringStyleError(f"Unknown section: {line.strip()}")
+            sections.append((NUMPY_SECTIONS[line.strip()], []))
+            i += 2
+            continue
+
+        if sections:
+            sections[-1][1].append(line)
+        else:
+            description.append(line)
+        i += 1
+
+    parsed.description = _join(description)
+    for section, body in sections:
+        entries = _split_entries(body)
+        if section in ("returns", "yields"):
+            if len(entries) != 1 or ":" in entries[0][0]:
+                # Named or multiple return values have no equivalent in other styles
+                raise DocstringStyleError("Unsupported return section")
+            item = DocstringItem(type=entries[0][0], description=_join(entries[0][1:]))
+            _set_section(parsed, section, item)
+            continue
+
+        items = []
+        for entry in entries:
+            if section == "raises":
+                name, type_ = entry[0], None
+                if not re.match(r"^[A-Za-z_][\w.]*$", name):
+                    raise DocstringStyleError(f"Can't parse the entry {name!r}")
+            else:
+                match = NUMPY_ITEM.match(entry[0])
+                if not match:
+                    raise DocstringStyleError(f"Can't parse the entry {entry[0]!r}")
+                name, type_ = match.groups()
+            items.append(DocstringItem(name, type_, _join(entry[1:])))
+        _set_section(parsed, section, items)
+    return parsed
+
+
+def _parse_fields(lines: List[str], pattern: re.Pattern) -> ParsedDocstring:
+    """Parses reStructuredText (`:param x:`) and epytext (`@param x:`) field lists."""
+    parsed = ParsedDocstring()
+    description = []
+    fields = []
+    for line in lines:
+        match = pattern.match(line)
+        if match:
+            kind, argument, first = match.groups()
+            if kind not in FIELD_KINDS:
+                raise DocstringStyleError(f"Unknown field: {kind}")
+            fields.append([FIELD_KINDS[kind], argument, [first or ""]])
+        elif fields:
+            if line.strip() and not _indent(line):
+                raise DocstringStyleError(f"Text after the fields: {line!r}")
+            if line.strip():
+                fields[-1][2].append(line.strip())
+        else:
+            description.append(line)
+
+    parsed.description = _join(description)
+    types: Dict[str, str] = {}
+    for kind, argument, text in fields:
+        text = _join(text)
+        if kind in ("params", "attributes"):
+            if not argument:
+                raise DocstringStyleError(f"Missing name in {kind} field")
+            words = argument.split()
+            # `:param int x:` declares the type inline
+            type_ = " ".join(words[:-1]) or None
+            getattr(parsed, kind).append(DocstringItem(words[-1], type_, text))
+        elif kind == "raises":
+            if not argument:
+                raise DocstringStyleError("Missing exception in raises field")
+            parsed.raises.append(DocstringItem(argument.strip(), None, text))
+        elif kind == "type":
+            if not argument:
+                raise DocstringStyleError("Missing name in type field")
+            types[argument.strip()] = text
+        elif kind in ("returns", "yields"):
+            item = getattr(parsed, kind) or DocstringItem()
+            item.description = text
+            setattr(parsed, kind, item)
+        elif kind in ("rtype", "ytype"):
+            section = "returns" if kind == "rtype" else "yields"
+            item = getattr(parsed, section) or DocstringItem()
+            item.type = text
+            setattr(parsed, section, item)
+
+    for item in [*parsed.params, *parsed.attributes]:
+        if item.name in types:
+            item.type = types.pop(item.name)
+    if types:
+        raise DocstringStyleError(f"Types without entry: {sorted(types)}")
+    return parsed
+
+
+def parse_docstring(text: str) -> ParsedDocstring:
+    """
+    Parses a docstring written in any of the supported styles.
+
+    Args:
+        text (str): The cleaned docstring (as returned by `inspect.cleandoc`).
+
+    Returns:
+        ParsedDocstring: The content of the docstring.
+
+    Raises:
+        DocstringStyleError: If the docstring can't be parsed confidently (mixed styles,
+            unknown sections, unexpected layout...).
+    """
+    lines = text.splitlines()
+    found = _markers(lines)
+    if len(found) > 1:
+        raise DocstringStyleError(f"Mixed docstring styles: {sorted(found)}")
+    if not found:
+        return ParsedDocstring(description=_join(lines))
+
+    style = found.pop()
+    if style == "google":
+        return _parse_google(lines)
+    if style == "numpy":
+        return _parse_numpy(lines)
+    return _parse_fields(
+        lines, REST_FIELD if style == "reStructuredText" else EPYTEXT_FIELD
+    )
+
+
+def _continue(text: str, indent: str) -> List[str]:
+    """Renders a description whose lines after the first one are indented."""
+    first, *rest = text.split("\n")
+    return [first, *[indent + line for line in rest]]
+
+
+def _render_google(parsed: ParsedDocstring) -> List[List[str]]:
+    blocks = []
+    for title, items in (("Args", parsed.params), ("Attributes", parsed.attributes)):
+        if items:
+            block = [f"{title}:"]
+            for item in items:
+                head = f"{item.name} ({item.type})" if item.type else item.name
+                block += _continue(f"    {head}: {item.description}", " " * 8)
+            blocks.append(block)
+    for title, item in (("Returns", parsed.returns), ("Yields", parsed.yields)):
+        if item:
+            text = ": ".join(part for part in (item.type, item.description) if part)
+            blocks.append([f"{title}:", *_continue(f"    {text}", " " * 4)])
+    if parsed.raises:
+        block = ["Raises:"]
+        for item in parsed.raises:
+            block += _continue(f"    {item.name}: {item.description}", " " * 8)
+        blocks.append(block)
+    return blocks
+
+
+def _render_numpy(parsed: ParsedDocstring) -> List[List[str]]:
+    def section(title):
+        return [title, "-" * len(title)]
+
+    def described(item):
+        return ["    " + line for line in item.description.split("\n") if line]
+
+    blocks = []
+    for title, items in (
+        ("Parameters", parsed.params),
+        ("Attributes", parsed.attributes),
+    ):
+        if items:
+            block = section(title)
+            for item in items:
+                block.append(f"{item.name} : {item.type}" if item.type else item.name)
+                block += described(item)
+            blocks.append(block)
+    for title, item in (("Returns", parsed.returns), ("Yields", parsed.yields)):
+        if item:
+            if not item.type:
+                raise DocstringStyleError(f"NumPy {title} sections need a type")
+            blocks.append([*section(title), item.type, *described(item)])
+    if parsed.raises:
+        block = section("Raises")
+        for item in parsed.raises:
+            block += [item.name, *described(item)]
+        blocks.append(block)
+    return blocks
+
+
+def _render_fields(parsed: ParsedDocstring, marker: str) -> List[List[str]]:
+    def field(name, text):
+        return _continue(f"{marker}{name}: {text}".rstrip(), " " * 4)
+
+    epytext = marker == "@"
+    blocks = []
+    for kind, items in (("param", parsed.params), ("ivar", parsed.attributes)):
+        if items:
+            block = []
+            for item in items:
+                block += field(f"{kind} {item.name}", item.description)
+                if item.type:
+                    type_field = "type" if kind == "param" or epytext else "vartype"
+                    block += field(f"{type_field} {item.name}", item.type)
+            blocks.append(block)
+    for kinds, item in (
+        (("return", "rtype"), parsed.returns),
+        (("yields", "ytype"), parsed.yields),
+    ):
+        if item:
+            if epytext and kinds[0] == "yields":
+                raise DocstringStyleError("Epytext has no field for yielded values")
+            block = field(kinds[0], item.description) if item.description else []
+            if item.type:
+                block += field(kinds[1], item.type)
+            blocks.append(block)
+    if parsed.raises:
+        blocks.append(
+            [
+                line
+                for item in parsed.raises
+                for line in field(f"raise {item.name}", item.description)
+            ]
+        )
+    return blocks
+
+
+def render_docstring(parsed: ParsedDocstring, style: str) -> str:
+    """
+    Renders the content of a docstring in a style.
+
+    Args:
+        parsed (ParsedDocstring): The content of the docstring.
+        style (str): One of "google", "numpy", "reStructuredText" or "epytext".
+
+    Returns:
+        str: The docstring text, without triple quotes nor indentation.
+
+    Raises:
+        DocstringStyleError: If the content can't be expressed in the style.
+    """
+    if style == "google":
+        blocks = _render_google(parsed)
+    elif style == "numpy":
+        blocks = _render_numpy(parsed)
+    elif style == "reStructuredText":
+        blocks = _render_fields(parsed, ":")
+    elif style == "epytext":
+        blocks = _render_fields(parsed, "@")
+    else:
+        raise ValueError(f"Docstring style must be one of the following: {STYLES}")
+
+    blocks = ["\n".join(line.rstrip() for line in block) for block in blocks]
+    if parsed.description:
+        blocks.insert(0, parsed.description)
+    return "\n\n".join(blocks)
+
+
+def convert_docstring(text: str, style: str) -> str:
+    """
+    Converts a docstring to a style without any model.
+
+    Args:
+        text (str): The cleaned docstring (as returned by `inspect.cleandoc`).
+        style (str): The target style.
+
+    Returns:
+        str: The docstring text in the target style.
+
+    Raises:
+        DocstringStyleError: If the docstring can't be converted confidently.
+    """
+    return render_docstring(parse_docstring(text), style)
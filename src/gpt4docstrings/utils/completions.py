@@ -0,0 +1,96 @@
+from gpt4docstrings.backends.base import CompletionBackend
+from gpt4docstrings.hedging import RequestHedger
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.scheduler import estimate_tokens
+from gpt4docstrings.utils.parsers import close_docstring
+from gpt4docstrings.utils.streaming import stream_docstring_completion
+from gpt4docstrings.utils.token_budget import DOCSTRING_STOP_SEQUENCES
+from gpt4docstrings.utils.token_budget import MAX_TOKEN_BUDGET
+
+
+async def get_docstring_completion(
+    backend: CompletionBackend,
+    prompt: str,
+    path: str = None,
+    max_tokens: int = None,
+    stream: bool = False,
+    report: RunReport = None,
+    json_mode: bool = False,
+    hedger: RequestHedger = None,
+) -> str:
+    """
+    Requests a docstring completion within a `max_tokens` budget.
+
+    The request is stopped on the closing triple quotes of the docstring. If the budget
+    truncates the docstring, the request is sent again with a doubled budget.
+
+    Args:
+        backend (CompletionBackend): The backend used to generate the completion.
+        prompt (str): The prompt for generating the completion.
+        path (str): Pseudo-import path to the node the completion is requested for.
+        max_tokens (int): The completion-length budget, if any.
+        stream (bool): If `True`, the completion is streamed and cancelled once the docstring is complete.
+        report (RunReport): The report collecting the run metrics.
+        json_mode (bool): If `True`, the completion is requested as a JSON object, without
+            stop sequences (the docstring isn't delimited by triple quotes).
+        hedger (RequestHedger): Applies the request timeout and hedges slow requests.
+
+    Returns:
+        str: The generated completion.
+
+    Raises:
+        RequestTimeoutError: If a request didn't answer within the hedger's timeout.
+        BudgetExhaustedError: If the budget of the hedger can't afford a request.
+    """
+    report = report or RunReport()
+    hedger = hedger or RequestHedger()
+    stop = None if json_mode else DOCSTRING_STOP_SEQUENCES
+    prompt_tokens = estimate_tokens(prompt)
+
+    def usage(answer):
+        if stream:
+            return prompt_tokens, answer[1].tokens_received
+        return (
+            answer.prompt_tokens or prompt_tokens,
+            answer.completion_tokens or estimate_tokens(answer.text),
+        )
+
+    while True:
+
+        async def request(max_tokens=max_tokens):
+            if stream:
+                return await stream_docstring_completion(
+                    backend, prompt, path, max_tokens, stop, json_mode
+                )
+            return await backend.complete(
+                prompt, max_tokens=max_tokens, stop=stop, json_mode=json_mode
+            )
+
+        answer = await hedger.run(
+            request,
+            key=backend.model_name,
+            report=report,
+            tokens=(prompt_tokens, max_tokens or 0),
+            usage=usage,
+        )
+        if stream:
+            completion, stats = answer
+            report.add_completion(stats)
+            truncated = stats.truncated
+        else:
+            result = answer
+            completion, truncated = result.text, result.truncated
+            if result.prompt_tokens is not None:
+                report.incr("Prompt tokens (reported)", result.prompt_tokens)
+            if result.completion_tokens is not None:
+                report.incr("Completion tokens (reported)", result.completion_tokens)
+
+        if max_tokens:
+            report.incr("Budgeted completions")
+        if not truncated:
+            return completion if json_mode else close_docstring(completion)
+
+        report.incr("Completions truncated by budget")
+        if not max_tokens or max_tokens >= MAX_TOKEN_BUDGET:
+            return completion
+        max_tokens = min(max_tokens * 2, MAX_TOKEN_BUDGET)
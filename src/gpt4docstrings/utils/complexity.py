@@ -0,0 +1,78 @@
+import ast
+
+from gpt4docstrings.utils.token_budget import _class_items
+from gpt4docstrings.utils.token_budget import _count_params
+from gpt4docstrings.utils.token_budget import _count_raises
+from gpt4docstrings.utils.token_budget import _walk_own_body
+
+BRANCH_NODES = (
+    ast.If,
+    ast.IfExp,
+    ast.For,
+    ast.AsyncFor,
+    ast.While,
+    ast.ExceptHandler,
+    ast.With,
+    ast.AsyncWith,
+    ast.BoolOp,
+    ast.comprehension,
+)
+COMPOUND_STATEMENTS = (
+    ast.If,
+    ast.For,
+    ast.AsyncFor,
+    ast.While,
+    ast.Try,
+    ast.With,
+    ast.AsyncWith,
+)
+# `match` statements only exist from Python 3.10
+if hasattr(ast, "Match"):
+    BRANCH_NODES += (ast.match_case,)
+    COMPOUND_STATEMENTS += (ast.Match,)
+
+STATEMENTS_PER_POINT = 5
+
+
+def _max_nesting(node: ast.AST, depth: int = 0) -> int:
+    """Returns the deepest nesting of compound statements in the body of a node."""
+    deepest = depth
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        child_depth = depth + isinstance(child, COMPOUND_STATEMENTS)
+        deepest = max(deepest, _max_nesting(child, child_depth))
+    return deepest
+
+
+def complexity_score(node: ast.AST) -> int:
+    """
+    Scores how hard a class or function is to document.
+
+    Functions score one point per branch, nesting level, documentable parameter and
+    raised exception, plus a point every few statements. Classes score one point per
+    method and per init parameter or instance attribute.
+
+    Args:
+        node (ast.AST): A `ClassDef`, `FunctionDef` or `AsyncFunctionDef` node.
+
+    Returns:
+        int: The complexity score (0 for one-line getters).
+    """
+    if isinstance(node, ast.ClassDef):
+        methods = sum(
+            isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))
+            for child in node.body
+        )
+        return methods + _class_items(node)
+
+    own_body = list(_walk_own_body(node))
+    statements = sum(isinstance(child, ast.stmt) for child in own_body)
+    branches = sum(isinstance(child, BRANCH_NODES) for child in own_body)
+    return (
+        branches
+        + _max_nesting(node)
+        + _count_params(node)
+        + _count_raises(node)
+        + statements // STATEMENTS_PER_POINT
+    )
@@ -1,11 +1,18 @@
 import asyncio
 import logging
 
+from gpt4docstrings.concurrency import RATE_LIMIT_ERRORS
 from gpt4docstrings.exceptions import DocstringParsingError
+from gpt4docstrings.exceptions import RequestTimeoutError
 
 
 def retry(max_retries=5, delay=5):
-    """Decorator for retrying a function with a specified number of retries and delay between retries."""
+    """
+    Decorator for retrying a method with a specified number of retries and delay between retries.
+
+    The retries stop early, re-raising the error, when the `retries_allowed` method of the
+    instance (if any) returns `False`, e.g. once the budget of the run is exhausted.
+    """
 
     def decorator(func):
         async def wrapper(*args, **kwargs):
@@ -13,9 +20,17 @@ def retry(max_retries=5, delay=5):
             while retries < max_retries:
                 try:
                     return await func(*args, **kwargs)
-                except (DocstringParsingError, SyntaxError) as e:
+                except (
+                    DocstringParsingError,
+                    RequestTimeoutError,
+                    SyntaxError,
+                    *RATE_LIMIT_ERRORS,
+                ) as e:
                     logging.warning(e)
                     retries += 1
+                    retries_allowed = getattr(args[0], "retries_allowed", None)
+                    if retries_allowed is not None and not retries_allowed():
+                        raise
                     if retries >= max_retries:
                         raise Exception(f"Max retries ({max_retries}) exceeded.")
                     await asyncio.sleep(delay)
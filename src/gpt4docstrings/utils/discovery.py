@@ -0,0 +1,279 @@
+import fnmatch
+import os
+import re
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from gpt4docstrings.exceptions import NoInputFilesError
+
+# Version control, cache and tool directories, which never contain code to document.
+# None of them can be a Python package, so no source directory is pruned by name; the
+# others (`build`, `dist`, ...) are left to .gitignore and the exclusion patterns.
+DEFAULT_PRUNED_DIRS = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        ".venv",
+        ".tox",
+        ".nox",
+        "__pycache__",
+        ".mypy_cache",
+        ".pytest_cache",
+    }
+)
+# Virtual environments are recognized by this file, whatever their name
+VENV_MARKER = "pyvenv.cfg"
+
+
+class ExclusionMatcher:
+    """
+    Matches paths against all the exclusion patterns with a single compiled regex.
+
+    A path is excluded when it starts with any of the patterns (glob characters are
+    allowed), which is equivalent to `any(fnmatch(path, exc + "*") for exc in excluded)`.
+
+    Args:
+        excluded (Sequence[str]): The exclusion patterns.
+    """
+
+    def __init__(self, excluded: Sequence[str]):
+        self._regex = None
+        if excluded:
+            self._regex = re.compile(
+                "|".join(
+                    fnmatch.translate(os.path.normcase(exc) + "*") for exc in excluded
+                )
+            )
+
+    def __call__(self, path: str) -> bool:
+        return self._regex is not None and bool(
+            self._regex.match(os.path.normcase(path))
+        )
+
+
+def _translate_gitignore_pattern(pattern: str) -> str:
+    """Translates a gitignore glob into a regex matching paths relative to its directory."""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1 :]:
+            end = pattern.index("]", i + 1)
+            chars = pattern[i + 1 : end]
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            regex.append("[" + chars + "]")
+            i = end + 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+
+    prefix = "" if anchored else "(?:.*/)?"
+    return prefix + "".join(regex) + r"\Z"
+
+
+class GitIgnore:
+    """
+    The rules of a single `.gitignore` file.
+
+    Args:
+        base (str): The directory containing the `.gitignore` file.
+        lines (List[str]): The lines of the `.gitignore` file.
+    """
+
+    def __init__(self, base: str, lines: List[str]):
+        self.base = base
+        self.rules: List[Tuple[re.Pattern, bool, bool]] = []
+
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+
+            regex = re.compile(_translate_gitignore_pattern(line))
+            self.rules.append((regex, negated, dir_only))
+
+    @classmethod
+    def from_dir(cls, directory: str) -> Optional["GitIgnore"]:
+        """Loads the `.gitignore` of a directory, if any."""
+        path = os.path.join(directory, ".gitignore")
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                return cls(directory, f.readlines())
+        except OSError:
+            return None
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Checks a path against the rules.
+
+        Args:
+            path (str): The path to check, under `base`.
+            is_dir (bool): Whether the path is a directory.
+
+        Returns:
+            Optional[bool]: `True` if ignored, `False` if explicitly re-included and `None`
+                if no rule matches.
+        """
+        relative = os.path.relpath(path, self.base).replace(os.sep, "/")
+        result = None
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative):
+                result = not negated
+        return result
+
+
+def _is_ignored(gitignores: List[GitIgnore], path: str, is_dir: bool) -> bool:
+    """Checks a path against the active `.gitignore` files, deepest ones last."""
+    ignored = False
+    for gitignore in gitignores:
+        result = gitignore.match(path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+def _parent_gitignores(root: str) -> List[GitIgnore]:
+    """Loads the `.gitignore` files of the ancestors of `root`, up to the git repository root."""
+    directory = os.path.abspath(root)
+    ancestors = []
+    while not os.path.exists(os.path.join(directory, ".git")):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            # Not inside a git repository
+            return []
+        directory = parent
+        ancestors.append(directory)
+
+    gitignores = [GitIgnore.from_dir(directory) for directory in reversed(ancestors)]
+    return [gitignore for gitignore in gitignores if gitignore is not None]
+
+
+def iter_python_files(
+    root: str,
+    is_excluded: ExclusionMatcher,
+    respect_gitignore: bool = True,
+    pruned_dirs: frozenset = DEFAULT_PRUNED_DIRS,
+) -> Iterator[str]:
+    """
+    Walks a directory yielding the Python files to document.
+
+    Excluded, gitignored, version control and cache directories (`.git`,
+    `__pycache__`, ...) and virtual environments are pruned during the walk instead of
+    being filtered out afterwards. `__init__.py` files are ignored.
+
+    Args:
+        root (str): The directory to walk.
+        is_excluded (ExclusionMatcher): The compiled exclusion patterns.
+        respect_gitignore (bool): If `True`, files and directories ignored by git are skipped.
+        pruned_dirs (frozenset): Names of the directories that are never walked.
+
+    Yields:
+        str: The path of each Python file.
+    """
+    gitignores = []
+    if respect_gitignore:
+        gitignores = _parent_gitignores(root)
+
+    stack = [(root, gitignores)]
+    while stack:
+        directory, gitignores = stack.pop()
+        if respect_gitignore:
+            gitignore = GitIgnore.from_dir(directory)
+            if gitignore is not None:
+                gitignores = [*gitignores, gitignore]
+
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        if directory != root and any(entry.name == VENV_MARKER for entry in entries):
+            continue
+
+        subdirs = []
+        for entry in entries:
+            path = os.path.join(directory, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name in pruned_dirs or is_excluded(path):
+                    continue
+                if gitignores and _is_ignored(gitignores, path, is_dir=True):
+                    continue
+                subdirs.append(path)
+            elif entry.name.endswith(".py") and entry.is_file():
+                if entry.name == "__init__.py" or is_excluded(path):
+                    continue
+                if gitignores and _is_ignored(gitignores, path, is_dir=False):
+                    continue
+                yield path
+
+        # Reversed, so directories are walked in alphabetical order
+        stack.extend((subdir, gitignores) for subdir in reversed(subdirs))
+
+
+def discover_python_files(
+    paths: Sequence[str], excluded: Sequence[str] = (), respect_gitignore: bool = True
+) -> Iterator[str]:
+    """
+    Lazily yields the Python files of the input paths.
+
+    Args:
+        paths (Sequence[str]): Files and directories to document.
+        excluded (Sequence[str]): The exclusion patterns.
+        respect_gitignore (bool): If `True`, files and directories ignored by git are skipped.
+
+    Yields:
+        str: The path of each Python file found in the input paths.
+
+    Raises:
+        NoInputFilesError: If one of the input files isn't a Python file.
+    """
+    is_excluded = ExclusionMatcher(excluded)
+
+    for path in paths:
+        if path.startswith("./"):
+            path = path[2:]
+
+        if os.path.isfile(path):
+            if not path.endswith(".py"):
+                raise NoInputFilesError(f"{path} is not a Python file")
+
+            if not is_excluded(path):
+                yield path
+
+            continue
+
+        yield from iter_python_files(
+            path, is_excluded, respect_gitignore=respect_gitignore
+        )
@@ -1,15 +1,161 @@
+import json
 import re
+from typing import Tuple
 
 from langchain.schema import BaseOutputParser
 
 from gpt4docstrings.exceptions import DocstringParsingError
 
+DOUBLE_QUOTED = re.compile(r'"""(.*?)"""', re.DOTALL)
+SINGLE_QUOTED = re.compile(r"'''(.*?)'''", re.DOTALL)
+OPENING_QUOTES = re.compile(r'"""|\'\'\'')
+FENCED = re.compile(r"```[\w+-]*[ \t]*\n(.*?)(?:```|\Z)", re.DOTALL)
+CODE_START = re.compile(r"^\s*(?:@|def |async def |class )")
+
+
+def _parse_json(text: str) -> str:
+    """Returns the `docstring` value of a JSON answer, possibly inside a code fence."""
+    fenced = FENCED.search(text)
+    try:
+        answer = json.loads(fenced.group(1) if fenced else text)
+    except ValueError:
+        raise DocstringParsingError("The answer is not valid JSON")
+    if not (isinstance(answer, dict) and isinstance(answer.get("docstring"), str)):
+        raise DocstringParsingError("The JSON answer has no `docstring` string")
+    return answer["docstring"]
+
+
+def extract_docstring(text: str, structured: bool = False) -> Tuple[str, str]:
+    """
+    Extracts the docstring from a completion, salvaging malformed answers when possible.
+
+    The tiers are tried in order, from the expected format to the most lenient one:
+
+    - "json": the `docstring` key of a JSON answer (structured-output mode only).
+    - "strict": a `\"\"\"...\"\"\"` block, anywhere in the answer.
+    - "single_quotes": a `'''...'''` block.
+    - "unterminated": opening triple quotes without closing ones; the docstring runs
+      until the end of the answer (or of its code fence).
+    - "fenced": a code fence whose content isn't code.
+
+    Args:
+        text (str): The completion.
+        structured (bool): If `True`, the completion was requested as a JSON object.
+
+    Returns:
+        Tuple[str, str]: The stripped docstring and the tier it was found with.
+
+    Raises:
+        DocstringParsingError: If no tier finds a docstring, so the request has to be
+            sent again.
+    """
+    if structured:
+        try:
+            docstring = _parse_json(text)
+        except DocstringParsingError:
+            pass
+        else:
+            # Some answers still wrap the value in triple quotes
+            quoted = DOUBLE_QUOTED.search(docstring)
+            return (quoted.group(1) if quoted else docstring).strip(), "json"
+
+    for tier, pattern in (("strict", DOUBLE_QUOTED), ("single_quotes", SINGLE_QUOTED)):
+        match = pattern.search(text)
+        if match:
+            return match.group(1).strip(), tier
+
+    opening = OPENING_QUOTES.search(text)
+    if opening:
+        rest = text[opening.end() :]
+        return rest.split("```", 1)[0].strip(), "unterminated"
+
+    fenced = FENCED.search(text)
+    if fenced and fenced.group(1).strip() and not CODE_START.match(fenced.group(1)):
+        return fenced.group(1).strip(), "fenced"
+
+    raise DocstringParsingError("Something went wrong when parsing")
+
 
 class DocstringParser(BaseOutputParser):
     def parse(self, text: str):
-        pattern = r'"""(.*?)"""'
-        match = re.search(pattern, text, re.DOTALL)
-        if match:
-            return match.group(1).strip()
-        else:
-            raise DocstringParsingError("Something went wrong when parsing")
+        return extract_docstring(text)[0]
+
+
+class StreamingDocstringParser:
+    """
+    Incrementally scans a streamed completion looking for a complete `\"\"\"...\"\"\"` block.
+
+    Attributes:
+        text (str): The text received so far.
+        opening (int): Position of the opening triple quotes, or -1 if not received yet.
+        closing (int): Position of the closing triple quotes, or -1 if not received yet.
+    """
+
+    DELIMITER = '"""'
+
+    def __init__(self):
+        self.text = ""
+        self.opening = -1
+        self.closing = -1
+
+    @property
+    def started(self) -> bool:
+        """Whether the opening triple quotes have been received."""
+        return self.opening >= 0
+
+    @property
+    def finished(self) -> bool:
+        """Whether the closing triple quotes have been received."""
+        return self.closing >= 0
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Adds a chunk of the stream to the buffer.
+
+        Args:
+            chunk (str): The new piece of text received from the model.
+
+        Returns:
+            bool: `True` once the docstring is complete and the stream can be stopped.
+        """
+        if self.finished:
+            self.text += chunk
+            return True
+
+        # Delimiters may be split across chunks, so we rescan the last two characters
+        start = max(len(self.text) - len(self.DELIMITER) + 1, 0)
+        self.text += chunk
+
+        if not self.started:
+            self.opening = self.text.find(self.DELIMITER, start)
+            if not self.started:
+                return False
+            start = self.opening + len(self.DELIMITER)
+
+        start = max(start, self.opening + len(self.DELIMITER))
+        self.closing = self.text.find(self.DELIMITER, start)
+        return self.finished
+
+    def completion(self) -> str:
+        """Returns the received text, truncated right after the closing triple quotes."""
+        if self.finished:
+            return self.text[: self.closing + len(self.DELIMITER)]
+        return self.text
+
+
+def close_docstring(text: str) -> str:
+    """
+    Restores the closing triple quotes of a completion stopped by a stop sequence.
+
+    Stop sequences are not included in the completion, so a completion stopped on the
+    closing triple quotes only contains the opening ones.
+
+    Args:
+        text (str): The completion.
+
+    Returns:
+        str: The completion with balanced triple quotes.
+    """
+    if text.count('"""') % 2 == 1:
+        return text.rstrip() + '\n"""'
+    return text
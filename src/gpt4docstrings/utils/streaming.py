@@ -0,0 +1,60 @@
+import time
+from typing import List
+
+from gpt4docstrings.backends.base import CompletionBackend
+from gpt4docstrings.report import CompletionStats
+from gpt4docstrings.utils.parsers import StreamingDocstringParser
+
+
+async def stream_docstring_completion(
+    backend: CompletionBackend,
+    prompt: str,
+    path: str,
+    max_tokens: int = None,
+    stop: List[str] = None,
+    json_mode: bool = False,
+):
+    """
+    Streams a completion and cancels it as soon as the closing triple quotes arrive.
+
+    Args:
+        backend (CompletionBackend): The backend used to stream the completion.
+        prompt (str): The prompt for generating the completion.
+        path (str): Pseudo-import path to the node, used to identify its metrics.
+        max_tokens (int): The completion-length budget. Defaults to the backend's `max_tokens`.
+        stop (List[str]): Stop sequences sent with the request.
+        json_mode (bool): If `True`, the completion is requested as a JSON object. It has no
+            triple quotes, so it's received entirely.
+
+    Returns:
+        Tuple[str, CompletionStats]: The completion up to the end of the docstring and its metrics.
+    """
+    parser = StreamingDocstringParser()
+    stats = CompletionStats(path=path, elapsed=0.0)
+    start = time.perf_counter()
+
+    max_tokens = max_tokens or backend.max_tokens
+    stream = backend.stream(
+        prompt, max_tokens=max_tokens, stop=stop, json_mode=json_mode
+    )
+    try:
+        async for chunk in stream:
+            stats.tokens_received += 1
+            done = parser.feed(chunk)
+
+            if parser.started and stats.time_to_first_docstring is None:
+                stats.time_to_first_docstring = time.perf_counter() - start
+            if done:
+                stats.stopped_early = True
+                break
+    finally:
+        # Closing the generator cancels the underlying HTTP stream
+        await stream.aclose()
+
+    stats.elapsed = time.perf_counter() - start
+    if max_tokens:
+        stats.truncated = not parser.finished and stats.tokens_received >= max_tokens
+        if stats.stopped_early:
+            stats.budget_unused = max(max_tokens - stats.tokens_received, 0)
+
+    return parser.completion(), stats
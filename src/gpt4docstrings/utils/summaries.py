@@ -0,0 +1,91 @@
+import textwrap
+from typing import List
+from typing import Tuple
+
+from gpt4docstrings.scheduler import CHARS_PER_TOKEN
+from gpt4docstrings.scheduler import estimate_tokens
+from gpt4docstrings.visit import GPT4DocstringsNode
+
+SUMMARY_WIDTH = 88
+
+
+def split_source(node: GPT4DocstringsNode) -> Tuple[List[str], List[str]]:
+    """
+    Splits the source of a node into its header (decorators and signature) and body.
+
+    Args:
+        node (GPT4DocstringsNode): A class or function node.
+
+    Returns:
+        Tuple[List[str], List[str]]: The lines of the header and the lines of the body.
+    """
+    lines = node.source.strip("\n").splitlines()
+    start, _ = node.source_span
+    start_lineno = node.file_content.count("\n", 0, start) + 1
+    # `docstring_lineno` is the last line before the body
+    header_length = node.docstring_lineno - start_lineno + 1
+    if not 0 < header_length < len(lines):
+        # e.g. a one-line function, or a source unparsed from the AST
+        header_length = 1
+    return lines[:header_length], lines[header_length:]
+
+
+def chunk_lines(lines: List[str], max_tokens: int) -> List[str]:
+    """
+    Groups consecutive lines into chunks of at most `max_tokens` (estimated) tokens.
+
+    Lines longer than a chunk are split on their own.
+
+    Args:
+        lines (List[str]): The lines to group.
+        max_tokens (int): The maximum estimated tokens of a chunk.
+
+    Returns:
+        List[str]: The chunks, with their lines joined.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    current_tokens = 0
+    for line in lines:
+        for start in range(0, max(len(line), 1), max_chars):
+            piece = line[start : start + max_chars]
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def condense_source(header: List[str], body: List[str], summary: str) -> str:
+    """
+    Rebuilds the source of a node with its body replaced by a summary in comments.
+
+    Args:
+        header (List[str]): The lines of the header of the node.
+        body (List[str]): The original lines of the body, for its indentation and length.
+        summary (str): The summary of the body.
+
+    Returns:
+        str: The condensed source, which the docstring is requested from.
+    """
+    first = next((line for line in body if line.strip()), "    ")
+    indent = first[: len(first) - len(first.lstrip())]
+    comments = [
+        f"{indent}# Summary of the {len(body)} lines of the body, too long to be shown:"
+    ]
+    for paragraph in summary.split("\n"):
+        comments.extend(
+            textwrap.wrap(
+                paragraph,
+                width=SUMMARY_WIDTH,
+                initial_indent=f"{indent}# ",
+                subsequent_indent=f"{indent}# ",
+            )
+            or [f"{indent}#"]
+        )
+    return "\n".join([*header, *comments, f"{indent}..."])
@@ -0,0 +1,282 @@
+import ast
+import re
+from typing import List
+from typing import Optional
+
+from gpt4docstrings.styles import DocstringItem
+from gpt4docstrings.styles import ParsedDocstring
+
+# Dunder methods whose meaning doesn't depend on their implementation:
+# name -> (summary, parameter description, return type, return description)
+COMPARED = "The object to compare with."
+DUNDER_TEMPLATES = {
+    "__repr__": (
+        "Returns the representation of the {cls}.",
+        None,
+        "str",
+        "The representation of the {cls}.",
+    ),
+    "__str__": (
+        "Returns the string representation of the {cls}.",
+        None,
+        "str",
+        "The string representation of the {cls}.",
+    ),
+    "__len__": (
+        "Returns the number of items in the {cls}.",
+        None,
+        "int",
+        "The number of items.",
+    ),
+    "__bool__": (
+        "Returns whether the {cls} is truthy.",
+        None,
+        "bool",
+        "`True` if the {cls} is truthy.",
+    ),
+    "__hash__": ("Returns the hash of the {cls}.", None, "int", "The hash value."),
+    "__eq__": (
+        "Checks whether the {cls} is equal to another object.",
+        COMPARED,
+        "bool",
+        "`True` if both objects are equal.",
+    ),
+    "__ne__": (
+        "Checks whether the {cls} is different from another object.",
+        COMPARED,
+        "bool",
+        "`True` if both objects are different.",
+    ),
+    "__lt__": (
+        "Checks whether the {cls} is lower than another object.",
+        COMPARED,
+        "bool",
+        "`True` if the {cls} is lower.",
+    ),
+    "__le__": (
+        "Checks whether the {cls} is lower than or equal to another object.",
+        COMPARED,
+        "bool",
+        "`True` if the {cls} is lower or equal.",
+    ),
+    "__gt__": (
+        "Checks whether the {cls} is greater than another object.",
+        COMPARED,
+        "bool",
+        "`True` if the {cls} is greater.",
+    ),
+    "__ge__": (
+        "Checks whether the {cls} is greater than or equal to another object.",
+        COMPARED,
+        "bool",
+        "`True` if the {cls} is greater or equal.",
+    ),
+    "__contains__": (
+        "Checks whether an item is in the {cls}.",
+        "The item to look for.",
+        "bool",
+        "`True` if the item is in the {cls}.",
+    ),
+}
+PROPERTY_DECORATORS = ("property", "cached_property")
+
+
+def _words(name: str) -> str:
+    """Turns a snake_case or CamelCase identifier into lowercase words."""
+    name = re.sub(
+        r"([a-z0-9])([A-Z])|([A-Z])([A-Z][a-z])", r"\1\3 \2\4", name.strip("_")
+    )
+    return name.replace("_", " ").lower()
+
+
+def _annotation(node: Optional[ast.AST]) -> Optional[str]:
+    """Returns the source of an annotation, if any."""
+    return ast.unparse(node) if node is not None else None
+
+
+def _own_body(node: ast.AST) -> List[ast.stmt]:
+    """Returns the body of a function without its docstring."""
+    body = node.body
+    if (
+        body
+        and isinstance(body[0], ast.Expr)
+        and isinstance(body[0].value, ast.Constant)
+        and isinstance(body[0].value.value, str)
+    ):
+        body = body[1:]
+    return body
+
+
+def _params(node: ast.AST) -> Optional[List[ast.arg]]:
+    """
+    Returns the documentable parameters of a function (without `self` / `cls`).
+
+    `None` is returned for signatures with `*args` or `**kwargs`, which templates can't
+    describe.
+    """
+    args = node.args
+    if args.vararg is not None or args.kwarg is not None:
+        return None
+    params = [*args.posonlyargs, *args.args, *args.kwonlyargs]
+    if params and params[0].arg in ("self", "cls"):
+        params = params[1:]
+    return params
+
+
+def _is_self_attribute(node: ast.AST) -> bool:
+    """Is node an attribute of `self` (i.e. `self.value`)."""
+    return (
+        isinstance(node, ast.Attribute)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == "self"
+    )
+
+
+def _init_template(node: ast.AST, params: List[ast.arg], cls: str):
+    """Template of an `__init__` method only assigning its parameters to `self`."""
+    assigned = {}
+    for statement in _own_body(node):
+        if not (
+            isinstance(statement, (ast.Assign, ast.AnnAssign))
+            and isinstance(statement.value, ast.Name)
+        ):
+            return None
+        targets = (
+            statement.targets
+            if isinstance(statement, ast.Assign)
+            else [statement.target]
+        )
+        if len(targets) != 1 or not _is_self_attribute(targets[0]):
+            return None
+        assigned[statement.value.id] = targets[0].attr
+
+    if set(assigned) != {param.arg for param in params}:
+        return None
+    return ParsedDocstring(
+        description=f"Initializes the {cls}.",
+        params=[
+            DocstringItem(
+                param.arg,
+                _annotation(param.annotation),
+                f"Stored in `self.{assigned[param.arg]}`.",
+            )
+            for param in params
+        ],
+    )
+
+
+def _property_template(node: ast.AST, cls: str):
+    """Template of a property getter returning an attribute of `self`."""
+    is_property = any(
+        (isinstance(dec, ast.Name) and dec.id in PROPERTY_DECORATORS)
+        or (isinstance(dec, ast.Attribute) and dec.attr in PROPERTY_DECORATORS)
+        for dec in node.decorator_list
+    )
+    body = _own_body(node)
+    if not (
+        is_property
+        and len(body) == 1
+        and isinstance(body[0], ast.Return)
+        and _is_self_attribute(body[0].value)
+    ):
+        return None
+    return ParsedDocstring(description=f"The {_words(node.name)} of the {cls}.")
+
+
+def _dunder_template(node: ast.AST, params: List[ast.arg], cls: str):
+    """Template of a dunder method with a conventional meaning."""
+    summary, param_description, return_type, return_description = DUNDER_TEMPLATES[
+        node.name
+    ]
+    if len(params) != (param_description is not None):
+        return None
+    return ParsedDocstring(
+        description=summary.format(cls=cls),
+        params=[
+            DocstringItem(
+                param.arg, _annotation(param.annotation) or "object", param_description
+            )
+            for param in params
+        ],
+        returns=DocstringItem(
+            type=return_type, description=return_description.format(cls=cls)
+        ),
+    )
+
+
+def _wrapper_template(node: ast.AST, params: List[ast.arg]):
+    """Template of a function forwarding its parameters, unchanged, to another call."""
+    body = _own_body(node)
+    if not (params and len(body) == 1 and isinstance(body[0], (ast.Return, ast.Expr))):
+        return None
+    call = body[0].value
+    if isinstance(call, ast.Await):
+        call = call.value
+    if not isinstance(call, ast.Call):
+        return None
+    # Every parameter is passed once, by name, and the other arguments are literals
+    forwarded = []
+    for value, keyword in [(arg, None) for arg in call.args] + [
+        (kw.value, kw.arg) for kw in call.keywords
+    ]:
+        if isinstance(value, ast.Name) and keyword in (None, value.id):
+            forwarded.append(value.id)
+        elif not isinstance(value, ast.Constant):
+            return None
+    if sorted(forwarded) != sorted(param.arg for param in params):
+        return None
+
+    callee = ast.unparse(call.func)
+    returns = None
+    if isinstance(body[0], ast.Return):
+        returns = DocstringItem(
+            type=_annotation(node.returns), description=f"The result of `{callee}`."
+        )
+    return ParsedDocstring(
+        description=f"Calls `{callee}` with the same arguments.",
+        params=[
+            DocstringItem(
+                param.arg, _annotation(param.annotation), f"Passed to `{callee}`."
+            )
+            for param in params
+        ],
+        returns=returns,
+    )
+
+
+def docstring_template(
+    node: ast.AST, class_name: Optional[str] = None
+) -> Optional[ParsedDocstring]:
+    """
+    Recognises trivial functions whose docstring can be written without any model.
+
+    These are `__init__` methods only assigning their parameters to `self`, property
+    getters returning an attribute, dunder methods with a conventional meaning and
+    functions forwarding their parameters to another call.
+
+    Args:
+        node (ast.AST): The function node.
+        class_name (str): The name of the class of the method, if any.
+
+    Returns:
+        Optional[ParsedDocstring]: The content of the docstring, to be rendered in the
+            target style, or `None` if the function isn't trivial.
+    """
+    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return None
+    params = _params(node)
+    if params is None:
+        return None
+
+    if class_name is not None:
+        cls = _words(class_name)
+        if node.name == "__init__":
+            return _init_template(node, params, cls)
+        if node.name in DUNDER_TEMPLATES:
+            return _dunder_template(node, params, cls)
+        template = _property_template(node, cls)
+        if template is not None:
+            return template
+    if node.decorator_list:
+        return None
+    return _wrapper_template(node, params)
@@ -0,0 +1,108 @@
+import ast
+from typing import Iterator
+
+# The completion is stopped on the closing triple quotes of the docstring. We can't
+# stop on `"""` alone, since the completion starts with the opening triple quotes.
+DOCSTRING_STOP_SEQUENCES = ['"""\n\n', '"""\n```']
+
+MIN_TOKEN_BUDGET = 64
+MAX_TOKEN_BUDGET = 1024
+
+FUNCTION_BASE_TOKENS = 48
+CLASS_BASE_TOKENS = 64
+TOKENS_PER_SECTION_ITEM = 32
+
+
+def _walk_own_body(node: ast.AST) -> Iterator[ast.AST]:
+    """Walks the body of a node without descending into nested functions or classes."""
+    stack = list(ast.iter_child_nodes(node))
+    while stack:
+        child = stack.pop()
+        yield child
+        if not isinstance(
+            child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+        ):
+            stack.extend(ast.iter_child_nodes(child))
+
+
+def _count_params(node: ast.AST) -> int:
+    """Counts the documentable parameters of a function (`self` and `cls` are ignored)."""
+    args = node.args
+    params = [*args.posonlyargs, *args.args, *args.kwonlyargs]
+    params = [p for p in params if p.arg not in ("self", "cls")]
+    return len(params) + (args.vararg is not None) + (args.kwarg is not None)
+
+
+def _count_raises(node: ast.AST) -> int:
+    """Counts the distinct exceptions raised by a function."""
+    raised = set()
+    for child in _walk_own_body(node):
+        if isinstance(child, ast.Raise) and child.exc is not None:
+            exc = child.exc.func if isinstance(child.exc, ast.Call) else child.exc
+            raised.add(ast.unparse(exc))
+    return len(raised)
+
+
+def _function_items(node: ast.AST) -> int:
+    """Counts the items (params, raises, returns / yields) of a function docstring."""
+    items = _count_params(node) + _count_raises(node)
+
+    own_body = list(_walk_own_body(node))
+    if any(isinstance(c, ast.Return) and c.value is not None for c in own_body):
+        items += 1
+    if any(isinstance(c, (ast.Yield, ast.YieldFrom)) for c in own_body):
+        items += 1
+    return items
+
+
+def _class_items(node: ast.ClassDef) -> int:
+    """Counts the items (init params and instance attributes) of a class docstring."""
+    items = set()
+    for child in node.body:
+        if not (isinstance(child, ast.FunctionDef) and child.name == "__init__"):
+            continue
+
+        args = child.args
+        items.update(a.arg for a in [*args.args, *args.kwonlyargs])
+        for sub in _walk_own_body(child):
+            if (
+                isinstance(sub, ast.Attribute)
+                and isinstance(sub.ctx, ast.Store)
+                and isinstance(sub.value, ast.Name)
+                and sub.value.id == "self"
+            ):
+                items.add(sub.attr)
+    items.discard("self")
+    return len(items)
+
+
+def estimate_token_budget(node: ast.AST) -> int:
+    """
+    Estimates the number of completion tokens needed to document a class or function.
+
+    Args:
+        node (ast.AST): A `ClassDef`, `FunctionDef` or `AsyncFunctionDef` node.
+
+    Returns:
+        int: The `max_tokens` budget for the completion.
+    """
+    if isinstance(node, ast.ClassDef):
+        budget = CLASS_BASE_TOKENS + TOKENS_PER_SECTION_ITEM * _class_items(node)
+    else:
+        budget = FUNCTION_BASE_TOKENS + TOKENS_PER_SECTION_ITEM * _function_items(node)
+    return min(max(budget, MIN_TOKEN_BUDGET), MAX_TOKEN_BUDGET)
+
+
+def estimate_translation_budget(docstring: str) -> int:
+    """
+    Estimates the number of completion tokens needed to translate a docstring.
+
+    Args:
+        docstring (str): The docstring to be translated.
+
+    Returns:
+        int: The `max_tokens` budget for the completion.
+    """
+    # Roughly 4 characters per token, doubled to leave room for the target style markup
+    budget = FUNCTION_BASE_TOKENS + len(docstring) // 2
+    return min(max(budget, MIN_TOKEN_BUDGET), MAX_TOKEN_BUDGET)
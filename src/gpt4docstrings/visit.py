@@ -2,32 +2,53 @@
 # This code comes from Lynn Root's interrogate amazing library
 # https://github.com/econchick/interrogate
 import ast
+import inspect
 import os
+import re
 import sys
+import textwrap
 
 import attr
 
+from gpt4docstrings.utils.complexity import complexity_score
+from gpt4docstrings.utils.templates import docstring_template
+from gpt4docstrings.utils.token_budget import estimate_token_budget
+
 
 PY_38_HIGHER = sys.version_info >= (3, 8)
 
 
-@attr.s(eq=False)
+@attr.s(eq=False, slots=True)
 class GPT4DocstringsNode:
     """
     This class contains digestible information about the AST node. We'll
     use this information to generate the docstrings.
 
+    The record is slotted and holds no reference to the AST, so the tree can be
+    released right after the file has been visited. The source of the node is sliced
+    from the file content on demand.
+
     Args:
         name (str): Name of node (module, class, method, or function names).
         path (str): Pseudo-import path to the node (e.g., "sample.py:MyClass.my_method").
-        source (str): The source code of the function / class
+        file_content (str): The content of the file containing the node (shared by all its nodes).
+        source_span (Tuple[int, int]): Start and end offsets of the node source in `file_content`.
         level (int): Level of recursiveness/indentation.
+        docstring_lineno (int): Line after which the docstring is inserted.
+        col_offset (int): Column offset of the node.
         covered (bool): Indicates whether the node has a docstring.
         node_type (str): Type of node (e.g., "module," "class," or "function")
         is_nested_func (bool): Specifies if the node is a nested function or method.
         is_nested_cls (bool): Specifies if the node is a nested class.
         is_cls_method (bool): Specifies if the node is a Class method.
-        parent (NodeInfo): Parent node of the current DocsNode, if any.
+        parent_path (str): Path of the parent node, if any.
+        token_budget (int): Completion-length budget to document the node, if it's a class or function.
+        complexity (int): How hard the node is to document, if it's a class or function.
+        template (ParsedDocstring): Content of the docstring of an undocumented trivial
+            function, which can be written without any model.
+        docstring_raw (str): Value of the existing docstring, if any.
+        docstring_span (Tuple[int, int, int, int]): Start line, start column, end line and end
+            column of the existing docstring, if any.
 
     Returns:
         None
@@ -35,8 +56,8 @@ class GPT4DocstringsNode:
 
     name = attr.ib()
     path = attr.ib()
-    source = attr.ib()
-    ast_node = attr.ib()
+    file_content = attr.ib(repr=False)
+    source_span = attr.ib()
     level = attr.ib()
     docstring_lineno = attr.ib()
     col_offset = attr.ib()
@@ -45,7 +66,25 @@ class GPT4DocstringsNode:
     is_nested_func = attr.ib()
     is_nested_cls = attr.ib()
     is_cls_method = attr.ib()
-    parent = attr.ib()
+    parent_path = attr.ib()
+    token_budget = attr.ib(default=None)
+    complexity = attr.ib(default=None)
+    template = attr.ib(default=None, repr=False)
+    docstring_raw = attr.ib(default=None, repr=False)
+    docstring_span = attr.ib(default=None)
+
+    @property
+    def source(self) -> str:
+        """The dedented source code of the function / class."""
+        start, end = self.source_span
+        return textwrap.dedent(self.file_content[start:end])
+
+    @property
+    def docstring(self):
+        """The cleaned existing docstring, as returned by `ast.get_docstring`."""
+        if self.docstring_raw is None:
+            return None
+        return inspect.cleandoc(self.docstring_raw)
 
 
 class GPT4DocstringsVisitor(ast.NodeVisitor):
@@ -55,13 +94,25 @@ class GPT4DocstringsVisitor(ast.NodeVisitor):
     Args:
         filename (str): filename to parse coverage
         config (GPT4DocstringsConfig): configuration
+        file_content (str): content of the file. If not provided, the source of each
+            node is unparsed from the AST.
+        analyze (bool): If `False`, the token budget, complexity and template of the
+            nodes aren't computed (e.g. when only the coverage is needed).
     """
 
-    def __init__(self, filename, config):
+    def __init__(self, filename, config, file_content=None, analyze=True):
         self.filename = filename
+        self.analyze = analyze
         self.stack = []
         self.nodes = []
         self.config = config
+        self.file_content = file_content
+        self._line_offsets = None
+        if file_content is not None:
+            # Same line breaks as the tokenizer, so AST line numbers index this table
+            self._line_offsets = [0] + [
+                m.end() for m in re.finditer(r"\r\n?|\n", file_content)
+            ]
 
     @staticmethod
     def _has_doc(node):
@@ -79,6 +130,37 @@ class GPT4DocstringsVisitor(ast.NodeVisitor):
         except AttributeError:
             return None
 
+    def _get_source(self, node):
+        """Returns the content the node source is sliced from and its offsets."""
+        if self._line_offsets is None:
+            source = ast.unparse(node)
+            return source, (0, len(source))
+        if isinstance(node, ast.Module):
+            return self.file_content, (0, len(self.file_content))
+
+        decorators = getattr(node, "decorator_list", [])
+        start_lineno = min([node.lineno] + [d.lineno for d in decorators])
+        end = (
+            self._line_offsets[node.end_lineno]
+            if node.end_lineno < len(self._line_offsets)
+            else len(self.file_content)
+        )
+        return self.file_content, (self._line_offsets[start_lineno - 1], end)
+
+    @staticmethod
+    def _get_docstring_node(node):
+        """Returns the constant node of the existing docstring, if any."""
+        if not (hasattr(node, "body") and node.body):
+            return None
+        first = node.body[0]
+        if (
+            isinstance(first, ast.Expr)
+            and isinstance(first.value, ast.Constant)
+            and isinstance(first.value.value, str)
+        ):
+            return first.value
+        return None
+
     def _visit_helper(self, node):
         """Recursively visit AST node for docstrings."""
         if not hasattr(node, "name"):
@@ -105,12 +187,20 @@ class GPT4DocstringsVisitor(ast.NodeVisitor):
         ):
             docstring_lineno = node.body[0].lineno - 1
 
+        docstring_node = self._get_docstring_node(node)
+        file_content, source_span = self._get_source(node)
+
         node_type = type(node).__name__
+        analyzed = self.analyze and node_type in (
+            "ClassDef",
+            "FunctionDef",
+            "AsyncFunctionDef",
+        )
         cov_node = GPT4DocstringsNode(
             name=node_name,
             path=path,
-            source=ast.unparse(node),
-            ast_node=node,
+            file_content=file_content,
+            source_span=source_span,
             covered=self._has_doc(node),
             level=len(self.stack),
             node_type=node_type,
@@ -119,7 +209,30 @@ class GPT4DocstringsVisitor(ast.NodeVisitor):
             is_nested_func=self._is_nested_func(parent, node_type),
             is_nested_cls=self._is_nested_cls(parent, node_type),
             is_cls_method=self._is_cls_method(parent, node_type),
-            parent=parent,
+            parent_path=parent.path if parent is not None else None,
+            docstring_raw=docstring_node.value if docstring_node else None,
+            docstring_span=(
+                (
+                    docstring_node.lineno,
+                    docstring_node.col_offset,
+                    docstring_node.end_lineno,
+                    docstring_node.end_col_offset,
+                )
+                if docstring_node
+                else None
+            ),
+            token_budget=estimate_token_budget(node) if analyzed else None,
+            complexity=complexity_score(node) if analyzed else None,
+            template=(
+                docstring_template(
+                    node,
+                    parent.name
+                    if parent is not None and parent.node_type == "ClassDef"
+                    else None,
+                )
+                if analyzed and docstring_node is None
+                else None
+            ),
         )
         self.stack.append(cov_node)
         self.nodes.append(cov_node)
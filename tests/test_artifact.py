@@ -0,0 +1,160 @@
+import ast
+import json
+
+from click.testing import CliRunner
+
+from gpt4docstrings import GPT4Docstrings
+from gpt4docstrings.artifact import apply_artifact
+from gpt4docstrings.artifact import read_artifact
+from gpt4docstrings.cli import main
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.journal import source_hash
+from gpt4docstrings.visit import GPT4DocstringsVisitor
+
+SOURCE = """def scale(point, factor):
+    return point * factor
+
+
+def norm(point):
+    \"\"\"Returns the norm.\"\"\"
+    return abs(point)
+
+
+def double(point):
+    return point * 2
+"""
+
+
+def _fake_generator(calls):
+    async def generate_docstring(node):
+        calls.append(node.name)
+        return Docstring(
+            text=f"Docstring for {node.name}.",
+            col_offset=4 + node.col_offset,
+            lineno=node.docstring_lineno,
+        )
+
+    return generate_docstring
+
+
+def _generate(tmp_path, calls):
+    gpt4docs = GPT4Docstrings(
+        paths=[str(tmp_path / "module.py")],
+        translate=False,
+        config=GPT4DocstringsConfig(overwrite=True),
+        artifact_path=str(tmp_path / "results.jsonl"),
+    )
+    gpt4docs.docstring_generator.generate_docstring = _fake_generator(calls)
+    gpt4docs.run()
+    return str(tmp_path / "results.jsonl")
+
+
+def test_generate_writes_artifact_only(test_openai_api_key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(SOURCE)
+    calls = []
+
+    artifact = _generate(tmp_path, calls)
+
+    # Neither the file nor a patch is written
+    assert (tmp_path / "module.py").read_text() == SOURCE
+    assert not (tmp_path / "gpt4docstring_docstring_generator_patch.diff").exists()
+    records = {record.path: record for record in read_artifact(artifact)}
+    assert set(records) == {"module.py:scale", "module.py:double"}
+    assert records["module.py:scale"].file == "module.py"
+    assert records["module.py:scale"].docstring == "Docstring for scale."
+    assert records["module.py:scale"].lineno == 1
+    assert len(records["module.py:scale"].source_hash) == 64
+
+
+def test_apply_skips_stale_nodes(test_openai_api_key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(SOURCE)
+    artifact = _generate(tmp_path, [])
+
+    # `double` changes, and a function is added above `scale`
+    changed = "import math\n\n\n" + SOURCE.replace("* 2", "* 2.0")
+    (tmp_path / "module.py").write_text(changed)
+
+    patch, counts = apply_artifact(artifact)
+    assert counts["Docstrings applied"] == 1
+    assert counts["Docstrings stale"] == 1
+    assert "+++ b/module.py\n" in patch
+    assert "+    Docstring for scale.\n" in patch
+    assert (tmp_path / "module.py").read_text() == changed
+
+    apply_artifact(artifact, overwrite=True)
+    content = (tmp_path / "module.py").read_text()
+    assert 'def scale(point, factor):\n    """\n    Docstring for scale.\n' in content
+    assert "Docstring for double" not in content
+
+    # Applying it again is a no-op: the documented node doesn't match anymore
+    _, counts = apply_artifact(artifact, overwrite=True)
+    assert counts["Docstrings applied"] == 0
+    assert (tmp_path / "module.py").read_text() == content
+
+
+def test_apply_command(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(SOURCE)
+    visitor = GPT4DocstringsVisitor("module.py", GPT4DocstringsConfig(), SOURCE)
+    visitor.visit(ast.parse(SOURCE))
+    norm = next(node for node in visitor.nodes if node.name == "norm")
+    record = {
+        "kind": "translation",
+        "file": "module.py",
+        "path": "module.py:norm",
+        "source_hash": source_hash(norm.source),
+        "lineno": 5,
+        "col_offset": 4,
+        "docstring": "Returns the norm.\n\nArgs:\n    point: The point.",
+    }
+    with open(tmp_path / "results.jsonl", "w") as f:
+        f.write(json.dumps(record) + "\n")
+        f.write(json.dumps({**record, "path": "module.py:gone"}) + "\n{torn line")
+
+    result = CliRunner().invoke(main, ["apply", "results.jsonl", "-o", "out.diff"])
+
+    assert result.exit_code == 0, result.output
+    assert "Patch written to out.diff" in result.output
+    with open(tmp_path / "out.diff") as f:
+        patch = f.read()
+    assert '-    """Returns the norm."""\n' in patch
+    assert "+        point: The point.\n" in patch
+    assert (tmp_path / "module.py").read_text() == SOURCE
+
+
+def test_apply_nodes_sharing_a_path(test_openai_api_key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = """class Foo:
+    _x = None
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+
+
+if DEBUG:
+    def f():
+        return 1
+else:
+    def f():
+        return 1
+"""
+    (tmp_path / "module.py").write_text(source)
+    artifact = _generate(tmp_path, [])
+    (tmp_path / "module.py").write_text(source)
+
+    _, counts = apply_artifact(artifact, overwrite=True)
+    assert counts["Docstrings applied"] == 5
+    assert "Docstrings stale" not in counts
+    content = (tmp_path / "module.py").read_text()
+    # The getter is documented from a template, the setter by the model
+    assert "The x of the foo." in content
+    assert content.count("Docstring for x.") == 1
+    assert content.count("Docstring for f.") == 2
@@ -0,0 +1,222 @@
+import asyncio
+import json
+
+import aiohttp
+import openai
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from langchain.chat_models import ChatOpenAI
+
+from gpt4docstrings.backends import HTTPClientPool
+from gpt4docstrings.backends import LangChainBackend
+from gpt4docstrings.backends import OpenAICompatibleBackend
+from gpt4docstrings.exceptions import BackendError
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.utils.completions import get_docstring_completion
+from gpt4docstrings.utils.streaming import stream_docstring_completion
+
+
+def _app(requests, status=200, delay=0.0, failures=None):
+    async def chat_completions(request):
+        payload = await request.json()
+        requests.append((dict(request.headers), payload))
+        await asyncio.sleep(delay)
+        # The first `failures` requests fail with `status`, or all of them if not set
+        if status != 200 and (failures is None or len(requests) <= failures):
+            return web.json_response({"error": "overloaded"}, status=status)
+
+        if not payload.get("stream"):
+            return web.json_response(
+                {
+                    "id": "chatcmpl-0",
+                    "object": "chat.completion",
+                    "model": payload["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {
+                                "role": "assistant",
+                                "content": '"""\nAdds two numbers.',
+                            },
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {"prompt_tokens": 120, "completion_tokens": 7},
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for chunk in ['"""', "Adds two", " numbers.", '"""', " More", " text"]:
+            event = {"choices": [{"delta": {"content": chunk}}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+async def _with_backend(test, requests, **kwargs):
+    server_kwargs = {
+        k: kwargs.pop(k) for k in ("status", "delay", "failures") if k in kwargs
+    }
+    async with TestServer(_app(requests, **server_kwargs)) as server:
+        backend = OpenAICompatibleBackend(
+            "local-model", base_url=str(server.make_url("/v1")), **kwargs
+        )
+        try:
+            return await test(backend)
+        finally:
+            await backend.aclose()
+
+
+def test_completion_with_usage():
+    requests = []
+    report = RunReport()
+
+    completion = asyncio.run(
+        _with_backend(
+            lambda backend: get_docstring_completion(
+                backend, "prompt", max_tokens=80, report=report
+            ),
+            requests,
+            api_key="secret",
+        )
+    )
+
+    assert completion == '"""\nAdds two numbers.\n"""'
+    headers, payload = requests[0]
+    assert headers["Authorization"] == "Bearer secret"
+    assert payload["model"] == "local-model"
+    assert payload["max_tokens"] == 80
+    assert payload["stop"]
+    assert report.counters["Prompt tokens (reported)"] == 120
+    assert report.counters["Completion tokens (reported)"] == 7
+
+
+def test_json_mode_requests_a_json_object():
+    requests = []
+
+    asyncio.run(
+        _with_backend(
+            lambda backend: get_docstring_completion(backend, "prompt", json_mode=True),
+            requests,
+        )
+    )
+
+    _, payload = requests[0]
+    assert payload["response_format"] == {"type": "json_object"}
+    # The docstring isn't delimited by triple quotes in a JSON answer
+    assert "stop" not in payload
+
+
+def test_stream_is_parsed_and_stopped_early():
+    requests = []
+
+    completion, stats = asyncio.run(
+        _with_backend(
+            lambda backend: stream_docstring_completion(
+                backend, "prompt", "m.py:add", max_tokens=100
+            ),
+            requests,
+        )
+    )
+
+    assert completion == '"""Adds two numbers."""'
+    assert stats.stopped_early
+    assert stats.tokens_received == 4
+    assert "Authorization" not in requests[0][0]
+    assert requests[0][1]["stream"] is True
+
+
+def test_http_errors_and_timeouts_are_raised():
+    requests = []
+    with pytest.raises(BackendError, match="503"):
+        asyncio.run(
+            _with_backend(
+                lambda backend: backend.complete("prompt"),
+                requests,
+                status=503,
+                retry_delay=0,
+            )
+        )
+    # The server error is retried before it's raised
+    assert len(requests) == 6
+
+    requests = []
+    with pytest.raises(BackendError, match="400"):
+        asyncio.run(
+            _with_backend(
+                lambda backend: backend.complete("prompt"), requests, status=400
+            )
+        )
+    assert len(requests) == 1
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(
+            _with_backend(
+                lambda backend: backend.complete("prompt"), [], delay=1, timeout=0.1
+            )
+        )
+
+
+def test_server_and_connection_errors_are_retried():
+    requests = []
+    completion = asyncio.run(
+        _with_backend(
+            lambda backend: backend.complete("prompt"),
+            requests,
+            status=502,
+            failures=2,
+            retry_delay=0,
+        )
+    )
+    assert completion.text == '"""\nAdds two numbers.'
+    assert len(requests) == 3
+
+    async def refused(backend):
+        # Nothing listens on port 1
+        backend.url = "http://127.0.0.1:1/v1/chat/completions"
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await backend.complete("prompt")
+        return backend.pool.stats.requests
+
+    assert asyncio.run(_with_backend(refused, [], retry_delay=0)) == 6
+
+
+def test_pool_is_shared_by_both_backends():
+    requests = []
+    pool = HTTPClientPool(pool_size=4)
+
+    async def test():
+        async with TestServer(_app(requests)) as server:
+            base_url = str(server.make_url("/v1"))
+            http = OpenAICompatibleBackend("local-model", base_url=base_url, pool=pool)
+            langchain = LangChainBackend(
+                ChatOpenAI(
+                    model_name="local-model",
+                    openai_api_key="secret",
+                    openai_api_base=base_url,
+                )
+            )
+            token = openai.aiosession.set(pool.session)
+            try:
+                for _ in range(3):
+                    await http.complete("prompt")
+                    await langchain.complete("prompt")
+            finally:
+                openai.aiosession.reset(token)
+                await http.aclose()
+                # The backend doesn't close a shared pool
+                assert not pool._session.closed
+                await pool.aclose()
+
+    asyncio.run(test())
+
+    assert len(requests) == 6
+    assert pool.stats.requests == 6
+    assert pool.stats.connections_opened == 1
+    assert pool.stats.connections_reused == 5
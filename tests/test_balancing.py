@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from gpt4docstrings.backends import BalancedBackend
+from gpt4docstrings.backends import Completion
+from gpt4docstrings.backends import CompletionBackend
+from gpt4docstrings.backends import Endpoint
+from gpt4docstrings.backends.balanced_backend import parse_endpoint
+from gpt4docstrings.exceptions import BackendError
+from gpt4docstrings.exceptions import RateLimitError
+from gpt4docstrings.generate_docstrings import GPT4Docstrings
+from gpt4docstrings.report import RunReport
+
+
+class FakeBackend(CompletionBackend):
+    def __init__(self, endpoint, errors, release=None):
+        self.endpoint = endpoint
+        self.errors = errors
+        self.release = release
+        self.requests = 0
+
+    async def complete(self, prompt, max_tokens=None, stop=None, json_mode=False):
+        self.requests += 1
+        if self.release is not None:
+            await self.release.wait()
+        error = self.errors.get(self.endpoint.name)
+        if error is not None:
+            raise error
+        return Completion(text=f"from {self.endpoint.name}", completion_tokens=3)
+
+    async def stream(self, prompt, max_tokens=None, stop=None, json_mode=False):
+        completion = await self.complete(prompt)
+        for chunk in completion.text.split():
+            yield chunk
+
+
+def _balanced(names, errors=None, max_in_flight=16, release=None):
+    backends = {}
+
+    def factory(endpoint):
+        backends[endpoint.name] = FakeBackend(endpoint, errors or {}, release)
+        return backends[endpoint.name]
+
+    endpoints = [
+        Endpoint("https://api.test/v1", max_in_flight=max_in_flight, name=name)
+        for name in names
+    ]
+    report = RunReport()
+    return BalancedBackend("gpt-3.5-turbo", endpoints, factory, report), backends
+
+
+def test_parse_endpoint(monkeypatch):
+    monkeypatch.setenv("SECOND_KEY", "sk-second")
+    endpoint = parse_endpoint(
+        "https://api.openai.com/v1, key=$SECOND_KEY, max-in-flight=8, name=second"
+    )
+    assert endpoint == Endpoint("https://api.openai.com/v1", "sk-second", 8, "second")
+    assert parse_endpoint("http://localhost:8000/v1").api_key is None
+
+    for spec in (
+        "localhost:8000",
+        "http://localhost:8000/v1,max-in-flight=0",
+        "http://localhost:8000/v1,key=$UNSET_KEY_VARIABLE",
+        "http://localhost:8000/v1,weight=2",
+    ):
+        with pytest.raises(ValueError):
+            parse_endpoint(spec)
+
+
+def test_requests_go_to_the_least_loaded_endpoint():
+    async def main():
+        release = asyncio.Event()
+        backend, backends = _balanced(["a", "b"], max_in_flight=2, release=release)
+        requests = [asyncio.ensure_future(backend.complete("prompt")) for _ in range(5)]
+        await asyncio.sleep(0)
+
+        # Two requests in flight on each endpoint, the fifth waits for a slot
+        assert [m.in_flight for m in backend.members] == [2, 2]
+        assert sum(b.requests for b in backends.values()) == 4
+
+        release.set()
+        await asyncio.gather(*requests)
+        return backend
+
+    backend = asyncio.run(main())
+    assert [m.in_flight for m in backend.members] == [0, 0]
+    assert sum(stats.requests for stats in backend.report.endpoints.values()) == 5
+
+
+def test_failover_and_ejection():
+    errors = {"a": BackendError("503 overloaded", status=503)}
+    backend, backends = _balanced(["a", "b"], errors)
+
+    for _ in range(3):
+        completion = asyncio.run(backend.complete("prompt"))
+        assert completion.text == "from b"
+    assert backend.report.counters["Requests failed over"] == 3
+
+    # After three failures in a row, the endpoint is left out
+    stats = backend.report.endpoints["a"]
+    assert (stats.failures, stats.ejections, stats.requests) == (3, 1, 0)
+    asyncio.run(backend.complete("prompt"))
+    assert backends["a"].requests == 3
+    assert backend.report.endpoints["b"].requests == 4
+
+    rows = backend.report.endpoint_rows()
+    assert [row[0] for row in rows] == ["a", "b"]
+
+
+def test_rate_limited_endpoint_is_ejected_at_once():
+    errors = {"a": RateLimitError("429 Too Many Requests", status=429)}
+    backend, backends = _balanced(["a", "b"], errors)
+
+    chunks = asyncio.run(_collect(backend.stream("prompt")))
+    assert chunks == ["from", "b"]
+    assert backend.report.endpoints["a"].ejections == 1
+
+    asyncio.run(backend.complete("prompt"))
+    assert backends["a"].requests == 1
+
+
+def test_request_errors_are_not_failed_over():
+    errors = {"a": BackendError("400 Bad Request", status=400)}
+    backend, backends = _balanced(["a", "b"], errors)
+
+    with pytest.raises(BackendError):
+        asyncio.run(backend.complete("prompt"))
+    assert backends["b"].requests == 0
+    assert "Requests failed over" not in backend.report.counters
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_generator_and_translator_share_the_pool(test_openai_api_key, tmp_path):
+    endpoints = [
+        parse_endpoint("https://api.openai.com/v1,max-in-flight=4"),
+        parse_endpoint("http://localhost:8000/v1,key=local,max-in-flight=2"),
+    ]
+    gpt4docs = GPT4Docstrings(paths=[str(tmp_path)], endpoints=endpoints)
+
+    backend = gpt4docs.docstring_generator.backend
+    assert isinstance(backend, BalancedBackend)
+    assert gpt4docs.docstring_translator.backend is backend
+    assert [m.backend.url for m in backend.members] == [
+        "https://api.openai.com/v1/chat/completions",
+        "http://localhost:8000/v1/chat/completions",
+    ]
+    assert backend.members[1].backend.headers["Authorization"] == "Bearer local"
+    assert [m.max_in_flight for m in backend.members] == [4, 2]
+    # The pool fails over to another endpoint instead of retrying
+    assert [m.backend.max_retries for m in backend.members] == [0, 0]
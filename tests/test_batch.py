@@ -0,0 +1,203 @@
+import asyncio
+import json
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from click.testing import CliRunner
+
+from gpt4docstrings import GPT4Docstrings
+from gpt4docstrings.backends import Completion
+from gpt4docstrings.backends import CompletionBackend
+from gpt4docstrings.backends import HTTPClientPool
+from gpt4docstrings.batch import collect_batch
+from gpt4docstrings.batch import LocalBatchClient
+from gpt4docstrings.batch import OpenAIBatchClient
+from gpt4docstrings.batch import parse_batch_results
+from gpt4docstrings.batch import submit_batch
+from gpt4docstrings.cli import main
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.exceptions import BackendError
+
+SOURCE = """class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def norm(self):
+        return (self.x**2 + self.y**2) ** 0.5
+
+
+def scale(point, factor):
+    return Point(point.x * factor, point.y * factor)
+
+
+def double(point, factor):
+    return Point(point.x * factor, point.y * factor)
+"""
+
+
+class FakeBackend(CompletionBackend):
+    def __init__(self, model_name, prompts):
+        self.model_name = model_name
+        self.prompts = prompts
+
+    async def complete(self, prompt, max_tokens=None, stop=None, json_mode=False):
+        self.prompts.append(prompt)
+        return Completion('"""\nDoes it.\n"""', finish_reason="stop")
+
+    async def stream(self, prompt, max_tokens=None, stop=None, json_mode=False):
+        yield (await self.complete(prompt)).text
+
+
+def _gpt4docs(tmp_path, **kwargs):
+    return GPT4Docstrings(
+        paths=[str(tmp_path / "module.py")],
+        translate=False,
+        config=GPT4DocstringsConfig(overwrite=True),
+        **kwargs,
+    )
+
+
+def test_batch_is_submitted_and_collected(test_openai_api_key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(SOURCE)
+    batch_dir = str(tmp_path / "batch")
+    prompts = []
+    client = LocalBatchClient(
+        batch_dir, lambda model_name: FakeBackend(model_name, prompts)
+    )
+
+    requests = list(_gpt4docs(tmp_path).iter_batch_requests())
+    # `__init__` is templated, so it needs no request
+    assert len(requests) == 4
+    assert {request["body"]["model"] for request in requests} == {"gpt-3.5-turbo"}
+    assert all(request["url"] == "/v1/chat/completions" for request in requests)
+    assert len(requests) == len({request["custom_id"] for request in requests})
+
+    state = asyncio.run(submit_batch(requests, client, batch_dir, "local"))
+    assert state.requests == len(requests)
+    results = asyncio.run(collect_batch(client, batch_dir))
+    assert len(results) == len(requests) == len(prompts)
+
+    # The results are collected offline: no model is called again
+    gpt4docs = _gpt4docs(tmp_path, batch_results=results)
+    gpt4docs.run()
+    content = (tmp_path / "module.py").read_text()
+    assert content.count('"""') == 2 * (len(requests) + 1)
+    assert gpt4docs.report.counters["Requests avoided by templates"] == 1
+    assert "Nodes failed" not in gpt4docs.report.counters
+    assert len(prompts) == len(requests)
+
+
+def test_changed_code_is_not_answered(test_openai_api_key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(SOURCE)
+    requests = list(_gpt4docs(tmp_path).iter_batch_requests())
+    results = {
+        request["custom_id"]: Completion('"""\nDoes it.\n"""') for request in requests
+    }
+
+    (tmp_path / "module.py").write_text(SOURCE.replace("** 0.5", "** 0.25"))
+    gpt4docs = _gpt4docs(tmp_path, batch_results=results)
+    gpt4docs.run()
+
+    # `norm` changed, and so did the source of its class
+    assert gpt4docs.report.counters["Nodes failed"] == 2
+    assert "def norm(self):\n        return" in (tmp_path / "module.py").read_text()
+
+
+def test_parse_batch_results():
+    lines = [
+        json.dumps(
+            {
+                "custom_id": "a",
+                "response": {
+                    "status_code": 200,
+                    "body": {
+                        "choices": [
+                            {
+                                "message": {"content": '"""Does a."""'},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {"prompt_tokens": 10, "completion_tokens": 4},
+                    },
+                },
+                "error": None,
+            }
+        ),
+        json.dumps({"custom_id": "b", "response": {"status_code": 500, "body": {}}}),
+        json.dumps({"custom_id": "c", "response": None, "error": {"code": "x"}}),
+        "",
+    ]
+
+    results = parse_batch_results(lines)
+
+    assert list(results) == ["a"]
+    assert results["a"].text == '"""Does a."""'
+    assert results["a"].completion_tokens == 4
+
+
+def test_submit_command(test_openai_api_key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(SOURCE)
+
+    result = CliRunner().invoke(
+        main, ["submit", "--batch-endpoint", "local", "--no-templates", "module.py"]
+    )
+
+    assert result.exit_code == 0, result.output
+    state = json.loads((tmp_path / ".gpt4docstrings_batch" / "batch.json").read_text())
+    assert state["endpoint"] == "local"
+    assert f"submitted with {state['requests']} requests" in result.output
+    with open(tmp_path / ".gpt4docstrings_batch" / "requests.jsonl") as f:
+        assert len(f.readlines()) == state["requests"]
+    # Nothing is documented until the batch is collected
+    assert (tmp_path / "module.py").read_text() == SOURCE
+
+
+def test_malformed_results_fail_without_retries(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(SOURCE)
+    requests = list(_gpt4docs(tmp_path).iter_batch_requests())
+    results = {request["custom_id"]: Completion("") for request in requests}
+
+    gpt4docs = _gpt4docs(tmp_path, batch_results=results)
+    start = time.monotonic()
+    gpt4docs.run()
+
+    assert gpt4docs.report.counters["Nodes failed"] == len(requests)
+    assert time.monotonic() - start < 1
+
+
+def test_failed_api_requests_release_their_connection():
+    async def batch(request):
+        if request.match_info["batch_id"] == "missing":
+            return web.json_response({"error": "not found"}, status=404)
+        return web.json_response({"status": "completed"})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/v1/batches/{batch_id}", batch)
+        async with TestServer(app) as server:
+            pool = HTTPClientPool(pool_size=1)
+            client = OpenAIBatchClient(base_url=str(server.make_url("/v1")), pool=pool)
+            try:
+                for _ in range(3):
+                    with pytest.raises(BackendError) as e:
+                        await client.status("missing")
+                    assert e.value.status == 404
+                # With a single connection, a leaked one would block this request
+                status = await asyncio.wait_for(client.status("done"), timeout=5)
+            finally:
+                await pool.aclose()
+        return status, pool.stats
+
+    status, stats = asyncio.run(main())
+    assert status == "completed"
+    assert stats.connections_opened == 1
+    assert stats.connections_reused == 3
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from gpt4docstrings.concurrency import AdaptiveConcurrencyLimiter
+from gpt4docstrings.exceptions import RateLimitError
+from gpt4docstrings.hedging import RequestHedger
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.scheduler import NodeScheduler
+
+
+def test_limit_grows_while_latency_is_flat():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=32, initial_limit=4)
+
+    # Slow start: one more slot per answer
+    for _ in range(4):
+        limiter.record_latency("model", 1.0)
+    assert limiter.current == 8
+
+    # Then additive increase: about one more slot every `limit` answers
+    limiter.record_overload("model")
+    assert limiter.current == 4
+    for _ in range(5):
+        limiter.record_latency("model", 1.0)
+    assert limiter.current == 5
+
+    for _ in range(1000):
+        limiter.record_latency("model", 1.0)
+    assert limiter.current == 32
+
+
+def test_limit_is_cut_once_per_round_trip():
+    report = RunReport()
+    limiter = AdaptiveConcurrencyLimiter(max_limit=32, initial_limit=16, report=report)
+    limiter.record_latency("model", 10.0)
+    limiter.limit = 16
+
+    # A latency spike and the 429s of the requests in flight at the same time
+    limiter.record_latency("model", 50.0)
+    limiter.record_overload("model")
+    limiter.record_overload("model")
+
+    assert limiter.current == 8
+    assert report.counters["Concurrency cuts (latency spike)"] == 1
+    assert "Concurrency cuts (rate limited)" not in report.counters
+    assert report.concurrency_limits[-1][1] == 8
+
+
+def test_scheduler_follows_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8, initial_limit=2)
+    scheduler = NodeScheduler(max_concurrency=8, limiter=limiter)
+    in_flight = []
+    release = None
+
+    async def request():
+        in_flight.append(1)
+        await release.wait()
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        futures = [scheduler.submit((0,), request) for _ in range(10)]
+        await asyncio.sleep(0)
+        assert scheduler.running == 2
+
+        # A raised limit dispatches the waiting requests at once
+        limiter.limit = 5
+        limiter.on_change()
+        await asyncio.sleep(0)
+        assert scheduler.running == 5
+
+        release.set()
+        await asyncio.gather(*futures)
+
+    asyncio.run(main())
+    assert len(in_flight) == 10
+
+
+def test_hedger_reports_rate_limits():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=32, initial_limit=16)
+    hedger = RequestHedger(limiter=limiter)
+
+    async def rejected():
+        raise RateLimitError("429")
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(hedger.run(rejected, key="model"))
+    assert limiter.current == 8
@@ -0,0 +1,114 @@
+import json
+import os
+
+from click.testing import CliRunner
+
+from gpt4docstrings.cli import main
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.coverage import compute_coverage
+
+DOCUMENTED = '''"""A module."""
+
+
+def f():
+    """Does f."""
+
+
+class A:
+    def g(self):
+        pass
+
+    def _h(self):
+        pass
+'''
+
+UNDOCUMENTED = """def f():
+    def inner():
+        pass
+"""
+
+
+def _write_tree(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text(DOCUMENTED)
+    (tmp_path / "b.py").write_text(UNDOCUMENTED)
+    (tmp_path / "broken.py").write_text("def f(:\n")
+    return [
+        str(tmp_path / "pkg" / "a.py"),
+        str(tmp_path / "b.py"),
+        str(tmp_path / "broken.py"),
+    ]
+
+
+def test_compute_coverage(tmp_path):
+    filenames = _write_tree(tmp_path)
+    config = GPT4DocstringsConfig(ignore_semiprivate=True, ignore_nested_functions=True)
+
+    report = compute_coverage(filenames, config, cache_path=None, base=str(tmp_path))
+    summary = report.to_dict()
+
+    assert (report.covered, report.total) == (2, 6)
+    assert summary["node_types"]["FunctionDef"] == {
+        "covered": 1,
+        "uncovered": 2,
+        "total": 3,
+        "coverage": 33.3,
+    }
+    assert summary["packages"]["pkg"]["total"] == 4
+    assert summary["packages"]["."]["covered"] == 0
+    assert summary["files"]["b.py"]["total"] == 2
+    assert summary["errors"]["broken.py"].startswith("SyntaxError")
+
+
+def test_coverage_cache_is_reused_until_files_change(tmp_path):
+    filenames = _write_tree(tmp_path)
+    cache_path = str(tmp_path / "cache.json")
+
+    first = compute_coverage(filenames, cache_path=cache_path)
+    second = compute_coverage(filenames, cache_path=cache_path)
+    assert (first.cached, second.cached) == (0, 3)
+    assert second.to_dict() == first.to_dict()
+
+    (tmp_path / "b.py").write_text('"""Documented."""\n' + UNDOCUMENTED)
+    third = compute_coverage(filenames, cache_path=cache_path)
+    assert third.cached == 2
+    assert third.covered == first.covered + 1
+
+    # Other ignore options invalidate the whole table
+    config = GPT4DocstringsConfig(ignore_nested_functions=True)
+    assert compute_coverage(filenames, config, cache_path=cache_path).cached == 0
+
+
+def test_coverage_command(tmp_path, monkeypatch):
+    # No API key is needed: the command never builds a model client
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.chdir(tmp_path)
+    _write_tree(tmp_path)
+    os.remove(tmp_path / "broken.py")
+
+    result = CliRunner().invoke(main, ["coverage", "--json", str(tmp_path)])
+    assert result.exit_code == 0, result.output
+    report = json.loads(result.output)
+    assert report["summary"]["covered"] == 2
+    assert report["summary"]["files"] == 2
+
+    result = CliRunner().invoke(main, ["coverage", "--fail-under", "50", "-s", "-n"])
+    assert result.exit_code == 1
+    assert "Coverage: 33.3% (2/6 nodes in 2 files, 0 from the cache)" in result.output
+
+    result = CliRunner().invoke(main, ["coverage", "--fail-under", "25"])
+    assert result.exit_code == 0
+
+
+def test_path_named_like_a_command_is_ambiguous(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "coverage").mkdir()
+    (tmp_path / "coverage" / "a.py").write_text(DOCUMENTED)
+
+    result = CliRunner().invoke(main, ["coverage", "--json"])
+    assert result.exit_code == 2
+    assert "'coverage' is both a command and a path" in result.output
+
+    result = CliRunner().invoke(main, ["./coverage", "--help"])
+    assert result.exit_code == 0
+    assert "Generate (or translate) the docstrings of PATHS" in result.output
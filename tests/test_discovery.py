@@ -0,0 +1,91 @@
+import os
+
+from gpt4docstrings.utils.discovery import ExclusionMatcher
+from gpt4docstrings.utils.discovery import iter_python_files
+
+
+def _touch(root, *paths):
+    for path in paths:
+        full_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write("")
+
+
+def _relative(root, files):
+    return sorted(os.path.relpath(f, root) for f in files)
+
+
+def test_exclusion_matcher_is_a_prefix_glob():
+    is_excluded = ExclusionMatcher(["/repo/tests", "/repo/*/generated_"])
+    assert is_excluded("/repo/tests/test_a.py")
+    assert is_excluded("/repo/pkg/generated_models.py")
+    assert not is_excluded("/repo/src/a.py")
+    assert not ExclusionMatcher([])("/repo/src/a.py")
+
+
+def test_walk_prunes_ignored_and_excluded_dirs(tmp_path):
+    root = str(tmp_path)
+    os.makedirs(os.path.join(root, ".git"))
+    _touch(
+        root,
+        "src/a.py",
+        "src/__init__.py",
+        "src/notes.txt",
+        "src/gen/model.py",
+        "src/gen/keep.py",
+        "src/sub/b.py",
+        "src/sub/local.py",
+        "src/tests/test_a.py",
+        "node_modules/pkg/x.py",
+        ".venv/lib/site.py",
+        "env/lib/site.py",
+        "env/pyvenv.cfg",
+        "build/lib/a.py",
+    )
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write(
+            "# generated code\nsrc/gen/*\n!src/gen/keep.py\nbuild/\nnode_modules/\n"
+        )
+    with open(os.path.join(root, "src", "sub", ".gitignore"), "w") as f:
+        f.write("local.py\n")
+
+    files = iter_python_files(root, ExclusionMatcher([os.path.join(root, "src/tests")]))
+    assert _relative(root, files) == [
+        "src/a.py",
+        "src/gen/keep.py",
+        "src/sub/b.py",
+    ]
+
+    # Parent .gitignore files up to the repository root apply to inner paths too
+    src = os.path.join(root, "src")
+    assert _relative(root, iter_python_files(src, ExclusionMatcher([]))) == [
+        "src/a.py",
+        "src/gen/keep.py",
+        "src/sub/b.py",
+        "src/tests/test_a.py",
+    ]
+
+    files = iter_python_files(src, ExclusionMatcher([]), respect_gitignore=False)
+    assert "src/gen/model.py" in _relative(root, files)
+
+
+def test_source_dirs_named_like_build_outputs_are_walked(tmp_path):
+    root = str(tmp_path)
+    _touch(
+        root,
+        "mypkg/build/steps.py",
+        "mypkg/dist/wheels.py",
+        "mypkg/venv/manager.py",
+        "mypkg/__pycache__/steps.py",
+        "venv/lib/site.py",
+        "venv/pyvenv.cfg",
+    )
+
+    # Only caches and actual virtual environments are pruned without a .gitignore
+    files = iter_python_files(root, ExclusionMatcher([]), respect_gitignore=False)
+    assert _relative(root, files) == [
+        "mypkg/build/steps.py",
+        "mypkg/dist/wheels.py",
+        "mypkg/venv/manager.py",
+    ]
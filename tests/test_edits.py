@@ -0,0 +1,78 @@
+import ast
+import difflib
+
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.edits import apply_edits
+from gpt4docstrings.edits import Edit
+from gpt4docstrings.edits import insertion_edit
+from gpt4docstrings.edits import replacement_edit
+from gpt4docstrings.edits import split_lines
+from gpt4docstrings.edits import unified_diff
+from gpt4docstrings.visit import GPT4DocstringsVisitor
+
+
+def _source(n_functions):
+    return "".join(
+        f"def f{i}(a):\n    x = a + {i}\n    return x\n\n\n" for i in range(n_functions)
+    )
+
+
+def _difflib_patch(lines, edits, filename):
+    src = "\n".join(lines)
+    target = "\n".join(apply_edits(lines, edits))
+    return list(
+        difflib.unified_diff(
+            [line + "\n" for line in src.splitlines()],
+            [line + "\n" for line in target.splitlines()],
+            fromfile="a/" + filename,
+            tofile="b/" + filename,
+        )
+    )
+
+
+def test_insertions_match_difflib():
+    lines = split_lines(_source(30))
+    # Close edits share a hunk, distant ones get their own
+    edits = [
+        insertion_edit(Docstring(f"Docstring for f{i}.", 4, 5 * i + 1))
+        for i in (0, 1, 7, 29)
+    ]
+
+    patch = unified_diff(lines, edits, "m.py")
+
+    assert patch == _difflib_patch(lines, edits, "m.py")
+    assert sum(line.startswith("@@") for line in patch) == 3
+
+
+def test_replacements_match_difflib():
+    source = _source(10)
+    lines = split_lines(source)
+    edits = [
+        Edit(1, 2, ["    x = a * 2"]),
+        Edit(11, 13, ["    y = a", "    z = y", "    return z"]),
+        Edit(48, 48, ["# end"]),
+    ]
+
+    assert unified_diff(lines, edits, "m.py") == _difflib_patch(lines, edits, "m.py")
+
+
+def test_replacement_keeps_prefix_quotes_and_suffix():
+    source = 'def f():\n    r"""Old."""  # noqa\n    return 1\n'
+    visitor = GPT4DocstringsVisitor("m.py", GPT4DocstringsConfig(), source)
+    visitor.visit(ast.parse(source))
+    node = next(node for node in visitor.nodes if node.name == "f")
+    lines = split_lines(source)
+
+    edit = replacement_edit(lines, node, Docstring("New.", 4, 1))
+
+    assert "\n".join(apply_edits(lines, [edit])) == (
+        'def f():\n    r"""\n    New.\n    """  # noqa\n    return 1\n'
+    )
+
+
+def test_unchanged_file_has_no_patch():
+    lines = split_lines(_source(3))
+
+    assert unified_diff(lines, [], "m.py") == []
+    assert unified_diff(lines, [Edit(1, 2, [lines[1]])], "m.py") == []
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from gpt4docstrings.exceptions import RequestTimeoutError
+from gpt4docstrings.hedging import MIN_LATENCY_SAMPLES
+from gpt4docstrings.hedging import RequestHedger
+from gpt4docstrings.report import percentile
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.scheduler import RunBudget
+
+
+class SlowFirstRequest:
+    """Answers the first call after `first_delay` seconds and the others at once."""
+
+    def __init__(self, first_delay):
+        self.first_delay = first_delay
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        try:
+            await asyncio.sleep(self.first_delay if call == 1 else 0.001)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return call
+
+
+def _warm_hedger(**kwargs):
+    hedger = RequestHedger(hedge=True, **kwargs)
+    hedger.latencies["model"] = [0.01] * MIN_LATENCY_SAMPLES
+    hedger.requests = 100
+    return hedger
+
+
+def test_percentile():
+    values = [5, 1, 4, 2, 3, 6, 7, 8, 9, 10]
+    assert percentile(values, 50) == 5
+    assert percentile(values, 95) == 10
+    assert percentile(values, 0) == 1
+    assert percentile([], 50) is None
+
+
+def test_slow_request_is_hedged_and_cancelled():
+    hedger = _warm_hedger()
+    report = RunReport()
+    request = SlowFirstRequest(first_delay=5)
+
+    result = asyncio.run(hedger.run(request, key="model", report=report))
+
+    assert result == 2
+    assert request.cancelled == 1
+    assert report.counters["Hedged requests"] == 1
+    assert report.counters["Hedges won"] == 1
+    assert report.latencies[0] < 1
+
+
+def test_hedges_are_capped():
+    hedger = _warm_hedger(max_hedge_rate=0.0)
+    report = RunReport()
+    request = SlowFirstRequest(first_delay=0.05)
+
+    assert asyncio.run(hedger.run(request, key="model", report=report)) == 1
+    assert request.calls == 1
+    assert "Hedged requests" not in report.counters
+
+
+def test_cold_model_is_not_hedged():
+    hedger = RequestHedger(hedge=True)
+    hedger.requests = 100
+    request = SlowFirstRequest(first_delay=0.05)
+
+    assert asyncio.run(hedger.run(request, key="model")) == 1
+    assert request.calls == 1
+    assert len(hedger.latencies["model"]) == 1
+
+
+def test_request_timeout():
+    hedger = RequestHedger(timeout=0.05)
+    report = RunReport()
+    request = SlowFirstRequest(first_delay=5)
+
+    with pytest.raises(RequestTimeoutError):
+        asyncio.run(hedger.run(request, key="model", report=report))
+    assert request.cancelled == 1
+    assert report.counters["Requests timed out"] == 1
+    assert report.latencies == []
+
+
+def test_hedges_are_charged_and_settled():
+    budget = RunBudget(max_requests=2)
+    hedger = _warm_hedger(budget=budget)
+    request = SlowFirstRequest(first_delay=5)
+
+    result = asyncio.run(
+        hedger.run(
+            request, key="model", tokens=(1000, 1000), usage=lambda call: (1000, 0)
+        )
+    )
+
+    # The cancelled request keeps its estimate, the winner is settled on its usage
+    assert result == 2
+    assert budget.requests == 2
+    assert budget.cost == pytest.approx(
+        budget.estimate_cost(1000, 1000, "model")
+        + budget.estimate_cost(1000, 0, "model")
+    )
+
+
+def test_no_hedge_beyond_the_budget():
+    budget = RunBudget(max_requests=1)
+    hedger = _warm_hedger(budget=budget, timeout=0.2)
+    request = SlowFirstRequest(first_delay=5)
+
+    with pytest.raises(RequestTimeoutError):
+        asyncio.run(hedger.run(request, key="model"))
+    assert request.calls == 1
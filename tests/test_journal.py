@@ -0,0 +1,76 @@
+import ast
+import os
+
+from gpt4docstrings import GPT4Docstrings
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.journal import Journal
+from gpt4docstrings.visit import GPT4DocstringsVisitor
+
+
+def _nodes(source):
+    visitor = GPT4DocstringsVisitor(
+        filename="m.py", config=GPT4DocstringsConfig(), file_content=source
+    )
+    visitor.visit(ast.parse(source))
+    return {node.name: node for node in visitor.nodes}
+
+
+def test_journal_replays_completed_nodes(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    node = _nodes("def f(a):\n    return a\n")["f"]
+
+    journal = Journal(path)
+    journal.record("generation", "m.py", node, Docstring("Returns a.", 4, 1))
+    journal.close()
+    # A torn line left by a crash is ignored
+    with open(path, "a") as f:
+        f.write('{"kind": "generation", "filen')
+
+    resumed = Journal(path, resume=True)
+    docstring = resumed.get("generation", "m.py", node)
+    assert docstring.text == "Returns a."
+    assert docstring.lineno == node.docstring_lineno
+    assert resumed.get("translation", "m.py", node) is None
+
+    changed = _nodes("def f(a, b):\n    return a\n")["f"]
+    assert resumed.get("generation", "m.py", changed) is None
+    resumed.close()
+
+    assert Journal(path).entries == {}
+
+
+def test_run_resumes_from_journal(test_openai_api_key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    filename = str(tmp_path / "m.py")
+    with open(filename, "w") as f:
+        f.write("def f(a):\n    return a\n\n\ndef g(b):\n    return b\n")
+
+    journal = Journal()
+    journal.record(
+        "generation",
+        filename,
+        _nodes(open(filename).read())["f"],
+        Docstring("F.", 4, 1),
+    )
+    journal.close()
+
+    calls = []
+
+    async def generate_docstring(node):
+        calls.append(node.name)
+        return Docstring("G.", 4 + node.col_offset, node.docstring_lineno)
+
+    docstrings_generator = GPT4Docstrings(
+        paths=[filename],
+        translate=False,
+        config=GPT4DocstringsConfig(overwrite=True),
+        resume=True,
+    )
+    docstrings_generator.docstring_generator.generate_docstring = generate_docstring
+    docstrings_generator.run()
+
+    assert calls == ["g"]
+    content = open(filename).read()
+    assert "    F.\n" in content and "    G.\n" in content
+    assert not os.path.exists(docstrings_generator.journal_path)
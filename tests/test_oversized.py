@@ -0,0 +1,170 @@
+import ast
+import asyncio
+
+import pytest
+
+from gpt4docstrings import GPT4Docstrings
+from gpt4docstrings.backends import Completion
+from gpt4docstrings.backends import CompletionBackend
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.docstrings_generators import ChatGPTDocstringGenerator
+from gpt4docstrings.exceptions import ContextWindowExceededError
+from gpt4docstrings.scheduler import parse_context_window
+from gpt4docstrings.utils.summaries import chunk_lines
+from gpt4docstrings.utils.summaries import condense_source
+from gpt4docstrings.utils.summaries import split_source
+from gpt4docstrings.visit import GPT4DocstringsVisitor
+
+BIG_BODY = "".join(
+    f"    value_{i} = compute(value_{i - 1}, {i})\n" for i in range(1, 400)
+)
+SOURCE = f"""@cached
+def big(value_0):
+{BIG_BODY}    return value_399
+
+
+def small(a):
+    return a + 1
+"""
+
+
+class FakeBackend(CompletionBackend):
+    model_name = "gpt-3.5-turbo"
+
+    def __init__(self):
+        self.prompts = []
+
+    async def complete(self, prompt, max_tokens=None, stop=None, json_mode=False):
+        self.prompts.append(prompt)
+        if "Summarize what this part does" in prompt:
+            return Completion("Chains `compute` over the values.")
+        return Completion('"""\nDoes it.\n"""', finish_reason="stop")
+
+    async def stream(self, prompt, max_tokens=None, stop=None, json_mode=False):
+        yield (await self.complete(prompt)).text
+
+
+def _nodes(source=SOURCE):
+    visitor = GPT4DocstringsVisitor("module.py", GPT4DocstringsConfig(), source)
+    visitor.visit(ast.parse(source))
+    return {node.name: node for node in visitor.nodes}
+
+
+def _generator(backend, **kwargs):
+    return ChatGPTDocstringGenerator(
+        api_key="key",
+        model_name="gpt-3.5-turbo",
+        docstring_style="google",
+        backend=backend,
+        **kwargs,
+    )
+
+
+def test_split_and_condense_source():
+    header, body = split_source(_nodes()["big"])
+    assert header == ["@cached", "def big(value_0):"]
+    assert body[0] == "    value_1 = compute(value_0, 1)"
+    assert body[-1] == "    return value_399"
+
+    chunks = chunk_lines(body, 500)
+    assert len(chunks) > 1
+    assert "\n".join(chunks) == "\n".join(body)
+
+    condensed = condense_source(header, body, "It computes.")
+    assert condensed.splitlines() == [
+        "@cached",
+        "def big(value_0):",
+        "    # Summary of the 400 lines of the body, too long to be shown:",
+        "    # It computes.",
+        "    ...",
+    ]
+
+
+def test_oversized_node_is_summarized():
+    backend = FakeBackend()
+    generator = _generator(backend)
+    node = _nodes()["big"]
+    assert not generator.fits_context_window(node)
+
+    docstring = asyncio.run(generator.generate_docstring(node))
+
+    assert docstring.text.strip() == "Does it."
+    summaries = generator.report.counters["Summary requests"]
+    assert summaries == len(backend.prompts) - 1 > 1
+    assert generator.report.counters["Oversized nodes summarized"] == 1
+    # The docstring is requested from the summaries, not from the body
+    assert "Chains `compute` over the values." in backend.prompts[-1]
+    assert "value_200 = compute" not in backend.prompts[-1]
+    assert "def big(value_0):" in backend.prompts[-1]
+
+
+def test_oversized_node_is_skipped_without_requests(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(SOURCE)
+    backend = FakeBackend()
+    gpt4docs = GPT4Docstrings(
+        paths=[str(tmp_path / "module.py")],
+        translate=False,
+        config=GPT4DocstringsConfig(overwrite=True),
+    )
+    gpt4docs.docstring_generator = _generator(
+        backend, report=gpt4docs.report, oversized="skip"
+    )
+
+    with pytest.raises(ContextWindowExceededError):
+        asyncio.run(gpt4docs.docstring_generator.generate_docstring(_nodes()["big"]))
+    gpt4docs.report.reset()
+    gpt4docs.run()
+
+    # Only `small` was requested, and the failure wasn't retried
+    assert len(backend.prompts) == 1
+    assert gpt4docs.report.counters["Oversized nodes skipped"] == 1
+    assert gpt4docs.report.counters["Nodes failed"] == 1
+    assert (tmp_path / "module.py").read_text().count('"""') == 2
+
+
+def test_summaries_are_sent_one_at_a_time_within_the_budget(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(SOURCE)
+    in_flight = []
+    max_in_flight = []
+
+    class SlowBackend(FakeBackend):
+        async def complete(self, prompt, max_tokens=None, stop=None, json_mode=False):
+            in_flight.append(prompt)
+            max_in_flight.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(prompt)
+            return await super().complete(prompt, max_tokens, stop, json_mode)
+
+    backend = SlowBackend()
+    gpt4docs = GPT4Docstrings(
+        paths=[str(tmp_path / "module.py")],
+        translate=False,
+        config=GPT4DocstringsConfig(overwrite=True),
+        max_concurrent_requests=1,
+        max_requests=3,
+    )
+    gpt4docs.docstring_generator = _generator(
+        backend, report=gpt4docs.report, hedger=gpt4docs.hedger
+    )
+    gpt4docs.run()
+
+    assert max(max_in_flight) == 1
+    assert len(backend.prompts) == gpt4docs.budget.requests == 3
+    assert gpt4docs.report.counters["Nodes skipped by budget"] == 1
+
+
+def test_parse_context_window():
+    assert parse_context_window("8192") == (None, 8192)
+    assert parse_context_window("ft:gpt-3.5-turbo:org::id=16385") == (
+        "ft:gpt-3.5-turbo:org::id",
+        16385,
+    )
+    for value in ("", "local=", "local=0", "local=big"):
+        with pytest.raises(ValueError):
+            parse_context_window(value)
@@ -1,7 +1,12 @@
+import json
+import os
+
 import pytest
 
 from gpt4docstrings.utils.parsers import DocstringParser
 from gpt4docstrings.utils.parsers import DocstringParsingError
+from gpt4docstrings.utils.parsers import extract_docstring
+from gpt4docstrings.utils.parsers import StreamingDocstringParser
 
 
 def test_docstring():
@@ -23,3 +28,53 @@ def test_missing_backticks():
     text = "This is not a function docstring"
     with pytest.raises(DocstringParsingError):
         parser.parse(text)
+
+
+with open(
+    os.path.join(pytest.TESTS_PATH, "resources", "responses", "bad_responses.json")
+) as f:
+    BAD_RESPONSES = json.load(f)
+
+
+@pytest.mark.parametrize(
+    "response", BAD_RESPONSES, ids=[r["kind"] for r in BAD_RESPONSES]
+)
+def test_recorded_bad_responses_are_salvaged(response):
+    if response["docstring"] is None:
+        with pytest.raises(DocstringParsingError):
+            extract_docstring(response["response"], response["structured"])
+    else:
+        docstring, _ = extract_docstring(response["response"], response["structured"])
+        assert docstring == response["docstring"]
+
+
+def test_parsing_tiers():
+    assert extract_docstring("\"\"\"Strict.\"\"\"\n\n'''Other.'''") == (
+        "Strict.",
+        "strict",
+    )
+    assert extract_docstring('```python\n"""\nUnterminated.\n```\nMore.') == (
+        "Unterminated.",
+        "unterminated",
+    )
+    # JSON is only expected in structured-output mode
+    assert extract_docstring('{"docstring": "Text."}', structured=True) == (
+        "Text.",
+        "json",
+    )
+    with pytest.raises(DocstringParsingError):
+        extract_docstring('{"docstring": "Text."}')
+
+
+def test_streaming_parser_split_delimiters():
+    parser = StreamingDocstringParser()
+    chunks = ["Sure! ", '""', '"\nThis is a', " docstring", '"', '""', " and more"]
+    finished = [parser.feed(chunk) for chunk in chunks]
+    assert finished == [False, False, False, False, False, True, True]
+    assert DocstringParser().parse(parser.completion()) == "This is a docstring"
+
+
+def test_streaming_parser_unfinished():
+    parser = StreamingDocstringParser()
+    assert not parser.feed('"""Only the opening')
+    assert parser.started and not parser.finished
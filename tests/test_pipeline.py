@@ -0,0 +1,293 @@
+import asyncio
+import os
+import shutil
+
+import pytest
+
+from gpt4docstrings import GPT4Docstrings
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.exceptions import NoInputFilesError
+
+
+@pytest.fixture()
+def resources_copy(tmp_path):
+    target = tmp_path / "resources"
+    shutil.copytree(os.path.join(pytest.TESTS_PATH, "resources"), target)
+    return target
+
+
+def _fake_generator(calls):
+    async def generate_docstring(node):
+        calls.append(node.name)
+        await asyncio.sleep(0)
+        return Docstring(
+            text=f"Docstring for {node.name}.",
+            col_offset=4 + node.col_offset,
+            lineno=node.docstring_lineno,
+        )
+
+    return generate_docstring
+
+
+def test_pipeline_generates_patch(test_openai_api_key, resources_copy, monkeypatch):
+    monkeypatch.chdir(resources_copy)
+    calls = []
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(resources_copy)],
+        translate=False,
+        config=GPT4DocstringsConfig(),
+        workers=2,
+        max_queued_files=1,
+    )
+    docstrings_generator.docstring_generator.generate_docstring = _fake_generator(calls)
+    docstrings_generator.run()
+
+    # `A.__init__` only stores its parameters, so it's documented from a template
+    assert set(calls) == {"fn1", "fn2", "A", "add_word_to_attr1", "pow_attr2"}
+    assert docstrings_generator.report.counters["Requests avoided by templates"] == 1
+    with open("gpt4docstring_docstring_generator_patch.diff") as f:
+        patch = f.read()
+    assert "+    Docstring for fn1.\n" in patch
+    assert "+++ b/" + str(resources_copy / "package_1" / "module_2.py") in patch
+
+
+def test_pipeline_overwrites_files(test_openai_api_key, resources_copy, monkeypatch):
+    monkeypatch.chdir(resources_copy)
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(resources_copy / "module_1.py")],
+        translate=False,
+        config=GPT4DocstringsConfig(overwrite=True),
+    )
+    docstrings_generator.docstring_generator.generate_docstring = _fake_generator([])
+    docstrings_generator.run()
+
+    with open(resources_copy / "module_1.py") as f:
+        content = f.read()
+    assert 'def fn2(a: int, b: int):\n    """\n    Docstring for fn2.\n' in content
+
+
+def test_large_file_is_assembled_from_successful_nodes(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    filename = str(tmp_path / "generated.py")
+    with open(filename, "w") as f:
+        f.write("\n\n".join(f"def f{i}():\n    return {i}\n" for i in range(20)))
+
+    in_flight = []
+    max_in_flight = []
+
+    async def generate_docstring(node):
+        in_flight.append(node.name)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0)
+        in_flight.remove(node.name)
+        if node.name == "f3":
+            raise Exception("Max retries (5) exceeded.")
+        return Docstring(f"Doc {node.name}.", 4, node.docstring_lineno)
+
+    docstrings_generator = GPT4Docstrings(
+        paths=[filename],
+        translate=False,
+        config=GPT4DocstringsConfig(overwrite=True),
+        max_in_flight_per_file=4,
+    )
+    docstrings_generator.docstring_generator.generate_docstring = generate_docstring
+    docstrings_generator.run()
+
+    assert max(max_in_flight) <= 4
+    assert docstrings_generator.report.counters["Nodes failed"] == 1
+    with open(filename) as f:
+        content = f.read()
+    assert "Doc f3." not in content
+    assert all(f"Doc f{i}." in content for i in range(20) if i != 3)
+
+
+def test_results_are_streamed_and_the_instance_reused(
+    test_openai_api_key, resources_copy, monkeypatch
+):
+    monkeypatch.chdir(resources_copy)
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(resources_copy / "module_1.py")],
+        translate=False,
+        config=GPT4DocstringsConfig(),
+    )
+    docstrings_generator.docstring_generator.generate_docstring = _fake_generator([])
+
+    async def run_twice():
+        runs = []
+        async with docstrings_generator:
+            for _ in range(2):
+                runs.append([r async for r in docstrings_generator.aiter_results()])
+                runs.append(dict(docstrings_generator.report.counters))
+        return runs
+
+    first, first_counters, second, second_counters = asyncio.run(run_twice())
+
+    assert {r.path for r in first} == {r.path for r in second}
+    assert first_counters == second_counters
+    by_path = {r.path: r for r in first}
+    fn2 = by_path["module_1.py:fn2"]
+    assert fn2.filename == str(resources_copy / "module_1.py")
+    assert fn2.kind == "generation"
+    assert fn2.source == "model"
+    assert fn2.docstring.text == "Docstring for fn2."
+    assert fn2.model_name == "gpt-3.5-turbo"
+    assert fn2.prompt_tokens > 0 and fn2.elapsed >= 0
+
+
+def test_async_run_raises_instead_of_exiting(test_openai_api_key, tmp_path):
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(tmp_path)], config=GPT4DocstringsConfig()
+    )
+
+    async def run():
+        async with docstrings_generator:
+            await docstrings_generator.arun()
+
+    with pytest.raises(NoInputFilesError):
+        asyncio.run(run())
+
+
+def test_interrupt_stops_submitting_nodes(test_openai_api_key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    filename = tmp_path / "module.py"
+    filename.write_text(
+        "\n\n".join(f"def f{i}(a):\n    return a + {i}\n" for i in range(40))
+    )
+    calls = []
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(filename)],
+        translate=False,
+        config=GPT4DocstringsConfig(),
+        max_concurrent_requests=4,
+    )
+    fake_generator = _fake_generator(calls)
+
+    async def generate_docstring(node):
+        if len(calls) == 4:
+            docstrings_generator._request_stop()
+        return await fake_generator(node)
+
+    docstrings_generator.docstring_generator.generate_docstring = generate_docstring
+    with pytest.raises(SystemExit):
+        docstrings_generator.run()
+
+    # The requests in flight at the 5th one complete, but none of the queued ones
+    # is sent
+    assert 5 <= len(calls) <= 5 + 3
+    counters = docstrings_generator.report.counters
+    assert counters["Nodes skipped by interrupt"] == 40 - len(calls)
+    with open(docstrings_generator.journal_path) as f:
+        assert len(f.readlines()) == len(calls)
+
+
+def test_overlapping_result_streams_are_refused(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    filename = tmp_path / "module.py"
+    filename.write_text(
+        "\n\n".join(f"def f{i}(a):\n    return a + {i}\n" for i in range(10))
+    )
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(filename)],
+        translate=False,
+        config=GPT4DocstringsConfig(),
+        max_concurrent_requests=1,
+    )
+    docstrings_generator.docstring_generator.generate_docstring = _fake_generator([])
+
+    async def overlapping_runs():
+        results = []
+        async with docstrings_generator:
+            async for result in docstrings_generator.aiter_results():
+                results.append(result)
+                if len(results) == 1:
+                    with pytest.raises(RuntimeError):
+                        async for _ in docstrings_generator.aiter_results():
+                            pass
+        return results
+
+    results = asyncio.run(overlapping_runs())
+
+    # The first stream still receives every result
+    assert len(results) == 10
+
+
+def test_leaving_the_result_stream_cancels_the_requests(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    filename = tmp_path / "module.py"
+    filename.write_text(
+        "\n\n".join(f"def f{i}(a):\n    return a + {i}\n" for i in range(40))
+    )
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(filename)],
+        translate=False,
+        config=GPT4DocstringsConfig(),
+        max_concurrent_requests=4,
+    )
+    sent, finished = [], []
+
+    async def generate_docstring(node):
+        sent.append(node.name)
+        await asyncio.sleep(0.01)
+        finished.append(node.name)
+        return Docstring(f"Doc {node.name}.", 4, node.docstring_lineno)
+
+    docstrings_generator.docstring_generator.generate_docstring = generate_docstring
+
+    async def leave_early():
+        async with docstrings_generator:
+            async for _ in docstrings_generator.aiter_results():
+                break
+            counts = len(sent), len(finished)
+            await asyncio.sleep(0.2)
+        return counts
+
+    sent_at_break, finished_at_break = asyncio.run(leave_early())
+
+    assert (len(sent), len(finished)) == (sent_at_break, finished_at_break)
+    assert sent_at_break < 40
+
+
+def test_nodes_sharing_a_path_get_their_own_docstring(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text("""class Foo:
+    _x = None
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+
+
+if DEBUG:
+    def f():
+        return 1
+else:
+    def f():
+        return 2
+""")
+    calls = []
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(tmp_path / "module.py")],
+        translate=False,
+        config=GPT4DocstringsConfig(overwrite=True),
+        templates=False,
+    )
+    docstrings_generator.docstring_generator.generate_docstring = _fake_generator(calls)
+    docstrings_generator.run()
+
+    assert sorted(calls) == ["Foo", "f", "f", "x", "x"]
+    content = (tmp_path / "module.py").read_text()
+    assert content.count("Docstring for x.") == 2
+    assert content.count("Docstring for f.") == 2
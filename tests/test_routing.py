@@ -0,0 +1,126 @@
+import ast
+
+import pytest
+
+from gpt4docstrings import GPT4Docstrings
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.routing import ModelTier
+from gpt4docstrings.routing import parse_model_ladder
+from gpt4docstrings.scheduler import get_context_window
+from gpt4docstrings.utils.complexity import complexity_score
+
+SOURCE = """class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    @property
+    def norm(self):
+        return (self.x**2 + self.y**2) ** 0.5
+
+
+def parse(lines, strict=False, *, encoding="utf-8"):
+    result = []
+    for line in lines:
+        if not line:
+            continue
+        try:
+            key, value = line.decode(encoding).split("=")
+        except ValueError:
+            if strict:
+                raise ValueError(line)
+        else:
+            result.append((key, value))
+    return result
+"""
+
+
+def _scores(source):
+    return {
+        node.name: complexity_score(node)
+        for node in ast.walk(ast.parse(source))
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef))
+    }
+
+
+def test_complexity_score():
+    scores = _scores(SOURCE)
+
+    assert scores["norm"] == 0
+    # 2 methods, 2 init parameters (which are also the 2 attributes)
+    assert scores["Point"] == 4
+    assert scores["parse"] > 8
+
+
+def test_parse_model_ladder():
+    assert parse_model_ladder("gpt-3.5-turbo:2, gpt-3.5-turbo-16k:8,gpt-4") == [
+        ModelTier("gpt-3.5-turbo", 2),
+        ModelTier("gpt-3.5-turbo-16k", 8),
+        ModelTier("gpt-4"),
+    ]
+    assert parse_model_ladder("gpt-4") == [ModelTier("gpt-4")]
+
+
+def test_parse_model_ladder_with_fine_tuned_models():
+    assert parse_model_ladder("ft:gpt-3.5-turbo:org::abc123:6,ft:gpt-4:org::42") == [
+        ModelTier("ft:gpt-3.5-turbo:org::abc123", 6),
+        ModelTier("ft:gpt-4:org::42"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["gpt-3.5-turbo:2,gpt-4:8", "gpt-3.5-turbo,gpt-4", "a:8,b:2,c", "a:x,b", ":3,b"],
+)
+def test_parse_invalid_model_ladder(value):
+    with pytest.raises(ValueError):
+        parse_model_ladder(value)
+
+
+def test_nodes_are_routed_by_complexity(test_openai_api_key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(SOURCE)
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(tmp_path / "module.py")],
+        translate=False,
+        config=GPT4DocstringsConfig(),
+        model_ladder=parse_model_ladder("gpt-3.5-turbo:4,gpt-4"),
+        templates=False,
+    )
+
+    routed = {}
+    generators = docstrings_generator.docstring_generator.generators
+    for model_name, generator in generators.items():
+
+        async def generate_docstring(node, model_name=model_name):
+            routed[node.name] = model_name
+            return Docstring("Docstring.", 4 + node.col_offset, node.docstring_lineno)
+
+        generator.generate_docstring = generate_docstring
+
+    docstrings_generator.run()
+
+    assert routed == {
+        "Point": "gpt-3.5-turbo",
+        "__init__": "gpt-3.5-turbo",
+        "norm": "gpt-3.5-turbo",
+        "parse": "gpt-4",
+    }
+    tiers = docstrings_generator.report.tiers
+    assert tiers["gpt-3.5-turbo"].nodes == 3
+    assert tiers["gpt-4"].nodes == 1
+    # gpt-4 is 20x as expensive per token
+    assert tiers["gpt-4"].cost > tiers["gpt-3.5-turbo"].cost
+
+
+def test_context_windows_are_set_per_model(test_openai_api_key, tmp_path):
+    gpt4docs = GPT4Docstrings(
+        paths=[str(tmp_path)],
+        model_ladder=parse_model_ladder("local-model:4,gpt-4"),
+        context_windows={"local-model": 2048},
+    )
+
+    generators = gpt4docs.docstring_generator.generators
+    assert generators["local-model"].context_window == 2048
+    assert generators["gpt-4"].context_window == get_context_window("gpt-4")
@@ -0,0 +1,226 @@
+import asyncio
+import os
+from collections import Counter
+
+import pytest
+
+from gpt4docstrings import GPT4Docstrings
+from gpt4docstrings.backends import Completion
+from gpt4docstrings.backends import CompletionBackend
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.exceptions import RateLimitError
+from gpt4docstrings.scheduler import node_priority
+from gpt4docstrings.scheduler import NodeScheduler
+from gpt4docstrings.scheduler import RunBudget
+
+
+class _Node:
+    def __init__(self, name, level):
+        self.name = name
+        self.level = level
+
+
+def test_node_priority():
+    references = Counter({"popular": 10, "rare": 1})
+    nodes = [
+        _Node("__private", 1),
+        _Node("_semiprivate", 1),
+        _Node("rare", 1),
+        _Node("nested", 2),
+        _Node("popular", 1),
+        _Node("__init__", 2),
+    ]
+    ordered = sorted(nodes, key=lambda n: node_priority(n, references))
+    assert [n.name for n in ordered] == [
+        "popular",
+        "rare",
+        "nested",
+        "__init__",
+        "_semiprivate",
+        "__private",
+    ]
+
+
+def test_scheduler_dispatches_by_priority_within_budget():
+    order = []
+
+    def request(name):
+        async def run():
+            order.append(name)
+            return name
+
+        return run
+
+    async def main():
+        scheduler = NodeScheduler(
+            max_concurrency=1, budget=RunBudget(max_requests=2), hold=True
+        )
+        futures = [
+            scheduler.submit((priority,), request(name))
+            for priority, name in [(3, "c"), (1, "a"), (2, "b")]
+        ]
+        scheduler.release()
+        return await asyncio.gather(*futures), scheduler
+
+    results, scheduler = asyncio.run(main())
+    assert order == ["a", "b"]
+    assert results == [None, "a", "b"]
+    assert scheduler.skipped == 1
+
+
+def test_cost_budget():
+    budget = RunBudget(model_name="gpt-4", max_cost=0.1)
+    cost = budget.estimate_cost(1000, 1000)
+    assert cost == pytest.approx(0.09)
+    assert not budget.exhausted(cost)
+    budget.charge(cost)
+    assert budget.exhausted(cost)
+
+
+def test_run_stops_when_budget_is_exhausted(test_openai_api_key, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    async def generate_docstring(node):
+        calls.append(node.name)
+        return Docstring("Doc.", 4 + node.col_offset, node.docstring_lineno)
+
+    docstrings_generator = GPT4Docstrings(
+        paths=[os.path.join(pytest.TESTS_PATH, "resources")],
+        translate=False,
+        config=GPT4DocstringsConfig(),
+        max_requests=2,
+    )
+    docstrings_generator.docstring_generator.generate_docstring = generate_docstring
+    docstrings_generator.run()
+
+    # Only top-level nodes are documented before nested ones
+    assert len(calls) == 2
+    assert set(calls) <= {"fn1", "fn2", "A"}
+    # `A.__init__` is documented from a template, without spending the budget
+    assert docstrings_generator.report.counters["Nodes skipped by budget"] == 3
+    assert os.path.exists("gpt4docstring_docstring_generator_patch.diff")
+    assert os.path.exists(docstrings_generator.journal_path)
+
+
+def test_budget_goes_to_public_nodes_of_large_files(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    filename = tmp_path / "module.py"
+    functions = [f"_priv{i}" for i in range(10)] + [f"pub{i}" for i in range(10)]
+    filename.write_text(
+        "\n\n".join(f"def {name}(a):\n    return a + 1\n" for name in functions)
+    )
+    calls = []
+
+    async def generate_docstring(node):
+        calls.append(node.name)
+        return Docstring("Doc.", 4 + node.col_offset, node.docstring_lineno)
+
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(filename)],
+        translate=False,
+        config=GPT4DocstringsConfig(),
+        max_requests=5,
+        max_in_flight_per_file=4,
+        max_concurrent_requests=1,
+    )
+    docstrings_generator.docstring_generator.generate_docstring = generate_docstring
+    docstrings_generator.run()
+
+    assert calls == [f"pub{i}" for i in range(5)]
+
+
+class _CountingBackend(CompletionBackend):
+    model_name = "gpt-3.5-turbo"
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.requests = 0
+
+    async def complete(self, prompt, max_tokens=None, stop=None, json_mode=False):
+        self.requests += 1
+        return self.answer()
+
+    async def stream(self, prompt, max_tokens=None, stop=None, json_mode=False):
+        yield (await self.complete(prompt, max_tokens, stop, json_mode)).text
+
+
+def _budgeted_run(tmp_path, answer, max_requests):
+    filename = tmp_path / "module.py"
+    filename.write_text("def add(a, b):\n    total = a + b\n    return total\n")
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(filename)],
+        translate=False,
+        config=GPT4DocstringsConfig(),
+        max_requests=max_requests,
+    )
+    backend = _CountingBackend(answer)
+    docstrings_generator.docstring_generator.backend = backend
+    docstrings_generator.run()
+    return docstrings_generator, backend
+
+
+def test_further_requests_of_a_node_are_charged(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+
+    # Every answer is truncated, so its budget is doubled and the request sent again
+    docstrings_generator, backend = _budgeted_run(
+        tmp_path,
+        lambda: Completion('"""\nAdds', finish_reason="length", completion_tokens=8),
+        max_requests=3,
+    )
+
+    assert backend.requests == 3
+    assert docstrings_generator.budget.requests == 3
+    assert docstrings_generator.report.counters["Nodes skipped by budget"] == 1
+
+
+def test_no_retry_once_the_budget_is_exhausted(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+
+    def rejected():
+        raise RateLimitError("429 Too Many Requests")
+
+    # Without the budget, the request would be retried after a delay
+    docstrings_generator, backend = _budgeted_run(tmp_path, rejected, max_requests=1)
+
+    assert backend.requests == 1
+    assert docstrings_generator.report.counters["Nodes failed"] == 1
+
+
+def test_cost_budget_is_spent_on_actual_usage(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    filename = tmp_path / "module.py"
+    filename.write_text(
+        "\n\n".join(
+            f"def f{i}(a, b):\n    total = a + b\n    return total\n" for i in range(20)
+        )
+    )
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(filename)],
+        translate=False,
+        config=GPT4DocstringsConfig(),
+        max_cost=0.005,
+    )
+    backend = _CountingBackend(lambda: Completion('"""Adds."""', completion_tokens=3))
+    docstrings_generator.docstring_generator.backend = backend
+    docstrings_generator.run()
+
+    # The answers are much shorter than reserved, so more nodes fit than the
+    # reservations alone would allow, and the budget is still respected
+    budget = docstrings_generator.budget
+    assert backend.requests > 12
+    assert budget.cost <= budget.max_cost
+    assert (
+        docstrings_generator.report.counters["Nodes skipped by budget"]
+        == 20 - backend.requests
+    )
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from gpt4docstrings import GPT4Docstrings
+from gpt4docstrings.cli import main
+from gpt4docstrings.sharding import merge_patches
+from gpt4docstrings.sharding import parse_shard
+from gpt4docstrings.sharding import shard_of
+
+PATCH_1 = """--- a/pkg/a.py
++++ b/pkg/a.py
+@@ -1,2 +1,5 @@
+ def f():
++    \"\"\"
++    Docstring.
++    \"\"\"
+     return 1
+
+"""
+
+PATCH_2 = """--- a/pkg/b.py
++++ b/pkg/b.py
+@@ -1 +1,2 @@
+ def g(): pass
++--- not a header
+"""
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    with pytest.raises(ValueError):
+        parse_shard("5/4")
+    with pytest.raises(ValueError):
+        parse_shard("two/4")
+
+
+def test_shards_partition_files(test_openai_api_key):
+    path = os.path.join(pytest.TESTS_PATH, "resources")
+    all_files = set(GPT4Docstrings(paths=[path]).get_filenames_from_paths())
+
+    shards = [
+        set(GPT4Docstrings(paths=[path], shard=(i, 3)).get_filenames_from_paths())
+        for i in range(1, 4)
+    ]
+    assert set().union(*shards) == all_files
+    assert sum(len(shard) for shard in shards) == len(all_files)
+
+
+def test_shard_is_independent_of_checkout_location():
+    assert shard_of("/ci/a/repo/pkg/x.py", "/ci/a/repo", 7) == shard_of(
+        "/home/me/repo/pkg/x.py", "/home/me/repo", 7
+    )
+
+
+def test_merge_patches_is_order_independent():
+    merged, report = merge_patches({"2.diff": PATCH_2, "1.diff": PATCH_1})
+    assert merged.index("a/pkg/a.py") < merged.index("a/pkg/b.py")
+    assert merge_patches({"1.diff": PATCH_1, "2.diff": PATCH_2})[0] == merged
+    assert report == [["2.diff", 1, 1, 1, 0], ["1.diff", 1, 1, 3, 0]]
+
+
+def test_merge_patches_rejects_conflicts():
+    conflicting = PATCH_1.replace("Docstring.", "Another docstring.")
+    with pytest.raises(ValueError, match="Conflicting"):
+        merge_patches({"1.diff": PATCH_1, "3.diff": conflicting})
+
+
+def test_merge_patches_command(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name, patch in [("1.diff", PATCH_1), ("2.diff", PATCH_2)]:
+        with open(name, "w") as f:
+            f.write(patch)
+
+    result = CliRunner().invoke(main, ["merge-patches", "1.diff", "2.diff"])
+    assert result.exit_code == 0, result.output
+    with open("gpt4docstring_docstring_generator_patch.diff") as f:
+        assert f.read().count("+++ ") == 2
@@ -0,0 +1,63 @@
+import asyncio
+
+from langchain.schema.messages import AIMessageChunk
+
+from gpt4docstrings.backends import LangChainBackend
+from gpt4docstrings.utils.streaming import stream_docstring_completion
+
+
+class FakeStreamingModel:
+    def __init__(self, chunks, max_tokens=None):
+        self.chunks = chunks
+        self.max_tokens = max_tokens
+        self.sent = 0
+        self.closed = False
+
+    async def astream(self, prompt, stop=None, **kwargs):
+        try:
+            for chunk in self.chunks:
+                self.sent += 1
+                yield AIMessageChunk(content=chunk)
+        finally:
+            self.closed = True
+
+
+def test_stream_stops_after_closing_quotes():
+    model = FakeStreamingModel(
+        ['"""', "Adds two", " numbers.", '"""', " This", " function", " is"],
+        max_tokens=100,
+    )
+    completion, stats = asyncio.run(
+        stream_docstring_completion(LangChainBackend(model), "prompt", "module.py:add")
+    )
+
+    assert completion == '"""Adds two numbers."""'
+    assert model.sent == 4
+    assert model.closed
+    assert stats.stopped_early
+    assert stats.tokens_received == 4
+    assert stats.budget_unused == 96
+    assert stats.time_to_first_docstring is not None
+
+
+def test_stream_without_docstring_is_consumed():
+    model = FakeStreamingModel(["No", " docstring"])
+    completion, stats = asyncio.run(
+        stream_docstring_completion(LangChainBackend(model), "prompt", "module.py:add")
+    )
+
+    assert completion == "No docstring"
+    assert not stats.stopped_early
+    assert stats.budget_unused is None
+
+
+def test_stream_truncated_by_budget():
+    model = FakeStreamingModel(['"""', "Adds", " two"])
+    completion, stats = asyncio.run(
+        stream_docstring_completion(
+            LangChainBackend(model), "prompt", "module.py:add", max_tokens=3
+        )
+    )
+
+    assert stats.truncated
+    assert not stats.stopped_early
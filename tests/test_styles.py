@@ -0,0 +1,202 @@
+import pytest
+
+from gpt4docstrings import GPT4Docstrings
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.exceptions import DocstringStyleError
+from gpt4docstrings.styles import convert_docstring
+from gpt4docstrings.styles import detect_style
+from gpt4docstrings.styles import DocstringItem
+from gpt4docstrings.styles import in_style
+from gpt4docstrings.styles import parse_docstring
+from gpt4docstrings.styles import STYLES
+
+GOOGLE = """Calculate the weighted average of a list of numbers.
+
+The weights don't need to add up to one.
+
+Args:
+    numbers (list): A list of numeric values.
+    weights (Optional[List[float]]): The weights, one per
+        number.
+
+Returns:
+    float: The average of the input numbers.
+
+Raises:
+    ZeroDivisionError: If the input list is empty."""
+
+NUMPY = """Calculate the weighted average of a list of numbers.
+
+The weights don't need to add up to one.
+
+Parameters
+----------
+numbers : list
+    A list of numeric values.
+weights : Optional[List[float]]
+    The weights, one per
+    number.
+
+Returns
+-------
+float
+    The average of the input numbers.
+
+Raises
+------
+ZeroDivisionError
+    If the input list is empty."""
+
+EPYTEXT = """Calculate the weighted average of a list of numbers.
+
+The weights don't need to add up to one.
+
+@param numbers: A list of numeric values.
+@type numbers: list
+@param weights: The weights, one per
+    number.
+@type weights: Optional[List[float]]
+
+@return: The average of the input numbers.
+@rtype: float
+
+@raise ZeroDivisionError: If the input list is empty."""
+
+
+def test_conversions_round_trip_through_every_style():
+    text = GOOGLE
+    for style in [*STYLES[1:], STYLES[0]]:
+        text = convert_docstring(text, style)
+        assert detect_style(text) == style
+
+    assert text == GOOGLE
+    assert convert_docstring(GOOGLE, "numpy") == NUMPY
+    assert convert_docstring(NUMPY, "epytext") == EPYTEXT
+
+
+def test_rest_fields_with_inline_types_and_attributes():
+    parsed = parse_docstring(
+        "A point.\n\n:ivar x: The abscissa.\n:vartype x: float\n"
+        ":param int scale: The scale."
+    )
+
+    assert parsed.attributes == [DocstringItem("x", "float", "The abscissa.")]
+    assert parsed.params == [DocstringItem("scale", "int", "The scale.")]
+    assert convert_docstring(
+        "A point.\n\n:ivar x: The abscissa.\n:vartype x: float", "google"
+    ) == ("A point.\n\nAttributes:\n    x (float): The abscissa.")
+
+
+def test_plain_docstrings_are_valid_in_every_style():
+    text = "Return the value.\n\nIt's cached after the first call."
+
+    assert detect_style(text) is None
+    for style in STYLES:
+        assert convert_docstring(text, style) == text
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # Unknown section
+        "Do it.\n\nArgs:\n    x (int): A value.\n\nExample:\n    >>> do(1)",
+        # Mixed styles
+        "Do it.\n\nArgs:\n    x (int): A value.\n\n:return: Nothing.",
+        # Named return values have no equivalent in other styles
+        "Do it.\n\nReturns\n-------\nx : int\n    A value.",
+        # Text after the sections
+        "Do it.\n\nArgs:\n    x (int): A value.\nThe end.",
+    ],
+)
+def test_unsupported_docstrings_are_not_converted(text):
+    with pytest.raises(DocstringStyleError):
+        convert_docstring(text, "numpy")
+
+
+def test_only_unparsable_docstrings_go_to_the_model(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(
+        "def average(numbers, weights=None):\n"
+        '    """\n'
+        + "\n".join("    " + line if line else "" for line in GOOGLE.split("\n"))
+        + '\n    """\n'
+        "\n\n"
+        "def run(n):\n"
+        '    """\n    Run it.\n\n    Args:\n        n (int): Times.\n\n'
+        '    Example:\n        >>> run(1)\n    """\n'
+    )
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(tmp_path / "module.py")],
+        docstring_style="numpy",
+        config=GPT4DocstringsConfig(overwrite=True),
+    )
+    translated = []
+
+    async def translate_docstring(node):
+        translated.append(node.name)
+        return Docstring("Run it.", 4 + node.col_offset, node.docstring_lineno)
+
+    docstrings_generator.docstring_translator.translate_docstring = translate_docstring
+    docstrings_generator.run()
+
+    assert translated == ["run"]
+    assert docstrings_generator.report.counters["Docstrings translated locally"] == 1
+    assert (
+        docstrings_generator.report.counters["Docstrings translated by the model"] == 1
+    )
+    content = (tmp_path / "module.py").read_text()
+    assert "    Parameters\n    ----------\n    numbers : list\n" in content
+    assert "Example:" not in content
+
+
+def test_docstrings_already_in_the_style():
+    assert in_style(GOOGLE, "google")
+    assert not in_style(GOOGLE, "numpy")
+    assert in_style("Return the value.", "epytext")
+    assert not in_style(
+        "Do it.\n\nArgs:\n    x (int): A value.\n\n:return: Nothing.", "google"
+    )
+
+
+def test_docstrings_in_the_style_are_not_translated(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    source = (
+        "def average(numbers, weights=None):\n"
+        '    """\n'
+        + "\n".join("    " + line if line else "" for line in GOOGLE.split("\n"))
+        + '\n    """\n'
+        "\n\n"
+        "def value():\n"
+        '    """Return the value."""\n'
+        "\n\n"
+        "def run(n):\n"
+        '    """\n    Run it.\n\n    Parameters\n    ----------\n'
+        '    n : int\n        Times.\n    """\n'
+    )
+    (tmp_path / "module.py").write_text(source)
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(tmp_path / "module.py")],
+        docstring_style="google",
+        config=GPT4DocstringsConfig(overwrite=True),
+        local_translation=False,
+    )
+    translated = []
+
+    async def translate_docstring(node):
+        translated.append(node.name)
+        # The model answers with the docstring unchanged
+        return Docstring(node.docstring, 4 + node.col_offset, node.docstring_lineno)
+
+    docstrings_generator.docstring_translator.translate_docstring = translate_docstring
+    docstrings_generator.run()
+
+    assert translated == ["run"]
+    counters = docstrings_generator.report.counters
+    assert counters["Docstrings already in the target style"] == 2
+    assert counters["Translations identical to the original"] == 1
+    assert (tmp_path / "module.py").read_text() == source
@@ -0,0 +1,106 @@
+import ast
+
+from gpt4docstrings import GPT4Docstrings
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.docstring import Docstring
+from gpt4docstrings.styles import render_docstring
+from gpt4docstrings.visit import GPT4DocstringsVisitor
+
+SOURCE = """class HTTPClient:
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self._timeout = timeout
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    def __repr__(self):
+        return f"HTTPClient({self.url!r})"
+
+    def __eq__(self, other):
+        return self.url == other.url
+
+    async def get(self, path, *, retries=3):
+        return await self._request("GET", path, retries=retries)
+
+    def fetch(self, path):
+        return self.get(path, retries=retries)
+
+
+def load(path: str) -> dict:
+    return json_load(path)
+
+
+def connect(url, timeout):
+    client = HTTPClient(url, timeout)
+    return client
+"""
+
+
+def _templates(source):
+    visitor = GPT4DocstringsVisitor("module.py", GPT4DocstringsConfig(), source)
+    visitor.visit(ast.parse(source))
+    return {node.name: node.template for node in visitor.nodes}
+
+
+def test_trivial_functions_are_recognised():
+    templates = _templates(SOURCE)
+
+    assert render_docstring(templates["__init__"], "google") == (
+        "Initializes the http client.\n\n"
+        "Args:\n"
+        "    url (str): Stored in `self.url`.\n"
+        "    timeout (float): Stored in `self._timeout`."
+    )
+    assert render_docstring(templates["timeout"], "numpy") == (
+        "The timeout of the http client."
+    )
+    assert render_docstring(templates["__eq__"], "reStructuredText") == (
+        "Checks whether the http client is equal to another object.\n\n"
+        ":param other: The object to compare with.\n"
+        ":type other: object\n\n"
+        ":return: `True` if both objects are equal.\n"
+        ":rtype: bool"
+    )
+    assert render_docstring(templates["get"], "google") == (
+        "Calls `self._request` with the same arguments.\n\n"
+        "Args:\n"
+        "    path: Passed to `self._request`.\n"
+        "    retries: Passed to `self._request`.\n\n"
+        "Returns:\n"
+        "    The result of `self._request`."
+    )
+    assert templates["load"].returns.type == "dict"
+    assert templates["__repr__"] is not None
+    # Not forwarding its own parameters only, nor a single call
+    assert templates["fetch"] is None
+    assert templates["connect"] is None
+    assert templates["HTTPClient"] is None
+
+
+def test_templated_nodes_are_not_sent_to_the_model(
+    test_openai_api_key, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text(SOURCE)
+    docstrings_generator = GPT4Docstrings(
+        paths=[str(tmp_path / "module.py")],
+        docstring_style="numpy",
+        config=GPT4DocstringsConfig(overwrite=True),
+    )
+    generated = []
+
+    async def generate_docstring(node):
+        generated.append(node.name)
+        return Docstring("Does it.", 4 + node.col_offset, node.docstring_lineno)
+
+    docstrings_generator.docstring_generator.generate_docstring = generate_docstring
+    docstrings_generator.run()
+
+    # `get` has no return annotation, which NumPy sections need
+    assert sorted(generated) == ["HTTPClient", "connect", "fetch", "get"]
+    assert docstrings_generator.report.counters["Requests avoided by templates"] == 5
+    content = (tmp_path / "module.py").read_text()
+    assert "        Returns\n        -------\n        str\n" in content
+    assert "\n    Returns\n    -------\n    dict\n" in content
@@ -0,0 +1,95 @@
+import ast
+import asyncio
+
+from langchain.schema import ChatGeneration
+from langchain.schema import LLMResult
+from langchain.schema.messages import AIMessage
+
+from gpt4docstrings.backends import LangChainBackend
+from gpt4docstrings.report import RunReport
+from gpt4docstrings.utils.completions import get_docstring_completion
+from gpt4docstrings.utils.token_budget import DOCSTRING_STOP_SEQUENCES
+from gpt4docstrings.utils.token_budget import estimate_token_budget
+
+
+def _budget(source: str) -> int:
+    return estimate_token_budget(ast.parse(source).body[0])
+
+
+def test_trivial_getter_gets_small_budget():
+    assert _budget("def get(self):\n    return self.value") == 80
+
+
+def test_budget_grows_with_params_raises_and_returns():
+    source = (
+        "def f(a, b, *args, **kwargs):\n"
+        "    if a:\n"
+        "        raise ValueError('a')\n"
+        "    if b:\n"
+        "        raise TypeError\n"
+        "    def inner():\n"
+        "        raise KeyError\n"
+        "    return a\n"
+    )
+    # 4 params + 2 raises + 1 return
+    assert _budget(source) == 48 + 32 * 7
+
+
+def test_class_budget_counts_attributes():
+    source = (
+        "class A:\n"
+        "    def __init__(self, x, y):\n"
+        "        self.x = x\n"
+        "        self.z = y\n"
+    )
+    assert _budget(source) == 64 + 32 * 3
+
+
+class FakeChatModel:
+    model_name = "gpt-3.5-turbo"
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    async def agenerate(self, messages, stop=None, **kwargs):
+        self.calls.append({"stop": stop, **kwargs})
+        text, finish_reason = self.responses.pop(0)
+        generation = ChatGeneration(
+            message=AIMessage(content=text),
+            generation_info={"finish_reason": finish_reason},
+        )
+        return LLMResult(generations=[[generation]])
+
+
+def test_completion_closed_after_stop_sequence():
+    model = FakeChatModel([('"""\nReturns the value.', "stop")])
+    report = RunReport()
+    completion = asyncio.run(
+        get_docstring_completion(
+            LangChainBackend(model), "prompt", max_tokens=80, report=report
+        )
+    )
+
+    assert completion == '"""\nReturns the value.\n"""'
+    assert model.calls == [{"stop": DOCSTRING_STOP_SEQUENCES, "max_tokens": 80}]
+    assert report.summary() == {"Budgeted completions": 1}
+
+
+def test_truncated_completion_is_requested_again_with_bigger_budget():
+    model = FakeChatModel(
+        [('"""\nReturns', "length"), ('"""\nReturns the value.\n"""', "stop")]
+    )
+    report = RunReport()
+    completion = asyncio.run(
+        get_docstring_completion(
+            LangChainBackend(model), "prompt", max_tokens=80, report=report
+        )
+    )
+
+    assert completion == '"""\nReturns the value.\n"""'
+    assert [call["max_tokens"] for call in model.calls] == [80, 160]
+    assert report.summary() == {
+        "Budgeted completions": 2,
+        "Completions truncated by budget": 1,
+    }
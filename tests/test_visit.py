@@ -0,0 +1,54 @@
+import ast
+
+from gpt4docstrings.config import GPT4DocstringsConfig
+from gpt4docstrings.visit import GPT4DocstringsVisitor
+
+SOURCE = '''class A:
+    """
+    A class.
+    """
+
+    @property
+    def value(self):
+        # The stored value
+        return self._value
+
+
+def f(a):
+    return a
+'''
+
+
+def _visit(source, **kwargs):
+    visitor = GPT4DocstringsVisitor(
+        filename="m.py", config=GPT4DocstringsConfig(), **kwargs
+    )
+    visitor.visit(ast.parse(source))
+    return {node.name: node for node in visitor.nodes}
+
+
+def test_nodes_are_compact_records():
+    nodes = _visit(SOURCE, file_content=SOURCE)
+    value = nodes["value"]
+
+    assert not hasattr(value, "__dict__")
+    assert value.parent_path == "m.py:A"
+    assert value.path == "m.py:A.value"
+    assert value.source == (
+        "@property\ndef value(self):\n    # The stored value\n    return self._value\n"
+    )
+    assert nodes["f"].source == "def f(a):\n    return a\n"
+
+
+def test_existing_docstring_is_kept_without_the_ast():
+    node = _visit(SOURCE, file_content=SOURCE)["A"]
+
+    assert node.covered
+    assert node.docstring == "A class."
+    assert node.docstring_raw == "\n    A class.\n    "
+    assert node.docstring_span == (2, 4, 4, 7)
+    assert _visit(SOURCE, file_content=SOURCE)["f"].docstring is None
+
+
+def test_source_is_unparsed_without_file_content():
+    assert _visit(SOURCE)["f"].source == "def f(a):\n    return a"